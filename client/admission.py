@@ -0,0 +1,263 @@
+"""Admission control for model provider calls"""
+import asyncio
+import bisect
+import itertools
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from cache import TTLCache
+from config import config
+
+# Lower values are admitted first
+PRIORITY_RETRY = 0  # A rate-limited call coming back after its backoff
+PRIORITY_INTERACTIVE = 1
+
+class AdmissionRejected(Exception):
+    """The call was not admitted: the queue is full or the wait timed out"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """``rate`` calls per second on average, with bursts of up to ``burst``"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def delay(self, now: float) -> float:
+        """Seconds until a token is available; 0 if one is available now"""
+        if self.rate <= 0:
+            return 0.0
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        if self.rate > 0:
+            self.tokens -= 1
+
+def caller_key(user_id: Optional[str], session_id: Optional[str]) -> str:
+    """The per-user bucket a call counts against.
+
+    Anonymous callers are limited per session instead of all sharing one bucket.
+    """
+    if user_id and user_id != "anonymous":
+        return f"user:{user_id}"
+    return f"session:{session_id}" if session_id else "anonymous"
+
+def is_rate_limited(error: BaseException) -> bool:
+    """True for a provider's HTTP 429 (openai/anthropic RateLimitError and the like)"""
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """The Retry-After header of a rate-limit response, in seconds"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+class AdmissionController:
+    """Decides when each model call may start.
+
+    A call waits in a priority queue until three limits allow it: fewer than
+    ``max_concurrent`` calls in flight, a token in the global bucket and a
+    token in its own key's (user's) bucket. Waiters are admitted in priority
+    order, then arrival order; one whose user is out of tokens lets other
+    users' calls go ahead instead of blocking the queue. Idle users' buckets
+    are dropped once they would have refilled.
+
+    A provider 429 pauses admissions for everyone and the caller retries with
+    jittered exponential backoff, so load above the provider's limit queues
+    up here rather than turning into a stream of failed calls. The queue is
+    bounded by ``max_queue`` and ``queue_timeout``; beyond them a call is
+    rejected with AdmissionRejected.
+    """
+
+    def __init__(self, rate: float = config.LLM_RATE, burst: float = config.LLM_BURST,
+                 user_rate: float = config.LLM_USER_RATE, user_burst: float = config.LLM_USER_BURST,
+                 max_concurrent: int = config.LLM_MAX_CONCURRENT, max_queue: int = config.LLM_MAX_QUEUE,
+                 queue_timeout: float = config.LLM_QUEUE_TIMEOUT, max_retries: int = config.LLM_MAX_RETRIES,
+                 backoff_initial: float = config.LLM_BACKOFF_INITIAL,
+                 backoff_max: float = config.LLM_BACKOFF_MAX):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self._bucket = TokenBucket(rate, burst)
+        refill_time = user_burst / user_rate if user_rate > 0 else 1.0
+        self._users = TTLCache(maxsize=100000, ttl=refill_time)
+        # (priority, seq, key, future), kept sorted
+        self._waiters: List[Tuple[int, int, str, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._waits: Deque[float] = deque(maxlen=1000)
+        self._counters = {"admitted": 0, "rejected": 0, "rate_limited": 0, "retries": 0}
+
+    @asynccontextmanager
+    async def admit(self, key: str, priority: int = PRIORITY_INTERACTIVE):
+        """Hold a call slot for the body of the ``async with``"""
+        await self._acquire(key, priority)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def call(self, key: str, fn: Callable[[], Awaitable[Any]],
+                   priority: int = PRIORITY_INTERACTIVE) -> Any:
+        """``await fn()`` once admitted, retrying rate-limited attempts"""
+        for attempt in itertools.count():
+            async with self.admit(key, priority):
+                try:
+                    return await fn()
+                except Exception as e:
+                    delay = self.backoff(e, attempt)
+                    if delay is None:
+                        raise
+            await asyncio.sleep(delay)
+            priority = PRIORITY_RETRY
+
+    async def stream(self, key: str, chunks: Callable[[], AsyncIterator[Any]],
+                     priority: int = PRIORITY_INTERACTIVE) -> AsyncIterator[Any]:
+        """Iterate ``chunks()`` once admitted; retried only until the first chunk arrives"""
+        for attempt in itertools.count():
+            started = False
+            async with self.admit(key, priority):
+                try:
+                    async for chunk in chunks():
+                        started = True
+                        yield chunk
+                    return
+                except Exception as e:
+                    delay = None if started else self.backoff(e, attempt)
+                    if delay is None:
+                        raise
+            await asyncio.sleep(delay)
+            priority = PRIORITY_RETRY
+
+    def backoff(self, error: BaseException, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying after ``error``; None if it should not be retried.
+
+        A rate-limit response also pauses admissions for everyone, for the
+        shortest delay the jitter can give, since the provider limit is shared.
+        """
+        if not is_rate_limited(error):
+            return None
+        self._counters["rate_limited"] += 1
+        if attempt >= self.max_retries:
+            return None
+        self._counters["retries"] += 1
+        delay = min(self.backoff_max, self.backoff_initial * 2 ** attempt)
+        delay = max(delay, retry_after(error) or 0.0)
+        self._paused_until = max(self._paused_until, time.monotonic() + delay / 2)
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _acquire(self, key: str, priority: int) -> None:
+        if len(self._waiters) >= self.max_queue:
+            self._counters["rejected"] += 1
+            raise AdmissionRejected("Too many requests are waiting for the model", self._retry_hint())
+        future = asyncio.get_running_loop().create_future()
+        waiter = (priority, next(self._seq), key, future)
+        bisect.insort(self._waiters, waiter)
+        enqueued = time.monotonic()
+        self._dispatch()
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except BaseException as e:
+            if future.done() and not future.cancelled():
+                # Admitted just as the caller gave up
+                self._release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self._counters["rejected"] += 1
+                raise AdmissionRejected(f"Waited more than {self.queue_timeout}s for the model",
+                                        self._retry_hint()) from None
+            raise
+        self._waits.append(time.monotonic() - enqueued)
+
+    def _release(self) -> None:
+        self._in_flight -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Admit every waiter the limits allow; schedule a retry for the rest"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        now = time.monotonic()
+        wake = None
+        for waiter in list(self._waiters):
+            priority, _, key, future = waiter
+            if future.done():
+                self._waiters.remove(waiter)
+                continue
+            if self._in_flight >= self.max_concurrent:
+                break  # _release dispatches again
+            delay = max(self._paused_until - now, self._bucket.delay(now))
+            if delay > 0:
+                wake = delay if wake is None else min(wake, delay)
+                break
+            bucket = self._users.get(key) or TokenBucket(self.user_rate, self.user_burst)
+            user_delay = bucket.delay(now)
+            if user_delay > 0:
+                wake = user_delay if wake is None else min(wake, user_delay)
+                self._users.set(key, bucket)
+                continue
+            self._waiters.remove(waiter)
+            self._bucket.take()
+            bucket.take()
+            self._users.set(key, bucket)
+            self._in_flight += 1
+            self._counters["admitted"] += 1
+            future.set_result(None)
+        if wake is not None and self._waiters:
+            self._timer = asyncio.get_running_loop().call_later(wake, self._dispatch)
+
+    def _retry_hint(self) -> float:
+        """Rough seconds until a rejected caller could be admitted"""
+        mean_wait = sum(self._waits) / len(self._waits) if self._waits else 1.0
+        return round(max(1.0, mean_wait, self._paused_until - time.monotonic()), 1)
+
+    def stats(self) -> Dict[str, Any]:
+        """Current load, counters and queue-time percentiles over recent calls"""
+        waits = sorted(self._waits)
+        def percentile(p: float) -> float:
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 1) if waits else 0.0
+        return {
+            "in_flight": self._in_flight,
+            "queued": len(self._waiters),
+            "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 2),
+            **self._counters,
+            "queue_ms": {
+                "samples": len(waits),
+                "mean": round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "max": round(waits[-1] * 1000, 1) if waits else 0.0
+            }
+        }
+
+# Shared by all agents, since they draw on the same provider quota
+_admission_instance: Optional[AdmissionController] = None
+
+def get_admission_controller() -> AdmissionController:
+    """Get or create the admission controller shared by all agents"""
+    global _admission_instance
+    if _admission_instance is None:
+        _admission_instance = AdmissionController()
+    return _admission_instance
@@ -1,13 +1,17 @@
 """Pydantic AI Agent with tools"""
 import os
 import httpx
-import math
 import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from pydantic_ai import Agent, RunContext
+from pydantic_ai.messages import ModelMessage
 from pydantic import BaseModel
 from config import config
-from mcp_client import MCPClient
+from mcp_client import get_mcp_client
+from mcp_tools import register_mcp_tools
+from expression_engine import calculate
+from message_history import MessageHistoryCache, Turn, context_turns
+from admission import AdmissionRejected, caller_key, get_admission_controller
 
 class ChatContext(BaseModel):
     """Context for chat conversations"""
@@ -31,8 +35,8 @@ class ChatAgent:
             system_prompt=config.SYSTEM_PROMPT
         )
         
-        # Initialize MCP client
-        self.mcp_client = MCPClient(f"http://{config.MCP_SERVER_HOST}:{config.MCP_SERVER_PORT}")
+        # Shared MCP client; its connection pool is closed by the app lifespan
+        self.mcp_client = get_mcp_client()
         
         # Register tools directly
         self._register_tools()
@@ -42,6 +46,12 @@ class ChatAgent:
         
         # Storage for notes
         self.notes_storage = {}
+        
+        # Per-session model messages, reused across turns
+        self.histories = MessageHistoryCache(config.SYSTEM_PROMPT)
+        
+        # Rate limits and queueing for model calls, shared by all agents
+        self.admission = get_admission_controller()
     
     def _register_tools(self):
         """Register tools with the agent"""
@@ -49,29 +59,7 @@ class ChatAgent:
         @self.agent.tool
         async def calculator(ctx: RunContext[None], expression: str) -> Dict[str, Any]:
             """Evaluate mathematical expressions safely."""
-            try:
-                # Define safe functions
-                safe_dict = {
-                    'abs': abs, 'round': round, 'min': min, 'max': max,
-                    'sum': sum, 'pow': pow, 'sqrt': math.sqrt,
-                    'sin': math.sin, 'cos': math.cos, 'tan': math.tan,
-                    'pi': math.pi, 'e': math.e
-                }
-                
-                # Evaluate expression safely
-                result = eval(expression, {"__builtins__": {}}, safe_dict)
-                
-                return {
-                    "success": True,
-                    "expression": expression,
-                    "result": result
-                }
-            except Exception as e:
-                return {
-                    "success": False,
-                    "expression": expression,
-                    "error": str(e)
-                }
+            return calculate(expression)
         
         @self.agent.tool
         async def get_current_time(ctx: RunContext[None], timezone: str = "UTC") -> Dict[str, str]:
@@ -140,9 +128,7 @@ class ChatAgent:
             """Call a tool from the MCP server.
             Available MCP tools will be discovered dynamically."""
             try:
-                async with agent.mcp_client as client:
-                    result = await client.call_tool(tool_name, kwargs)
-                    return result
+                return await agent.mcp_client.call_tool(tool_name, kwargs)
             except Exception as e:
                 return {"error": f"Failed to call MCP tool: {str(e)}"}
         
@@ -151,19 +137,18 @@ class ChatAgent:
         async def list_mcp_tools(ctx: RunContext[None]) -> Dict[str, Any]:
             """List all available tools from the MCP server."""
             try:
-                async with agent.mcp_client as client:
-                    tools = await client.list_tools()
-                    return {
-                        "success": True,
-                        "tools": [
-                            {
-                                "name": tool.name,
-                                "description": tool.description
-                            }
-                            for tool in tools
-                        ],
-                        "count": len(tools)
-                    }
+                tools = await agent.mcp_client.list_tools()
+                return {
+                    "success": True,
+                    "tools": [
+                        {
+                            "name": tool.name,
+                            "description": tool.description
+                        }
+                        for tool in tools
+                    ],
+                    "count": len(tools)
+                }
             except Exception as e:
                 return {"error": f"Failed to list MCP tools: {str(e)}"}
     
@@ -171,17 +156,18 @@ class ChatAgent:
         """Enter async context"""
         # Check MCP server health
         try:
-            async with self.mcp_client as client:
-                if await client.health_check():
-                    print("MCP server is healthy")
-                    # List available tools
-                    tools = await client.list_tools()
-                    if tools:
-                        print(f"Found {len(tools)} MCP tools:")
-                        for tool in tools:
-                            print(f"  - {tool.name}: {tool.description}")
-                else:
-                    print("MCP server is not responding")
+            if await self.mcp_client.health_check():
+                print("MCP server is healthy")
+                # List available tools
+                tools = await self.mcp_client.list_tools()
+                # Let the model call MCP tools directly, without a discovery step
+                register_mcp_tools(self.agent, self.mcp_client, tools)
+                if tools:
+                    print(f"Found {len(tools)} MCP tools:")
+                    for tool in tools:
+                        print(f"  - {tool.name}: {tool.description}")
+            else:
+                print("MCP server is not responding")
         except Exception as e:
             print(f"MCP server check failed: {e}")
         
@@ -191,6 +177,22 @@ class ChatAgent:
         """Exit async context"""
         pass
     
+    def _history_for(self, message: str, context: Optional[ChatContext]) -> Tuple[List[Turn], List[ModelMessage]]:
+        """Earlier turns (at most MAX_CHAT_HISTORY) and the message history to run with"""
+        if not context:
+            return [], []
+        turns = context_turns(message, context.message_history[-config.MAX_CHAT_HISTORY:])
+        return turns, self.histories.build(context.session_id, turns)
+    
+    def _caller(self, context: Optional[ChatContext]) -> str:
+        return caller_key(context.user_id, context.session_id) if context else "anonymous"
+    
+    def _remember(self, message: str, reply: str, context: Optional[ChatContext],
+                  turns: List[Turn], messages: List[ModelMessage]) -> None:
+        if context:
+            turns = turns + [("user", message), ("assistant", reply)]
+            self.histories.remember(context.session_id, turns, "", messages)
+    
     async def chat(self, message: str, context: Optional[ChatContext] = None) -> str:
         """
         Process a chat message and return the response.
@@ -203,35 +205,20 @@ class ChatAgent:
             AI assistant's response
         """
         try:
-            # Build conversation history
-            messages = []
-            
-            if context and context.message_history:
-                # Include recent history (limited by MAX_CHAT_HISTORY)
-                recent_history = context.message_history[-config.MAX_CHAT_HISTORY:]
-                
-                # Convert history to the format expected by pydantic-ai
-                for msg in recent_history:
-                    role = msg.get("role", "user")
-                    content = msg.get("content", "")
-                    
-                    # Add messages in the format that maintains context
-                    if role == "user":
-                        messages.append(f"User: {content}")
-                    elif role == "assistant":
-                        messages.append(f"Assistant: {content}")
-            
-            # Add current message
-            messages.append(f"User: {message}")
-            
-            # Join all messages into a conversation
-            full_conversation = "\n\n".join(messages)
+            # Earlier turns as structured messages with a stable prefix
+            turns, history = self._history_for(message, context)
             
-            # Run the agent with the full conversation context
-            result = await self.agent.run(full_conversation)
+            # Run the agent with the conversation so far
+            result = await self.admission.call(
+                self._caller(context),
+                lambda: self.agent.run(message, message_history=history)
+            )
+            self._remember(message, result.data, context, turns, result.all_messages())
             
-            return result.output
+            return result.data
             
+        except AdmissionRejected:
+            raise
         except Exception as e:
             return f"I encountered an error: {str(e)}"
     
@@ -247,35 +234,24 @@ class ChatAgent:
             Chunks of the response as they're generated
         """
         try:
-            # Build conversation history
-            messages = []
-            
-            if context and context.message_history:
-                # Include recent history (limited by MAX_CHAT_HISTORY)
-                recent_history = context.message_history[-config.MAX_CHAT_HISTORY:]
-                
-                # Convert history to the format expected by pydantic-ai
-                for msg in recent_history:
-                    role = msg.get("role", "user")
-                    content = msg.get("content", "")
-                    
-                    # Add messages in the format that maintains context
-                    if role == "user":
-                        messages.append(f"User: {content}")
-                    elif role == "assistant":
-                        messages.append(f"Assistant: {content}")
-            
-            # Add current message
-            messages.append(f"User: {message}")
+            # Earlier turns as structured messages with a stable prefix
+            turns, history = self._history_for(message, context)
             
-            # Join all messages into a conversation
-            full_conversation = "\n\n".join(messages)
+            async def run():
+                # Use run_stream for streaming response
+                async with self.agent.run_stream(message, message_history=history) as stream:
+                    chunks = []
+                    async for chunk in stream.stream_text(delta=True):
+                        chunks.append(chunk)
+                        yield chunk
+                reply = "".join(chunks)
+                self._remember(message, reply, context, turns, stream.all_messages())
             
-            # Use run_stream for streaming response
-            async with self.agent.run_stream(full_conversation) as stream:
-                async for chunk in stream.stream():
-                    yield chunk
+            async for chunk in self.admission.stream(self._caller(context), run):
+                yield chunk
                 
+        except AdmissionRejected:
+            raise
         except Exception as e:
             yield f"I encountered an error: {str(e)}"
 
@@ -1,23 +1,38 @@
 """FastAPI backend for the chatbot"""
+import functools
+import math
 import os
 import uuid
 from datetime import datetime
 from typing import Optional, List
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Depends, Header
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Depends, Header, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, EmailStr
 
 from conversation_agent import get_conversation_agent as get_agent, ChatContext
 from database import ChatDatabase
+from context_manager import ContextManager
+from stream_output import CoalescingStream
+from turn_manager import TurnManager, UserTurnSlots
+from sse_stream import StreamTurns, parse_event_id, sse_events
+from admission import AdmissionRejected, get_admission_controller
+from mcp_client import get_mcp_client
 from config import config
 
 # Initialize database
 db = ChatDatabase()
+context_manager = ContextManager(db)
+
+# Concurrent WebSocket turns per user, shared by all connections
+turn_slots = UserTurnSlots()
+
+# SSE chat turns, kept for a while so clients can resume them
+stream_turns = StreamTurns()
 
 # Security
 security = HTTPBearer()
@@ -26,11 +41,18 @@ security = HTTPBearer()
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
+    await db.open()
     await db.init_db()
+    mcp_client = await get_mcp_client().open()
     agent = await get_agent()
-    async with agent:
-        yield
-    # Shutdown
+    try:
+        async with agent:
+            yield
+    finally:
+        # Shutdown
+        await stream_turns.aclose()
+        await mcp_client.aclose()
+        await db.close()
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -64,6 +86,7 @@ class SessionInfo(BaseModel):
     created_at: str
     updated_at: str
     message_count: int
+    last_message_at: Optional[str] = None
 
 # Authentication models
 class UserRegistration(BaseModel):
@@ -112,13 +135,7 @@ class PasswordResetConfirm(BaseModel):
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Optional[dict]:
     """Get current authenticated user from session token"""
     try:
-        session_token = credentials.credentials
-        user_id = await db.validate_session_token(session_token)
-        
-        if user_id:
-            user = await db.get_user_by_id(user_id)
-            return user
-        return None
+        return await db.get_session_user(credentials.credentials)
     except Exception:
         return None
 
@@ -153,17 +170,15 @@ async def chat(request: ChatRequest):
         # Save user message
         await db.add_message(session_id, "user", request.message)
         
-        # Get chat history
-        history = await db.get_session_messages(session_id)
-        
-        # Debug: Print history length
-        print(f"Debug: Retrieved {len(history)} messages for session {session_id}")
+        # Get budgeted chat history
+        session_context = await context_manager.get(session_id)
         
         # Create context
         context = ChatContext(
             user_id=user_id,
             session_id=session_id,
-            message_history=history
+            message_history=session_context.history(),
+            summary=session_context.summary
         )
         
         # Get response from agent
@@ -179,66 +194,88 @@ async def chat(request: ChatRequest):
             timestamp=datetime.utcnow().isoformat()
         )
         
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=429, detail=str(e),
+                            headers={"Retry-After": str(math.ceil(e.retry_after))})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def stream_turn(session_id: str, message: str, user_id: str, send) -> None:
+    """Run one chat turn, streaming the reply through ``send``"""
+    # Create session if new
+    await db.create_session(session_id, user_id)
+    
+    # Save user message
+    await db.add_message(session_id, "user", message)
+    
+    # Get budgeted chat history
+    session_context = await context_manager.get(session_id)
+    print(f"WebSocket: {len(session_context.messages)} messages (~{session_context.tokens} tokens) in context")
+    
+    # Create context
+    context = ChatContext(
+        user_id=user_id,
+        session_id=session_id,
+        message_history=session_context.history(),
+        summary=session_context.summary
+    )
+    
+    # Send typing indicator
+    await send({
+        "type": "typing",
+        "content": ""
+    })
+    
+    # Stream response, coalescing deltas into fewer frames
+    agent = await get_agent()
+    stream = CoalescingStream(send)
+    try:
+        async for chunk in agent.stream_chat(message, context):
+            await stream.write(chunk)
+        full_response = await stream.close()
+    finally:
+        await stream.abort()
+    
+    # Save complete response
+    await db.add_message(session_id, "assistant", full_response)
+    
+    # Send completion signal; the text has already been streamed
+    await send({
+        "type": "complete",
+        **stream.stats()
+    })
+
 @app.websocket("/ws/chat/{session_id}")
 async def websocket_chat(websocket: WebSocket, session_id: str):
-    """WebSocket endpoint for streaming chat"""
+    """WebSocket endpoint for streaming chat.
+    
+    Turns run concurrently: every frame carries the ``request_id`` of its
+    turn, and ``{"type": "cancel", "request_id": ...}`` stops a turn.
+    """
     await websocket.accept()
     print(f"WebSocket connected for session: {session_id}")
+    turns = TurnManager(websocket.send_json, turn_slots)
     
     try:
         while True:
             # Receive message
             data = await websocket.receive_json()
+            request_id = data.get("request_id")
+            
+            if data.get("type") == "cancel":
+                if not await turns.cancel(str(request_id)):
+                    await turns.sender(str(request_id))({
+                        "type": "error",
+                        "content": "No turn in progress with this request_id"
+                    })
+                continue
+            
             message = data.get("message", "")
             user_id = data.get("user_id", "anonymous")
             
             print(f"WebSocket received message: {message[:50]}...")
             
-            # Create session if new
-            await db.create_session(session_id, user_id)
-            
-            # Save user message
-            await db.add_message(session_id, "user", message)
-            
-            # Get chat history
-            history = await db.get_session_messages(session_id)
-            print(f"WebSocket: Retrieved {len(history)} messages for context")
-            
-            # Create context
-            context = ChatContext(
-                user_id=user_id,
-                session_id=session_id,
-                message_history=history
-            )
-            
-            # Send typing indicator
-            await websocket.send_json({
-                "type": "typing",
-                "content": ""
-            })
-            
-            # Stream response
-            agent = await get_agent()
-            full_response = ""
-            
-            async for chunk in agent.stream_chat(message, context):
-                full_response += chunk
-                await websocket.send_json({
-                    "type": "stream",
-                    "content": chunk
-                })
-            
-            # Save complete response
-            await db.add_message(session_id, "assistant", full_response)
-            
-            # Send completion signal
-            await websocket.send_json({
-                "type": "complete",
-                "content": full_response
-            })
+            await turns.start(user_id, functools.partial(stream_turn, session_id, message, user_id), request_id)
             
     except WebSocketDisconnect:
         print(f"WebSocket disconnected for session: {session_id}")
@@ -251,30 +288,99 @@ async def websocket_chat(websocket: WebSocket, session_id: str):
             })
         except:
             pass
+    finally:
+        # Nobody is left to read the replies
+        await turns.cancel_all()
+
+async def limited_turn(session_id: str, message: str, user_id: str, send) -> None:
+    """stream_turn, waiting for one of the user's turn slots first"""
+    if turn_slots.full(user_id):
+        await send({"type": "queued", "content": ""})
+    async with turn_slots.acquire(user_id):
+        await stream_turn(session_id, message, user_id, send)
+
+def event_stream(turn, after: int) -> StreamingResponse:
+    if not turn.available(after):
+        raise HTTPException(status_code=410, detail="Events after this id are no longer available")
+    return StreamingResponse(
+        sse_events(turn, after),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # Stop nginx from buffering the stream
+            "X-Turn-Id": turn.turn_id
+        }
+    )
+
+def resume_stream(last_event_id: str, turn_id: Optional[str] = None) -> StreamingResponse:
+    try:
+        event_turn_id, after = parse_event_id(last_event_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if turn_id is not None and event_turn_id != turn_id:
+        raise HTTPException(status_code=400, detail="Last-Event-ID belongs to another turn")
+    turn = stream_turns.get(event_turn_id)
+    if turn is None:
+        raise HTTPException(status_code=404, detail="Turn not found or expired")
+    return event_stream(turn, after)
+
+@app.post("/api/chat/stream")
+async def chat_stream(request: ChatRequest, last_event_id: Optional[str] = Header(None)):
+    """Stream a chat reply as Server-Sent Events.
+    
+    Event ids are ``<turn_id>:<seq>``. A request with a ``Last-Event-ID``
+    header continues that turn after the given event instead of starting a
+    new one; GET /api/chat/stream/{turn_id} does the same for EventSource.
+    """
+    if last_event_id:
+        return resume_stream(last_event_id)
+    
+    session_id = request.session_id or str(uuid.uuid4())
+    user_id = request.user_id or "anonymous"
+    
+    # The turn runs in the background, so it survives a dropped connection
+    turn = stream_turns.start(functools.partial(limited_turn, session_id, request.message, user_id))
+    response = event_stream(turn, 0)
+    response.headers["X-Session-Id"] = session_id
+    return response
+
+@app.get("/api/chat/stream/{turn_id}")
+async def resume_chat_stream(
+    turn_id: str,
+    last_event_id: Optional[str] = Header(None),
+    after: Optional[str] = Query(None, description="Event id to resume after, if no Last-Event-ID header")
+):
+    """Resume an SSE chat stream after the last event received"""
+    event_id = last_event_id or after
+    if event_id:
+        return resume_stream(event_id, turn_id)
+    turn = stream_turns.get(turn_id)
+    if turn is None:
+        raise HTTPException(status_code=404, detail="Turn not found or expired")
+    return event_stream(turn, 0)
 
 @app.get("/api/sessions/{user_id}", response_model=List[SessionInfo])
-async def get_user_sessions(user_id: str):
-    """Get all chat sessions for a user"""
+async def get_user_sessions(
+    user_id: str,
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None
+):
+    """Get a page of chat sessions for a user.
+    
+    The cursor for the next page is returned in the X-Next-Cursor header.
+    """
     try:
-        sessions = await db.get_user_sessions(user_id)
-        
-        # Add message count for each session
-        session_info = []
-        for session in sessions:
-            messages = await db.get_session_messages(session["session_id"])
-            session_info.append(
-                SessionInfo(
-                    session_id=session["session_id"],
-                    created_at=session["created_at"],
-                    updated_at=session["updated_at"],
-                    message_count=len(messages)
-                )
-            )
-        
-        return session_info
-        
+        sessions, next_cursor = await db.get_user_sessions(user_id, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    
+    return [SessionInfo(**session) for session in sessions]
 
 @app.get("/api/session/{session_id}/history")
 async def get_session_history(session_id: str):
@@ -446,6 +552,19 @@ async def verify_email(token: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/admission")
+async def admission_stats():
+    """Model call admission: in flight, queued, counters and queue times"""
+    return get_admission_controller().stats()
+
+@app.get("/api/response-cache")
+async def response_cache_stats():
+    """Response cache hit rates and the model time saved"""
+    agent = await get_agent()
+    if agent.responses is None:
+        return {"enabled": False}
+    return {"enabled": True, **agent.responses.stats()}
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
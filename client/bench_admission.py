@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Benchmark: a burst of chat calls against a rate-limited provider, with and without admission control"""
+import asyncio
+import time
+
+from admission import AdmissionController, TokenBucket
+
+USERS = 20
+CALLS_PER_USER = 10
+PROVIDER_RATE = 20  # Calls per second the simulated provider accepts
+PROVIDER_BURST = 5
+CALL_TIME = 0.05
+
+class RateLimitError(Exception):
+    status_code = 429
+
+class Provider:
+    def __init__(self):
+        self.bucket = TokenBucket(PROVIDER_RATE, PROVIDER_BURST)
+        self.accepted = 0
+        self.refused = 0
+
+    async def complete(self):
+        if self.bucket.delay(time.monotonic()) > 0:
+            self.refused += 1
+            raise RateLimitError("429 Too Many Requests")
+        self.bucket.take()
+        self.accepted += 1
+        await asyncio.sleep(CALL_TIME)
+        return "reply"
+
+async def run(label, call):
+    provider = Provider()
+    async def one(user):
+        try:
+            await call(user, provider.complete)
+            return True
+        except Exception:
+            return False
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*[one(f"user{u}") for u in range(USERS) for _ in range(CALLS_PER_USER)])
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} ok {sum(results):>3}/{len(results)}  429s {provider.refused:>4}  "
+          f"{elapsed:5.2f}s  {sum(results) / elapsed:5.1f} ok/s")
+
+async def main():
+    print(f"{USERS * CALLS_PER_USER} calls from {USERS} users; provider allows {PROVIDER_RATE}/s (burst {PROVIDER_BURST})\n")
+
+    async def unbounded(user, fn):
+        return await fn()
+    await run("Before (no admission control)", unbounded)
+
+    for label, rate in (("Admission, rate above provider", PROVIDER_RATE * 2),
+                        ("Admission, rate at provider", PROVIDER_RATE * 0.95)):
+        admission = AdmissionController(rate=rate, burst=PROVIDER_BURST, user_rate=0, max_concurrent=16,
+                                        max_queue=1000, queue_timeout=60, max_retries=5,
+                                        backoff_initial=0.2, backoff_max=2)
+        await run(label, lambda user, fn: admission.call(user, fn))
+        stats = admission.stats()
+        print(f"{'':<34} retries {stats['retries']}, queue p50 {stats['queue_ms']['p50']}ms, "
+              f"p95 {stats['queue_ms']['p95']}ms")
+
+if __name__ == "__main__":
+    asyncio.run(main())
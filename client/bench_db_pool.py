@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""Benchmark per-request database latency with and without the connection pool"""
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+import uuid
+
+from database import ChatDatabase
+
+CONCURRENCY = 32
+TURNS_PER_WORKER = 25
+
+async def chat_turn(db: ChatDatabase, session_id: str) -> float:
+    """Replay the database calls made by one /api/chat request"""
+    start = time.perf_counter()
+    await db.create_session(session_id, "bench-user")
+    await db.add_message(session_id, "user", "What is the weather like today?")
+    await db.get_session_messages(session_id)
+    await db.add_message(session_id, "assistant", "It is partly cloudy and 22 degrees.")
+    return time.perf_counter() - start
+
+async def worker(db: ChatDatabase, latencies: list):
+    session_id = str(uuid.uuid4())
+    for _ in range(TURNS_PER_WORKER):
+        latencies.append(await chat_turn(db, session_id))
+
+async def run(pooled: bool) -> list:
+    with tempfile.TemporaryDirectory() as tmp:
+        db = ChatDatabase(os.path.join(tmp, "bench.db"))
+        if pooled:
+            await db.open()
+        await db.init_db()
+
+        latencies = []
+        await asyncio.gather(*(worker(db, latencies) for _ in range(CONCURRENCY)))
+
+        await db.close()
+        return latencies
+
+def report(label: str, latencies: list):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{label:<22} requests={len(latencies):<5} "
+          f"mean={statistics.mean(latencies) * 1000:7.2f}ms "
+          f"p50={statistics.median(latencies) * 1000:7.2f}ms "
+          f"p95={p95 * 1000:7.2f}ms")
+
+async def main():
+    print(f"Simulating {CONCURRENCY} concurrent sessions x {TURNS_PER_WORKER} chat turns\n")
+    report("connect per call", await run(pooled=False))
+    report("connection pool", await run(pooled=True))
+
+if __name__ == "__main__":
+    asyncio.run(main())
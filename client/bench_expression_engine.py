@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""Benchmark the calculator: eval with a rebuilt safe_dict vs the compiled expression engine"""
+import math
+import random
+import time
+
+from expression_engine import compile_expression, evaluate
+
+CALLS = 20000
+
+EXPRESSIONS = ["2 + 2", "sqrt(16) + 2**10", "round(pi * 3.5**2, 2)", "(1 + 0.05)**12 * 1000",
+               "max(3, 7, 2) / min(4, 9)", "sin(pi / 4) * cos(pi / 4)"]
+
+def eval_path(expression: str):
+    """The calculator as it was: a fresh safe_dict and eval for every call"""
+    safe_dict = {
+        'abs': abs, 'round': round, 'min': min, 'max': max,
+        'sum': sum, 'pow': pow, 'sqrt': math.sqrt,
+        'sin': math.sin, 'cos': math.cos, 'tan': math.tan,
+        'pi': math.pi, 'e': math.e
+    }
+    return eval(expression, {"__builtins__": {}}, safe_dict)
+
+def timed(label: str, func, inputs) -> float:
+    start = time.perf_counter()
+    for item in inputs:
+        func(item)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<36} {len(inputs) / elapsed:10.0f} evals/s")
+    return elapsed
+
+def main():
+    print(f"{CALLS} evaluations per case\n")
+
+    repeated = [random.choice(EXPRESSIONS) for _ in range(CALLS)]
+    base = timed("repeated expressions: eval", eval_path, repeated)
+    engine = timed("repeated expressions: engine", evaluate, repeated)
+    print(f"{'':<36} {base / engine:10.1f}x\n")
+
+    distinct = [f"{i} * 1.5 + sqrt({i})" for i in range(CALLS)]
+    base = timed("distinct expressions: eval", eval_path, distinct)
+    engine = timed("distinct expressions: engine", evaluate, distinct)
+    print(f"{'':<36} {base / engine:10.1f}x\n")
+
+    values = [random.uniform(0, 100) for _ in range(CALLS)]
+    base = timed("vectorized over inputs: eval", lambda x: eval_path(f"{x!r}**2 / 3 + sqrt({x!r})"), values)
+    compiled = compile_expression("x**2 / 3 + sqrt(x)")
+    start = time.perf_counter()
+    compiled.evaluate_many([{"x": x} for x in values])
+    engine = time.perf_counter() - start
+    print(f"{'vectorized over inputs: evaluate_many':<36} {len(values) / engine:10.0f} evals/s")
+    print(f"{'':<36} {base / engine:10.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Benchmark login latency and streaming stalls during a login burst.
+
+Compares hashing on the event loop with the bounded KDF worker pool while
+simulated WebSocket streams emit a chunk every few milliseconds.
+"""
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from database import ChatDatabase
+
+USERS = 16
+LOGINS = 32
+STREAMS = 32
+CHUNK_INTERVAL = 0.005
+
+def p99(samples):
+    return statistics.quantiles(samples, n=100)[98]
+
+async def stream(stop: asyncio.Event, stalls: list):
+    """Emit chunks on a fixed cadence and record how late each one is"""
+    while not stop.is_set():
+        expected = time.perf_counter() + CHUNK_INTERVAL
+        await asyncio.sleep(CHUNK_INTERVAL)
+        stalls.append(max(0.0, time.perf_counter() - expected))
+
+async def run(db: ChatDatabase, offload: bool):
+    if not offload:
+        # Hash on the event loop, as the previous implementation did
+        hasher = db.passwords
+        async def verify_inline(password, stored_hash):
+            return hasher.verify_sync(password, stored_hash)
+        db.passwords.verify, original = verify_inline, db.passwords.verify
+
+    stop = asyncio.Event()
+    stalls = []
+    streams = [asyncio.create_task(stream(stop, stalls)) for _ in range(STREAMS)]
+    await asyncio.sleep(0.1)
+
+    async def login(i: int):
+        start = time.perf_counter()
+        user = await db.authenticate_user(f"user{i % USERS}@example.com", "password123")
+        assert user is not None
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(login(i) for i in range(LOGINS)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await asyncio.gather(*streams)
+
+    if not offload:
+        db.passwords.verify = original
+    return latencies, stalls, elapsed
+
+async def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = ChatDatabase(os.path.join(tmp, "bench.db"))
+        await db.open()
+        await db.init_db()
+        for i in range(USERS):
+            await db.create_user(f"user{i}@example.com", "password123")
+
+        print(f"{LOGINS} logins, {STREAMS} streams, {db.passwords.algorithm} "
+              f"({db.passwords.pbkdf2_iterations} iterations), {db.passwords.max_workers} workers")
+        for label, offload in (("on event loop", False), ("worker pool", True)):
+            latencies, stalls, elapsed = await run(db, offload)
+            print(f"{label:14} login p50 {statistics.median(latencies) * 1000:8.1f}ms  "
+                  f"p99 {p99(latencies) * 1000:8.1f}ms  "
+                  f"stream stall p99 {p99(stalls) * 1000:8.1f}ms  max {max(stalls) * 1000:8.1f}ms  "
+                  f"total {elapsed:5.2f}s")
+
+        await db.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Benchmark MCP tool-call latency with and without a pooled connection.
+
+Starts a minimal JSON-RPC endpoint with uvicorn on localhost, then compares
+a fresh client per call (connect + close every time) with the shared
+keep-alive pool from get_mcp_client().
+"""
+import asyncio
+import socket
+import statistics
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+
+from mcp_client import MCPClient
+
+CALLS = 500
+CONCURRENCY = 20
+
+server_app = FastAPI()
+
+@server_app.post("/mcp/")
+async def mcp_endpoint(request: Request):
+    body = await request.json()
+    return {"jsonrpc": "2.0", "id": body["id"], "result": {"content": [{"type": "text", "text": "ok"}]}}
+
+def start_server() -> str:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(server_app, host="127.0.0.1", port=port, log_level="error"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}"
+
+async def unpooled_call(base_url: str) -> float:
+    start = time.perf_counter()
+    async with MCPClient(base_url) as client:
+        await client.call_tool("echo", {"text": "hi"})
+    return time.perf_counter() - start
+
+async def pooled_call(client: MCPClient) -> float:
+    start = time.perf_counter()
+    await client.call_tool("echo", {"text": "hi"})
+    return time.perf_counter() - start
+
+async def run(call) -> list:
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    async def limited():
+        async with semaphore:
+            return await call()
+    return await asyncio.gather(*(limited() for _ in range(CALLS)))
+
+def report(label: str, latencies: list, elapsed: float):
+    latencies = sorted(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"{label:<20} mean={statistics.mean(latencies) * 1000:6.2f}ms "
+          f"p50={statistics.median(latencies) * 1000:6.2f}ms p99={p99 * 1000:6.2f}ms "
+          f"throughput={len(latencies) / elapsed:7.0f} calls/s")
+
+async def main():
+    base_url = start_server()
+    print(f"{CALLS} tool calls, {CONCURRENCY} concurrent\n")
+
+    start = time.perf_counter()
+    latencies = await run(lambda: unpooled_call(base_url))
+    report("client per call", latencies, time.perf_counter() - start)
+
+    client = await MCPClient(base_url).open()
+    await pooled_call(client)  # Warm the pool
+    start = time.perf_counter()
+    latencies = await run(lambda: pooled_call(client))
+    report("pooled keep-alive", latencies, time.perf_counter() - start)
+    await client.aclose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
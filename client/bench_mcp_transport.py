@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""Benchmark per-call overhead of the MCP transports against a running server.
+
+Start the MCP server first (cd server && python mcp_server.py), then run
+    python bench_mcp_transport.py [base_url]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+from config import config
+from mcp_client import MCPClient
+
+SEQUENTIAL_CALLS = 200
+CONCURRENT_CALLS = 400
+TOOL = ("calculator", {"expression": "2 + 3 * 4"})
+
+async def bench(base_url: str, transport: str):
+    client = await MCPClient(base_url, transport=transport).open()
+    result = await client.call_tool(*TOOL)  # Connect (and handshake) before timing
+    assert "error" not in result, result
+
+    latencies = []
+    for _ in range(SEQUENTIAL_CALLS):
+        start = time.perf_counter()
+        await client.call_tool(*TOOL)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    results = await client.call_tools_batch([TOOL] * CONCURRENT_CALLS)
+    elapsed = time.perf_counter() - start
+    assert all("error" not in result for result in results)
+
+    await client.aclose()
+    latencies.sort()
+    print(f"{transport:<5} sequential p50={statistics.median(latencies) * 1000:6.2f}ms "
+          f"p99={latencies[int(len(latencies) * 0.99) - 1] * 1000:6.2f}ms   "
+          f"concurrent {CONCURRENT_CALLS / elapsed:7.0f} calls/s")
+
+async def main():
+    base_url = sys.argv[1] if len(sys.argv) > 1 else f"http://{config.MCP_SERVER_HOST}:{config.MCP_SERVER_PORT}"
+    print(f"MCP server {base_url}: {SEQUENTIAL_CALLS} sequential calls, {CONCURRENT_CALLS} concurrent\n")
+    await bench(base_url, "http")
+    await bench(base_url, "sse")
+
+if __name__ == "__main__":
+    asyncio.run(main())
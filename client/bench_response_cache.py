@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Benchmark: repeated prompts with and without the response cache"""
+import asyncio
+import random
+import time
+
+from response_cache import ResponseCache, context_fingerprint
+
+REQUESTS = 2000
+QUESTIONS = 300
+MODEL_LATENCY = 0.8  # Simulated seconds per model call; not slept, only accounted
+DIMENSIONS = 1536  # text-embedding-3-small
+
+def workload(seed=1):
+    """Prompts drawn from a long-tailed distribution, as in real chat traffic"""
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(QUESTIONS)]
+    prompts = rng.choices([f"Question number {q}?" for q in range(QUESTIONS)], weights, k=REQUESTS)
+    # Users vary case and spacing
+    return [p.lower() if rng.random() < 0.3 else p.replace(" ", "  ") if rng.random() < 0.2 else p
+            for p in prompts]
+
+def fake_embedder():
+    vectors = {}
+    async def embed(text):
+        if text not in vectors:
+            rng = random.Random(text)
+            vectors[text] = [rng.gauss(0, 1) for _ in range(DIMENSIONS)]
+        return vectors[text]
+    return embed
+
+async def run(label, cache):
+    empty = context_fingerprint("", [])
+    model_time, lookup_time = 0.0, 0.0
+    for prompt in workload():
+        if cache is None:
+            model_time += MODEL_LATENCY
+            continue
+        start = time.perf_counter()
+        lookup = await cache.get(prompt, empty)
+        lookup_time += time.perf_counter() - start
+        if lookup.response is None:
+            model_time += MODEL_LATENCY
+            cache.put(lookup, f"Answer to {prompt}", 3600)
+    total = model_time + lookup_time
+    stats = cache.stats() if cache is not None else {"hit_rate": 0.0}
+    print(f"{label:<26} hit rate {stats['hit_rate']:6.1%}  model calls {model_time / MODEL_LATENCY:5.0f}  "
+          f"mean latency {total / REQUESTS * 1000:6.1f}ms  lookup {lookup_time / REQUESTS * 1e6:7.1f}µs")
+
+async def main():
+    print(f"{REQUESTS} prompts over {QUESTIONS} questions, {MODEL_LATENCY * 1000:.0f}ms per model call\n")
+    await run("No cache", None)
+    await run("Exact tier", ResponseCache(maxsize=2000, ttl=3600))
+    await run(f"Exact + semantic ({DIMENSIONS}d)", ResponseCache(maxsize=2000, ttl=3600, embed=fake_embedder()))
+
+if __name__ == "__main__":
+    asyncio.run(main())
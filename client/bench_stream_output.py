@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Benchmark WebSocket response streaming: one frame per delta vs the coalescing stream"""
+import asyncio
+import json
+import time
+
+from stream_output import CoalescingStream
+
+TOKENS = 4000
+BURST = 8  # Deltas that arrive together from the provider
+
+class FakeWebSocket:
+    """Counts frames and bytes the way Starlette's send_json encodes them"""
+
+    def __init__(self):
+        self.frames = 0
+        self.bytes = 0
+
+    async def send_json(self, data):
+        text = json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+        self.frames += 1
+        self.bytes += len(text.encode("utf-8"))
+        await asyncio.sleep(0)
+
+async def model_stream():
+    for i in range(TOKENS):
+        yield f" word{i % 50}"
+        if i % BURST == 0:
+            await asyncio.sleep(0.0005)
+
+async def per_delta(websocket: FakeWebSocket):
+    """websocket_chat as it was"""
+    full_response = ""
+    async for chunk in model_stream():
+        full_response += chunk
+        await websocket.send_json({"type": "stream", "content": chunk})
+    await websocket.send_json({"type": "complete", "content": full_response})
+
+async def coalesced(websocket: FakeWebSocket):
+    stream = CoalescingStream(websocket.send_json)
+    async for chunk in model_stream():
+        await stream.write(chunk)
+    await stream.close()
+    await websocket.send_json({"type": "complete", **stream.stats()})
+
+async def main():
+    print(f"{TOKENS} streamed deltas\n")
+    for label, run in (("frame per delta", per_delta), ("coalescing stream", coalesced)):
+        websocket = FakeWebSocket()
+        cpu, wall = time.process_time(), time.perf_counter()
+        await run(websocket)
+        cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+        print(f"{label:<18} frames={websocket.frames:5d}  bytes={websocket.bytes:7d}  "
+              f"bytes/token={websocket.bytes / TOKENS:5.1f}  cpu/token={cpu / TOKENS * 1e6:6.1f}µs  wall={wall:.2f}s")
+
+if __name__ == "__main__":
+    asyncio.run(main())
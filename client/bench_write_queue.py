@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""Benchmark chat message persistence: commit per message vs the write-behind queue"""
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+import uuid
+
+from database import ChatDatabase
+
+SESSIONS = 64
+TURNS = 20
+
+async def session(db: ChatDatabase, db_times: list):
+    """Replay the database calls of WebSocket chat turns, with model time in between"""
+    session_id = str(uuid.uuid4())
+    await db.create_session(session_id, "bench-user")
+    for _ in range(TURNS):
+        start = time.perf_counter()
+        await db.add_message(session_id, "user", "What is the weather like today?")
+        await db.get_session_messages(session_id)
+        db_time = time.perf_counter() - start
+
+        await asyncio.sleep(random.uniform(0.005, 0.02))  # Streaming the reply
+
+        start = time.perf_counter()
+        await db.add_message(session_id, "assistant", "It is partly cloudy and 22 degrees.")
+        db_times.append(db_time + time.perf_counter() - start)
+
+async def run(queued: bool):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = ChatDatabase(os.path.join(tmp, "bench.db"))
+        await db.open()
+        await db.init_db()
+        if not queued:
+            # Without the background flusher every message commits on its own
+            await db._messages.stop()
+
+        db_times = []
+        start = time.perf_counter()
+        await asyncio.gather(*(session(db, db_times) for _ in range(SESSIONS)))
+        elapsed = time.perf_counter() - start
+        await db.close()
+        return db_times, elapsed
+
+async def main():
+    print(f"{SESSIONS} concurrent sessions x {TURNS} turns\n")
+    for label, queued in (("commit per message", False), ("write-behind queue", True)):
+        db_times, elapsed = await run(queued)
+        db_times.sort()
+        p95 = db_times[int(len(db_times) * 0.95) - 1]
+        messages = SESSIONS * TURNS * 2
+        print(f"{label:<20} db time per turn mean={statistics.mean(db_times) * 1000:7.2f}ms "
+              f"p95={p95 * 1000:7.2f}ms  throughput={messages / elapsed:8.0f} msg/s")
+
+if __name__ == "__main__":
+    asyncio.run(main())
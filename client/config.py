@@ -26,6 +26,15 @@ class Config:
     MCP_SERVER_HOST = os.getenv("MCP_SERVER_HOST", "localhost")
     MCP_SERVER_PORT = int(os.getenv("MCP_SERVER_PORT", 8001))
     MCP_SERVER_URL = f"http://{MCP_SERVER_HOST}:{MCP_SERVER_PORT}/mcp"
+    MCP_MAX_CONNECTIONS = int(os.getenv("MCP_MAX_CONNECTIONS", 100))
+    MCP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("MCP_MAX_KEEPALIVE_CONNECTIONS", 20))  # Idle connections kept open
+    MCP_KEEPALIVE_EXPIRY = float(os.getenv("MCP_KEEPALIVE_EXPIRY", 30))
+    MCP_HTTP2 = os.getenv("MCP_HTTP2", "true").lower() == "true"  # Used only if httpx[http2] is installed
+    MCP_TOOLS_CACHE_TTL = float(os.getenv("MCP_TOOLS_CACHE_TTL", 300))  # Seconds before the tool catalog is revalidated
+    MCP_MAX_CONCURRENT_CALLS = int(os.getenv("MCP_MAX_CONCURRENT_CALLS", 16))  # Tool calls in flight per client
+    MCP_TRANSPORT = os.getenv("MCP_TRANSPORT", "http")  # http (one POST per call) or sse (one long-lived session)
+    MCP_SSE_BACKOFF_INITIAL = float(os.getenv("MCP_SSE_BACKOFF_INITIAL", 0.5))  # Seconds before the first reconnect
+    MCP_SSE_BACKOFF_MAX = float(os.getenv("MCP_SSE_BACKOFF_MAX", 30))
     
     # FastAPI settings
     APP_HOST = os.getenv("APP_HOST", "0.0.0.0")
@@ -33,9 +42,56 @@ class Config:
     
     # Database settings
     DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./chat_history.db")
+    DB_POOL_READERS = int(os.getenv("DB_POOL_READERS", 4))  # Read connections; writes share one connection
+    DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", 5000))
+    
+    # Authentication cache settings
+    AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", 30))  # Seconds a validated session token is trusted
+    AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", 10000))
+    SESSION_ACTIVITY_FLUSH_INTERVAL = float(os.getenv("SESSION_ACTIVITY_FLUSH_INTERVAL", 30))  # Seconds between last_used_at writes
+    MESSAGE_FLUSH_INTERVAL = float(os.getenv("MESSAGE_FLUSH_INTERVAL", 0.05))  # Max seconds a chat message waits before commit
+    MESSAGE_FLUSH_MAX_BATCH = int(os.getenv("MESSAGE_FLUSH_MAX_BATCH", 500))
+    PASSWORD_KDF = os.getenv("PASSWORD_KDF", "pbkdf2_sha256")  # pbkdf2_sha256 or scrypt
+    PBKDF2_ITERATIONS = int(os.getenv("PBKDF2_ITERATIONS", 600000))
+    SCRYPT_N = int(os.getenv("SCRYPT_N", 2 ** 15))
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 4))  # Threads reserved for password hashing
     
     # Chat settings
     MAX_CHAT_HISTORY = 50  # Maximum messages to keep in context
+    CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 3000))  # Estimated tokens of history per prompt
+    CONTEXT_LOW_WATER = float(os.getenv("CONTEXT_LOW_WATER", 0.6))  # Evict down to this fraction of the budget
+    CONTEXT_SUMMARY_TOKENS = int(os.getenv("CONTEXT_SUMMARY_TOKENS", 400))
+    CONTEXT_CACHE_SIZE = int(os.getenv("CONTEXT_CACHE_SIZE", 1000))  # Sessions whose context is kept in memory
+    CONTEXT_CACHE_TTL = float(os.getenv("CONTEXT_CACHE_TTL", 3600))
+    STREAM_FLUSH_INTERVAL = float(os.getenv("STREAM_FLUSH_INTERVAL", 0.05))  # Max seconds a streamed delta waits to be sent
+    STREAM_FLUSH_CHARS = int(os.getenv("STREAM_FLUSH_CHARS", 512))  # Send at once when this much text is waiting
+    STREAM_MAX_PENDING_CHARS = int(os.getenv("STREAM_MAX_PENDING_CHARS", 65536))  # Unsent text before the stream waits for the client
+    MAX_TURNS_PER_CONNECTION = int(os.getenv("MAX_TURNS_PER_CONNECTION", 8))  # Open (running or queued) turns per WebSocket
+    MAX_CONCURRENT_TURNS_PER_USER = int(os.getenv("MAX_CONCURRENT_TURNS_PER_USER", 2))  # Turns a user can stream at once
+    SSE_REPLAY_EVENTS = int(os.getenv("SSE_REPLAY_EVENTS", 256))  # Events per turn kept for resuming an SSE stream
+    SSE_TURN_TTL = float(os.getenv("SSE_TURN_TTL", 300))  # Seconds a finished SSE turn stays resumable
+    SSE_MAX_TURNS = int(os.getenv("SSE_MAX_TURNS", 1000))  # Finished SSE turns kept for resuming
+    SSE_KEEPALIVE = float(os.getenv("SSE_KEEPALIVE", 15))  # Seconds between pings on an idle SSE stream
+    
+    # Model provider admission control
+    LLM_MAX_CONCURRENT = int(os.getenv("LLM_MAX_CONCURRENT", 16))  # Model calls in flight at once
+    LLM_RATE = float(os.getenv("LLM_RATE", 5))  # Model calls per second, all users (0 = unlimited)
+    LLM_BURST = float(os.getenv("LLM_BURST", 10))
+    LLM_USER_RATE = float(os.getenv("LLM_USER_RATE", 0.5))  # Model calls per second per user (0 = unlimited)
+    LLM_USER_BURST = float(os.getenv("LLM_USER_BURST", 3))
+    LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", 100))  # Calls waiting for admission before new ones are rejected
+    LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", 30))  # Max seconds a call waits for admission
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 3))  # Retries after a provider rate-limit (429) response
+    LLM_BACKOFF_INITIAL = float(os.getenv("LLM_BACKOFF_INITIAL", 1))  # Seconds before the first retry, doubled each time
+    LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", 30))
+    
+    # Response cache
+    RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "false").lower() == "true"
+    RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", 2000))
+    RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", 3600))  # Seconds; tools may shorten it per reply
+    RESPONSE_CACHE_SEMANTIC = os.getenv("RESPONSE_CACHE_SEMANTIC", "false").lower() == "true"  # Also match similar prompts by embedding
+    RESPONSE_CACHE_EMBEDDING_MODEL = os.getenv("RESPONSE_CACHE_EMBEDDING_MODEL", "text-embedding-3-small")
+    RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", 0.92))  # Min cosine similarity for a semantic hit
     SYSTEM_PROMPT = """You are a helpful AI assistant with access to various tools.
 
 LOCAL TOOLS:
@@ -45,15 +101,14 @@ LOCAL TOOLS:
 - save_note/get_notes: Save and retrieve notes
 
 MCP SERVER TOOLS:
-- call_mcp_tool: Call tools from the MCP server (use tool_name parameter)
+- The MCP server's tools (tasks, reminders, URL shortener, text analysis, unit conversion and more) are available directly by name; call them like any other tool
 - list_mcp_tools: List all available MCP server tools
+- call_mcp_tool: Call an MCP server tool by name (use tool_name parameter), or pass several independent calls in its calls list to run them at once
 
-To use MCP tools, first call list_mcp_tools to see what's available, then use call_mcp_tool with the appropriate tool_name.
+Only use list_mcp_tools and call_mcp_tool if a tool you need is not already available by name.
 
 IMPORTANT: You are having a continuous conversation with the user. Remember what they told you earlier in the conversation.
-The conversation history is provided in the format:
-User: [their message]
-Assistant: [your previous response]
+Earlier turns are included as previous messages; older turns may be given as a summary of earlier conversation.
 
 Always maintain context from previous messages and refer back to earlier parts of the conversation when relevant.
 Be concise but friendly in your responses."""
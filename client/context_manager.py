@@ -0,0 +1,122 @@
+"""Token-budgeted, incremental conversation context per chat session"""
+import asyncio
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional
+
+from cache import TTLCache
+from config import config
+from database import ChatDatabase
+
+# Per-message overhead for role labels and separators
+MESSAGE_OVERHEAD_TOKENS = 4
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English text)"""
+    return (len(text) + 3) // 4
+
+def message_tokens(message: Dict) -> int:
+    return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+def extractive_summary(summary: str, evicted: List[Dict], max_tokens: int) -> str:
+    """Fold evicted messages into the summary as one short line each.
+
+    Keeps the first sentence (at most 160 characters) of every message and
+    drops the oldest lines once the summary exceeds max_tokens. No model call.
+    """
+    lines = summary.splitlines() if summary else []
+    for message in evicted:
+        text = " ".join(message["content"].split())
+        first = text.split(". ")[0][:160]
+        if len(first) < len(text):
+            first += "..."
+        lines.append(f"- {message['role'].capitalize()}: {first}")
+    while lines and estimate_tokens("\n".join(lines)) > max_tokens:
+        lines.pop(0)
+    return "\n".join(lines)
+
+class SessionContext:
+    """The messages currently in a session's prompt and their running token count"""
+
+    def __init__(self, summary: str = "", last_id: int = 0):
+        self.messages: Deque[Dict] = deque()
+        self.tokens = 0
+        self.summary = summary
+        self.last_id = last_id
+        self.lock = asyncio.Lock()
+
+    def append(self, message: Dict) -> None:
+        self.messages.append(message)
+        self.tokens += message["tokens"]
+        self.last_id = max(self.last_id, message["id"])
+
+    def popleft(self) -> Dict:
+        message = self.messages.popleft()
+        self.tokens -= message["tokens"]
+        return message
+
+    def history(self) -> List[Dict[str, str]]:
+        """Messages in ChatContext.message_history form"""
+        return [{"role": message["role"], "content": message["content"]} for message in self.messages]
+
+class ContextManager:
+    """Keeps each session's prompt context within a token budget.
+
+    Each turn only fetches messages newer than the last one already held, so
+    a warm session reads a couple of rows however long it is. When the
+    running token count exceeds the budget, the oldest messages are folded
+    into a rolling summary until the count drops to the low-water mark; the
+    gap between the two marks means eviction (and the summary write) happens
+    once every several turns rather than on every turn. The summary is
+    stored on the session, so a cold start reads it plus the newest rows.
+    """
+
+    def __init__(self, db: ChatDatabase,
+                 token_budget: int = config.CONTEXT_TOKEN_BUDGET,
+                 low_water: float = config.CONTEXT_LOW_WATER,
+                 summary_tokens: int = config.CONTEXT_SUMMARY_TOKENS,
+                 max_fetch: int = config.MAX_CHAT_HISTORY,
+                 summarize: Callable[[str, List[Dict], int], str] = extractive_summary,
+                 max_sessions: int = config.CONTEXT_CACHE_SIZE):
+        self.db = db
+        self.token_budget = token_budget
+        self.low_water_tokens = int(token_budget * low_water)
+        self.summary_tokens = summary_tokens
+        self.max_fetch = max_fetch
+        self.summarize = summarize
+        # A single message may use at most half the budget
+        self.max_message_tokens = token_budget // 2
+        self._sessions = TTLCache(maxsize=max_sessions, ttl=config.CONTEXT_CACHE_TTL)
+
+    async def get(self, session_id: str) -> SessionContext:
+        """Bring the session's context up to date and return it"""
+        state: Optional[SessionContext] = self._sessions.get(session_id)
+        if state is None:
+            summary, upto_id = await self.db.get_context_summary(session_id)
+            state = SessionContext(summary, upto_id)
+            self._sessions.set(session_id, state)
+
+        async with state.lock:
+            new_messages = await self.db.get_messages_after(session_id, state.last_id, self.max_fetch)
+            for message in new_messages:
+                state.append(self._budgeted(message))
+            if state.tokens > self.token_budget:
+                await self._evict(session_id, state)
+        return state
+
+    def _budgeted(self, message: Dict) -> Dict:
+        content = message["content"]
+        max_chars = self.max_message_tokens * 4
+        if len(content) > max_chars:
+            content = content[:max_chars] + "..."
+        message = {"id": message["id"], "role": message["role"], "content": content}
+        message["tokens"] = message_tokens(message)
+        return message
+
+    async def _evict(self, session_id: str, state: SessionContext) -> None:
+        evicted = []
+        # Always keep the newest message
+        while state.tokens > self.low_water_tokens and len(state.messages) > 1:
+            evicted.append(state.popleft())
+        if evicted:
+            state.summary = self.summarize(state.summary, evicted, self.summary_tokens)
+            await self.db.save_context_summary(session_id, state.summary, evicted[-1]["id"])
@@ -1,19 +1,31 @@
 """Conversation-aware agent that maintains chat history"""
 import os
 import httpx
-import math
 import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from pydantic_ai import Agent, RunContext
+from pydantic_ai.messages import ModelMessage
 from pydantic import BaseModel
 from config import config
-from mcp_client import MCPClient
+from mcp_client import get_mcp_client
+from mcp_tools import register_mcp_tools
+from expression_engine import calculate
+from message_history import MessageHistoryCache, Turn, context_turns, render_messages
+from admission import AdmissionRejected, caller_key, get_admission_controller
+from response_cache import (Lookup, ResponseCache, cache_ttl, context_fingerprint, openai_embedder,
+                            tools_called)
 
 class ChatContext(BaseModel):
     """Context for chat conversations"""
     user_id: str
     session_id: str
     message_history: List[Dict[str, str]] = []
+    summary: str = ""  # Rolling summary of messages no longer in message_history
+
+class MCPToolCall(BaseModel):
+    """One call in a batched call_mcp_tool request"""
+    tool_name: str
+    arguments: Dict[str, Any] = {}
 
 class ConversationAgent:
     """Chatbot agent that maintains conversation history"""
@@ -26,19 +38,14 @@ class ConversationAgent:
             model_string = f"openai:{config.DEFAULT_MODEL}"
         
         # Initialize the agent
+        self.system_prompt = config.SYSTEM_PROMPT
         self.agent = Agent(
             model_string,
-            system_prompt=config.SYSTEM_PROMPT
-        )
-        
-        # HTTP client for MCP server
-        self.http_client = httpx.AsyncClient(
-            base_url=f"http://{config.MCP_SERVER_HOST}:{config.MCP_SERVER_PORT}",
-            timeout=30.0
+            system_prompt=self.system_prompt
         )
         
-        # MCP client for accessing MCP tools
-        self.mcp_client = MCPClient(base_url=f"http://{config.MCP_SERVER_HOST}:{config.MCP_SERVER_PORT}")
+        # Shared MCP client; its connection pool is closed by the app lifespan
+        self.mcp_client = get_mcp_client()
         
         # Register all tools
         self._register_tools()
@@ -46,6 +53,17 @@ class ConversationAgent:
         # Storage for notes and conversation state
         self.notes_storage = {}
         self.conversation_state = {}
+        
+        # Per-session model messages, reused across turns
+        self.histories = MessageHistoryCache(self.system_prompt)
+        
+        # Rate limits and queueing for model calls, shared by all agents
+        self.admission = get_admission_controller()
+        
+        # Replies to repeated prompts from the same caller in the same context
+        self.responses: Optional[ResponseCache] = None
+        if config.RESPONSE_CACHE_ENABLED:
+            self.responses = ResponseCache(embed=openai_embedder() if config.RESPONSE_CACHE_SEMANTIC else None)
     
     def _register_tools(self):
         """Register all tools with the agent"""
@@ -54,25 +72,7 @@ class ConversationAgent:
         @self.agent.tool
         async def calculator(ctx: RunContext[None], expression: str) -> Dict[str, Any]:
             """Evaluate mathematical expressions safely."""
-            try:
-                safe_dict = {
-                    'abs': abs, 'round': round, 'min': min, 'max': max,
-                    'sum': sum, 'pow': pow, 'sqrt': math.sqrt,
-                    'sin': math.sin, 'cos': math.cos, 'tan': math.tan,
-                    'pi': math.pi, 'e': math.e
-                }
-                result = eval(expression, {"__builtins__": {}}, safe_dict)
-                return {
-                    "success": True,
-                    "expression": expression,
-                    "result": result
-                }
-            except Exception as e:
-                return {
-                    "success": False,
-                    "expression": expression,
-                    "error": str(e)
-                }
+            return calculate(expression)
         
         @self.agent.tool
         async def get_current_time(ctx: RunContext[None], timezone: str = "UTC") -> Dict[str, str]:
@@ -193,13 +193,27 @@ class ConversationAgent:
                 }
         
         @self.agent.tool
-        async def call_mcp_tool(ctx: RunContext[None], tool_name: str, arguments: Dict[str, Any] = {}) -> Dict[str, Any]:
-            """Call a tool from the MCP server.
+        async def call_mcp_tool(ctx: RunContext[None], tool_name: str = "", arguments: Dict[str, Any] = {},
+                                calls: List[MCPToolCall] = []) -> Dict[str, Any]:
+            """Call a tool from the MCP server, or several at once.
             
             Args:
                 tool_name: Name of the MCP tool to call
                 arguments: Arguments to pass to the tool
+                calls: Several independent tool calls to run concurrently instead of one
             """
+            if calls:
+                results = await agent.mcp_client.call_tools_batch(
+                    [(call.tool_name, call.arguments) for call in calls]
+                )
+                return {
+                    "success": True,
+                    "results": [
+                        {"tool_name": call.tool_name, "result": result}
+                        for call, result in zip(calls, results)
+                    ]
+                }
+            
             try:
                 result = await agent.mcp_client.call_tool(tool_name, arguments)
                 return {
@@ -214,46 +228,62 @@ class ConversationAgent:
                     "error": f"Failed to call MCP tool: {str(e)}"
                 }
     
-    def _build_context_prompt(self, message: str, context: Optional[ChatContext] = None) -> str:
-        """Build a prompt that includes conversation context."""
-        if not context or not context.message_history:
-            return message
-        
-        # Get recent conversation summary
-        recent_messages = context.message_history[-10:]  # Last 10 messages
+    def _history_for(self, message: str, context: Optional[ChatContext]) -> Tuple[List[Turn], List[ModelMessage]]:
+        """Earlier turns and the message history to run the current message with.
         
-        # Build context summary
-        context_parts = []
-        
-        # Add conversation summary
-        if recent_messages:
-            context_parts.append("Recent conversation context:")
-            for msg in recent_messages[-6:]:  # Show last 3 exchanges
-                role = msg.get("role", "user")
-                content = msg.get("content", "")[:100]  # Truncate long messages
-                if len(msg.get("content", "")) > 100:
-                    content += "..."
-                context_parts.append(f"{role.capitalize()}: {content}")
-        
-        # Add current message
-        context_parts.append(f"\nCurrent message: {message}")
-        
-        # Add instruction to maintain context
-        context_parts.append("\nPlease respond to the current message while maintaining awareness of the conversation context.")
+        The history is expected to be already budgeted (see ContextManager),
+        so every message is included in full.
+        """
+        if not context:
+            return [], []
+        turns = context_turns(message, context.message_history)
+        return turns, self.histories.build(context.session_id, turns, context.summary)
+    
+    def _caller(self, context: Optional[ChatContext]) -> str:
+        return caller_key(context.user_id, context.session_id) if context else "anonymous"
+    
+    def _remember(self, message: str, reply: str, context: Optional[ChatContext],
+                  turns: List[Turn], messages: List[ModelMessage]) -> None:
+        if context:
+            turns = turns + [("user", message), ("assistant", reply)]
+            self.histories.remember(context.session_id, turns, context.summary, messages)
+    
+    async def _cached_reply(self, message: str, context: Optional[ChatContext],
+                            turns: List[Turn], history: List[ModelMessage]) -> Optional[Lookup]:
+        """Look the message up in the response cache; a hit is remembered like a model reply.
         
-        return "\n".join(context_parts)
+        Entries are scoped to the caller and the system prompt as well as the
+        conversation, so one user's reply is never served to another.
+        """
+        if self.responses is None:
+            return None
+        summary = context.summary if context else ""
+        fingerprint = context_fingerprint(self._caller(context), self.system_prompt, summary, turns)
+        lookup = await self.responses.get(message, fingerprint)
+        if lookup.response is not None:
+            reply = lookup.response.reply
+            self._remember(message, reply, context, turns,
+                           history + render_messages([("user", message), ("assistant", reply)]))
+        return lookup
+    
+    def _cache_reply(self, lookup: Optional[Lookup], reply: str, messages: List[ModelMessage]) -> None:
+        """Store a model reply, unless the run called a tool that makes it unsafe to reuse"""
+        if lookup is not None:
+            self.responses.put(lookup, reply, cache_ttl(tools_called(messages), self.responses.ttl))
     
     async def __aenter__(self):
         """Enter async context"""
-        # Initialize MCP client
-        await self.mcp_client.__aenter__()
+        await self.mcp_client.open()
         
         # Check MCP server health
         try:
             if await self.mcp_client.health_check():
                 print("MCP server is connected and healthy")
                 tools = await self.mcp_client.list_tools()
+                # Let the model call MCP tools directly, without a discovery step
+                registered = register_mcp_tools(self.agent, self.mcp_client, tools)
                 print(f"Available MCP tools: {[tool.name for tool in tools]}")
+                print(f"Registered as agent tools: {registered}")
             else:
                 print("MCP server is not available - MCP tools disabled")
         except Exception as e:
@@ -263,34 +293,68 @@ class ConversationAgent:
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Exit async context"""
-        await self.http_client.aclose()
-        await self.mcp_client.__aexit__(exc_type, exc_val, exc_tb)
+        pass
     
     async def chat(self, message: str, context: Optional[ChatContext] = None) -> str:
         """Process a chat message and return the response."""
         try:
-            # Build message with context
-            contextualized_message = self._build_context_prompt(message, context)
+            # Earlier turns as structured messages with a stable prefix
+            turns, history = self._history_for(message, context)
+            
+            # Repeated prompts in the same context are answered from the cache
+            lookup = await self._cached_reply(message, context, turns, history)
+            if lookup is not None and lookup.response is not None:
+                return lookup.response.reply
+            
+            # Revalidate the tool catalog once its TTL has passed
+            await self.mcp_client.list_tools()
             
             # Run the agent
-            result = await self.agent.run(contextualized_message)
+            result = await self.admission.call(
+                self._caller(context),
+                lambda: self.agent.run(message, message_history=history)
+            )
+            self._remember(message, result.data, context, turns, result.all_messages())
+            self._cache_reply(lookup, result.data, result.new_messages())
             return result.data
             
+        except AdmissionRejected:
+            raise
         except Exception as e:
             return f"I encountered an error: {str(e)}"
     
     async def stream_chat(self, message: str, context: Optional[ChatContext] = None):
         """Stream a chat response."""
         try:
-            # Build message with context
-            contextualized_message = self._build_context_prompt(message, context)
+            # Earlier turns as structured messages with a stable prefix
+            turns, history = self._history_for(message, context)
+            
+            # A cached reply is sent as a single chunk
+            lookup = await self._cached_reply(message, context, turns, history)
+            if lookup is not None and lookup.response is not None:
+                yield lookup.response.reply
+                return
+            
+            # Revalidate the tool catalog once its TTL has passed
+            await self.mcp_client.list_tools()
+            
+            async def run():
+                # Stream the response
+                async with self.agent.run_stream(message, message_history=history) as stream:
+                    chunks = []
+                    # Use stream_text(delta=True) to get only new text chunks
+                    async for chunk in stream.stream_text(delta=True):
+                        chunks.append(chunk)
+                        yield chunk
+                reply = "".join(chunks)
+                self._remember(message, reply, context, turns, stream.all_messages())
+                self._cache_reply(lookup, reply, stream.new_messages())
             
-            # Stream the response
-            async with self.agent.run_stream(contextualized_message) as stream:
-                # Use stream_text(delta=True) to get only new text chunks
-                async for chunk in stream.stream_text(delta=True):
-                    yield chunk
+            async for chunk in self.admission.stream(self._caller(context), run):
+                yield chunk
                     
+        except AdmissionRejected:
+            raise
         except Exception as e:
             yield f"I encountered an error: {str(e)}"
 
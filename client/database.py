@@ -1,106 +1,129 @@
 """Database models and operations for chat history and user authentication"""
+import asyncio
 import aiosqlite
+import base64
 import json
-import hashlib
 import secrets
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from contextlib import asynccontextmanager
+from typing import List, Dict, Optional, Tuple
 from config import config
+from cache import TTLCache
+from db_pool import ConnectionPool, open_connection
+from migrations import migrate
+from passwords import PasswordHasher
+from write_queue import MessageWriteQueue
+
+# Hot-path queries, kept here so tests can check their query plans.
+# Messages are ordered by id (insertion order) rather than the one-second
+# resolution timestamp so the (session_id, id) index serves the sort.
+SESSION_MESSAGES_QUERY = """
+    SELECT role, content, timestamp
+    FROM chat_messages
+    WHERE session_id = ?
+    ORDER BY id DESC
+    LIMIT ?
+"""
+
+# Newest messages after a known id; the context manager's incremental fetch
+MESSAGES_AFTER_QUERY = """
+    SELECT id, role, content, timestamp
+    FROM chat_messages
+    WHERE session_id = ? AND id > ?
+    ORDER BY id DESC
+    LIMIT ?
+"""
+
+# Keyset pagination: (updated_at, id) of the last row seen is the cursor
+USER_SESSIONS_QUERY = """
+    SELECT id, session_id, created_at, updated_at, message_count, last_message_at
+    FROM chat_sessions
+    WHERE user_id = ? AND (updated_at, id) < (?, ?)
+    ORDER BY updated_at DESC, id DESC
+    LIMIT ?
+"""
+
+def encode_cursor(updated_at: str, row_id: int) -> str:
+    """Opaque pagination cursor for a chat_sessions row"""
+    return base64.urlsafe_b64encode(json.dumps([updated_at, row_id]).encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """Inverse of encode_cursor; raises ValueError on malformed input"""
+    try:
+        updated_at, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(updated_at), int(row_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
 
 class ChatDatabase:
     """Handle chat history storage"""
     
     def __init__(self, db_path: str = config.DATABASE_URL.replace("sqlite:///", "")):
         self.db_path = db_path
+        self.pool: Optional[ConnectionPool] = None
+        
+        self.passwords = PasswordHasher()
+        self._messages = MessageWriteQueue(self._writer)
+        # session token -> user profile, for authenticated requests
+        self._session_cache = TTLCache(maxsize=config.AUTH_CACHE_SIZE, ttl=config.AUTH_CACHE_TTL)
+        # session token -> last_used_at not yet written to the database
+        self._session_activity: Dict[str, str] = {}
+        self._activity_flusher: Optional[asyncio.Task] = None
+    
+    async def open(self, readers: int = config.DB_POOL_READERS) -> None:
+        """Open the connection pool; call once at application startup"""
+        if self.pool is None:
+            self.pool = ConnectionPool(self.db_path, readers=readers)
+        await self.pool.open()
+        if self._activity_flusher is None:
+            self._activity_flusher = asyncio.create_task(self._flush_activity_loop())
+        self._messages.start()
+    
+    async def close(self) -> None:
+        """Flush queued writes and close the connection pool"""
+        await self._messages.stop()
+        if self._activity_flusher is not None:
+            self._activity_flusher.cancel()
+            try:
+                await self._activity_flusher
+            except asyncio.CancelledError:
+                pass
+            self._activity_flusher = None
+            await self.flush_session_activity()
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+        self.passwords.shutdown()
+    
+    @asynccontextmanager
+    async def _connection(self):
+        """Short-lived connection for scripts that never open the pool"""
+        conn = await open_connection(self.db_path)
+        try:
+            yield conn
+        finally:
+            await conn.close()
+    
+    def _reader(self):
+        """Connection for read-only queries"""
+        if self.pool is not None and self.pool.is_open:
+            return self.pool.reader()
+        return self._connection()
+    
+    def _writer(self):
+        """Connection for statements that modify the database"""
+        if self.pool is not None and self.pool.is_open:
+            return self.pool.writer()
+        return self._connection()
     
     async def init_db(self):
-        """Initialize database tables"""
-        async with aiosqlite.connect(self.db_path) as db:
-            # User authentication tables
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS users (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    email TEXT UNIQUE NOT NULL,
-                    password_hash TEXT NOT NULL,
-                    full_name TEXT,
-                    display_name TEXT,
-                    profile_picture TEXT,
-                    job_title TEXT,
-                    timezone TEXT DEFAULT 'UTC',
-                    is_active BOOLEAN DEFAULT 1,
-                    is_verified BOOLEAN DEFAULT 0,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS user_sessions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    session_token TEXT UNIQUE NOT NULL,
-                    refresh_token TEXT UNIQUE,
-                    expires_at TIMESTAMP NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    last_used_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    user_agent TEXT,
-                    ip_address TEXT,
-                    is_active BOOLEAN DEFAULT 1,
-                    FOREIGN KEY (user_id) REFERENCES users(id)
-                )
-            """)
-            
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS password_reset_tokens (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    token TEXT UNIQUE NOT NULL,
-                    expires_at TIMESTAMP NOT NULL,
-                    used BOOLEAN DEFAULT 0,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users(id)
-                )
-            """)
-            
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS email_verification_tokens (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    token TEXT UNIQUE NOT NULL,
-                    expires_at TIMESTAMP NOT NULL,
-                    used BOOLEAN DEFAULT 0,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users(id)
-                )
-            """)
-            
-            # Chat history tables
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS chat_sessions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    session_id TEXT UNIQUE NOT NULL,
-                    user_id TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS chat_messages (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    session_id TEXT NOT NULL,
-                    role TEXT NOT NULL,
-                    content TEXT NOT NULL,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (session_id) REFERENCES chat_sessions(session_id)
-                )
-            """)
-            
-            await db.commit()
+        """Create or upgrade the database schema"""
+        async with self._writer() as db:
+            await migrate(db)
     
     async def create_session(self, session_id: str, user_id: str) -> None:
         """Create a new chat session"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._writer() as db:
             await db.execute(
                 "INSERT OR IGNORE INTO chat_sessions (session_id, user_id) VALUES (?, ?)",
                 (session_id, user_id)
@@ -108,35 +131,21 @@ class ChatDatabase:
             await db.commit()
     
     async def add_message(self, session_id: str, role: str, content: str) -> None:
-        """Add a message to the chat history"""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                "INSERT INTO chat_messages (session_id, role, content) VALUES (?, ?, ?)",
-                (session_id, role, content)
-            )
-            
-            # Update session timestamp
-            await db.execute(
-                "UPDATE chat_sessions SET updated_at = CURRENT_TIMESTAMP WHERE session_id = ?",
-                (session_id,)
-            )
-            
-            await db.commit()
+        """Add a message to the chat history.
+        
+        Messages are committed in batches by the write queue; reads of the same
+        session through get_session_messages always include them.
+        """
+        await self._messages.add(session_id, role, content)
     
     async def get_session_messages(self, session_id: str, limit: int = 50) -> List[Dict[str, str]]:
         """Get messages for a session"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
-            cursor = await db.execute(
-                """
-                SELECT role, content, timestamp 
-                FROM chat_messages 
-                WHERE session_id = ? 
-                ORDER BY timestamp DESC 
-                LIMIT ?
-                """,
-                (session_id, limit)
-            )
+        if self._messages.has_pending(session_id):
+            # Read-your-writes: commit this session's queued messages first
+            await self._messages.flush()
+        
+        async with self._reader() as db:
+            cursor = await db.execute(SESSION_MESSAGES_QUERY, (session_id, limit))
             
             rows = await cursor.fetchall()
             
@@ -152,19 +161,56 @@ class ChatDatabase:
             
             return messages
     
-    async def get_user_sessions(self, user_id: str) -> List[Dict[str, any]]:
-        """Get all sessions for a user"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+    async def get_messages_after(self, session_id: str, after_id: int = 0,
+                                 limit: int = config.MAX_CHAT_HISTORY) -> List[Dict[str, any]]:
+        """Get up to `limit` of the newest messages with id > after_id, oldest first"""
+        if self._messages.has_pending(session_id):
+            await self._messages.flush()
+        
+        async with self._reader() as db:
+            cursor = await db.execute(MESSAGES_AFTER_QUERY, (session_id, after_id, limit))
+            rows = await cursor.fetchall()
+        
+        return [
+            {
+                "id": row["id"],
+                "role": row["role"],
+                "content": row["content"],
+                "timestamp": row["timestamp"]
+            }
+            for row in reversed(rows)
+        ]
+    
+    async def get_context_summary(self, session_id: str) -> Tuple[str, int]:
+        """Get the session's rolling summary and the last message id it covers"""
+        async with self._reader() as db:
             cursor = await db.execute(
-                """
-                SELECT session_id, created_at, updated_at
-                FROM chat_sessions
-                WHERE user_id = ?
-                ORDER BY updated_at DESC
-                """,
-                (user_id,)
+                "SELECT context_summary, context_summary_upto FROM chat_sessions WHERE session_id = ?",
+                (session_id,)
             )
+            row = await cursor.fetchone()
+        return (row[0], row[1]) if row else ("", 0)
+    
+    async def save_context_summary(self, session_id: str, summary: str, upto_id: int) -> None:
+        """Store the rolling summary of messages up to and including upto_id"""
+        async with self._writer() as db:
+            await db.execute(
+                "UPDATE chat_sessions SET context_summary = ?, context_summary_upto = ? WHERE session_id = ?",
+                (summary, upto_id, session_id)
+            )
+            await db.commit()
+    
+    async def get_user_sessions(self, user_id: str, limit: int = 100,
+                                cursor: Optional[str] = None) -> Tuple[List[Dict[str, any]], Optional[str]]:
+        """Get one page of a user's sessions, most recently updated first.
+        
+        Returns the sessions and a cursor for the next page (None on the last page).
+        """
+        # "~" sorts after any timestamp string, so no cursor means "from the top"
+        updated_at, row_id = decode_cursor(cursor) if cursor else ("~", 0)
+        
+        async with self._reader() as db:
+            cursor = await db.execute(USER_SESSIONS_QUERY, (user_id, updated_at, row_id, limit + 1))
             
             rows = await cursor.fetchall()
             
@@ -172,39 +218,31 @@ class ChatDatabase:
                 {
                     "session_id": row["session_id"],
                     "created_at": row["created_at"],
-                    "updated_at": row["updated_at"]
+                    "updated_at": row["updated_at"],
+                    "message_count": row["message_count"],
+                    "last_message_at": row["last_message_at"]
                 }
-                for row in rows
+                for row in rows[:limit]
             ]
             
-            return sessions
+            next_cursor = None
+            if len(rows) > limit:
+                last = rows[limit - 1]
+                next_cursor = encode_cursor(last["updated_at"], last["id"])
+            
+            return sessions, next_cursor
     
     # User Authentication Methods
     
-    def _hash_password(self, password: str) -> str:
-        """Hash password using SHA-256 with salt"""
-        salt = secrets.token_hex(16)
-        password_hash = hashlib.sha256((password + salt).encode()).hexdigest()
-        return f"{salt}:{password_hash}"
-    
-    def _verify_password(self, password: str, stored_hash: str) -> bool:
-        """Verify password against stored hash"""
-        try:
-            salt, hash_value = stored_hash.split(":")
-            password_hash = hashlib.sha256((password + salt).encode()).hexdigest()
-            return password_hash == hash_value
-        except ValueError:
-            return False
-    
     def _generate_token(self) -> str:
         """Generate secure random token"""
         return secrets.token_urlsafe(32)
     
     async def create_user(self, email: str, password: str, full_name: str = None, display_name: str = None) -> Optional[int]:
         """Create a new user account"""
-        password_hash = self._hash_password(password)
+        password_hash = await self.passwords.hash(password)
         
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._writer() as db:
             try:
                 cursor = await db.execute(
                     """
@@ -217,32 +255,44 @@ class ChatDatabase:
                 return cursor.lastrowid
             except aiosqlite.IntegrityError:
                 # Email already exists
+                await db.rollback()
                 return None
     
     async def authenticate_user(self, email: str, password: str) -> Optional[Dict]:
         """Authenticate user with email and password"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._reader() as db:
             cursor = await db.execute(
                 "SELECT id, email, password_hash, full_name, display_name, is_active, is_verified FROM users WHERE email = ?",
                 (email,)
             )
             user = await cursor.fetchone()
             
-            if user and user["is_active"] and self._verify_password(password, user["password_hash"]):
-                return {
-                    "id": user["id"],
-                    "email": user["email"],
-                    "full_name": user["full_name"],
-                    "display_name": user["display_name"],
-                    "is_verified": user["is_verified"]
-                }
+        if not user or not user["is_active"]:
+            return None
+        if not await self.passwords.verify(password, user["password_hash"]):
             return None
+        
+        if self.passwords.needs_rehash(user["password_hash"]):
+            # Upgrade legacy or weaker hashes while the plaintext is at hand
+            password_hash = await self.passwords.hash(password)
+            async with self._writer() as db:
+                await db.execute(
+                    "UPDATE users SET password_hash = ? WHERE id = ? AND password_hash = ?",
+                    (password_hash, user["id"], user["password_hash"])
+                )
+                await db.commit()
+        
+        return {
+            "id": user["id"],
+            "email": user["email"],
+            "full_name": user["full_name"],
+            "display_name": user["display_name"],
+            "is_verified": user["is_verified"]
+        }
     
     async def get_user_by_id(self, user_id: int) -> Optional[Dict]:
         """Get user by ID"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._reader() as db:
             cursor = await db.execute(
                 """
                 SELECT id, email, full_name, display_name, profile_picture, 
@@ -259,8 +309,7 @@ class ChatDatabase:
     
     async def get_user_by_email(self, email: str) -> Optional[Dict]:
         """Get user by email"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._reader() as db:
             cursor = await db.execute(
                 """
                 SELECT id, email, full_name, display_name, profile_picture, 
@@ -286,13 +335,15 @@ class ChatDatabase:
         set_clause = ", ".join([f"{field} = ?" for field in update_fields])
         values = list(update_fields.values()) + [user_id]
         
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._writer() as db:
             await db.execute(
                 f"UPDATE users SET {set_clause}, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
                 values
             )
             await db.commit()
-            return True
+        
+        self._invalidate_user_sessions(user_id)
+        return True
     
     async def create_session_token(self, user_id: int, user_agent: str = None, ip_address: str = None) -> Dict[str, str]:
         """Create a new session token for user"""
@@ -300,7 +351,7 @@ class ChatDatabase:
         refresh_token = self._generate_token()
         expires_at = datetime.utcnow() + timedelta(days=7)  # Token valid for 7 days
         
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._writer() as db:
             await db.execute(
                 """
                 INSERT INTO user_sessions (user_id, session_token, refresh_token, expires_at, user_agent, ip_address)
@@ -318,7 +369,7 @@ class ChatDatabase:
     
     async def validate_session_token(self, session_token: str) -> Optional[int]:
         """Validate session token and return user_id if valid"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._reader() as db:
             cursor = await db.execute(
                 """
                 SELECT user_id FROM user_sessions 
@@ -327,33 +378,95 @@ class ChatDatabase:
                 (session_token,)
             )
             result = await cursor.fetchone()
-            
-            if result:
-                # Update last_used_at
-                await db.execute(
-                    "UPDATE user_sessions SET last_used_at = CURRENT_TIMESTAMP WHERE session_token = ?",
+        
+        if result:
+            await self._touch_session(session_token)
+            return result[0]
+        return None
+    
+    async def get_session_user(self, session_token: str) -> Optional[Dict]:
+        """Return the profile of the user owning a valid session token.
+        
+        Results are cached per token for AUTH_CACHE_TTL seconds (never past the
+        token's expiry), so most authenticated requests skip the database.
+        """
+        cached = self._session_cache.get(session_token)
+        if cached is None:
+            async with self._reader() as db:
+                cursor = await db.execute(
+                    """
+                    SELECT u.id, u.email, u.full_name, u.display_name, u.profile_picture,
+                           u.job_title, u.timezone, u.is_active, u.is_verified, u.created_at,
+                           u.updated_at, s.expires_at AS session_expires_at
+                    FROM user_sessions s JOIN users u ON u.id = s.user_id
+                    WHERE s.session_token = ? AND s.expires_at > CURRENT_TIMESTAMP AND s.is_active = 1
+                    """,
                     (session_token,)
                 )
-                await db.commit()
-                return result[0]
-            return None
+                row = await cursor.fetchone()
+            
+            if not row:
+                return None
+            
+            cached = dict(row)
+            expires_at = datetime.fromisoformat(str(cached.pop("session_expires_at")))
+            ttl = min(config.AUTH_CACHE_TTL, (expires_at - datetime.utcnow()).total_seconds())
+            if ttl > 0:
+                self._session_cache.set(session_token, cached, ttl=ttl)
+        
+        await self._touch_session(session_token)
+        return dict(cached)
+    
+    def _invalidate_user_sessions(self, user_id: int) -> None:
+        """Drop cached profiles for a user whose details changed"""
+        self._session_cache.discard_where(lambda user: user["id"] == user_id)
+    
+    async def _touch_session(self, session_token: str) -> None:
+        """Record session activity; written in batches by the activity flusher"""
+        self._session_activity[session_token] = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        if self._activity_flusher is None:
+            # No background flusher (pool not opened): write through
+            await self.flush_session_activity()
+    
+    async def flush_session_activity(self) -> None:
+        """Write pending last_used_at updates in one transaction"""
+        if not self._session_activity:
+            return
+        batch, self._session_activity = self._session_activity, {}
+        async with self._writer() as db:
+            await db.executemany(
+                "UPDATE user_sessions SET last_used_at = ? WHERE session_token = ?",
+                [(last_used_at, token) for token, last_used_at in batch.items()]
+            )
+            await db.commit()
+    
+    async def _flush_activity_loop(self) -> None:
+        while True:
+            await asyncio.sleep(config.SESSION_ACTIVITY_FLUSH_INTERVAL)
+            try:
+                await self.flush_session_activity()
+            except Exception as e:
+                print(f"Session activity flush failed: {e}")
     
     async def invalidate_session(self, session_token: str) -> bool:
         """Invalidate a session token"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._writer() as db:
             cursor = await db.execute(
                 "UPDATE user_sessions SET is_active = 0 WHERE session_token = ?",
                 (session_token,)
             )
             await db.commit()
-            return cursor.rowcount > 0
+        
+        self._session_cache.pop(session_token)
+        self._session_activity.pop(session_token, None)
+        return cursor.rowcount > 0
     
     async def create_password_reset_token(self, user_id: int) -> str:
         """Create password reset token"""
         token = self._generate_token()
         expires_at = datetime.utcnow() + timedelta(hours=1)  # Token valid for 1 hour
         
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._writer() as db:
             await db.execute(
                 "INSERT INTO password_reset_tokens (user_id, token, expires_at) VALUES (?, ?, ?)",
                 (user_id, token, expires_at)
@@ -364,7 +477,7 @@ class ChatDatabase:
     
     async def validate_password_reset_token(self, token: str) -> Optional[int]:
         """Validate password reset token and return user_id if valid"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._writer() as db:
             cursor = await db.execute(
                 """
                 SELECT user_id FROM password_reset_tokens 
@@ -386,22 +499,24 @@ class ChatDatabase:
     
     async def update_password(self, user_id: int, new_password: str) -> bool:
         """Update user password"""
-        password_hash = self._hash_password(new_password)
+        password_hash = await self.passwords.hash(new_password)
         
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._writer() as db:
             cursor = await db.execute(
                 "UPDATE users SET password_hash = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
                 (password_hash, user_id)
             )
             await db.commit()
-            return cursor.rowcount > 0
+        
+        self._invalidate_user_sessions(user_id)
+        return cursor.rowcount > 0
     
     async def create_email_verification_token(self, user_id: int) -> str:
         """Create email verification token"""
         token = self._generate_token()
         expires_at = datetime.utcnow() + timedelta(days=7)  # Token valid for 7 days
         
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._writer() as db:
             await db.execute(
                 "INSERT INTO email_verification_tokens (user_id, token, expires_at) VALUES (?, ?, ?)",
                 (user_id, token, expires_at)
@@ -412,7 +527,7 @@ class ChatDatabase:
     
     async def verify_email_token(self, token: str) -> bool:
         """Verify email verification token"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._writer() as db:
             cursor = await db.execute(
                 """
                 SELECT user_id FROM email_verification_tokens 
@@ -434,5 +549,6 @@ class ChatDatabase:
                     (user_id,)
                 )
                 await db.commit()
+                self._invalidate_user_sessions(user_id)
                 return True
             return False
\ No newline at end of file
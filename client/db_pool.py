@@ -0,0 +1,85 @@
+"""Pooled aiosqlite connections for the chat database"""
+import asyncio
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+import aiosqlite
+
+from config import config
+
+# Applied once to every connection when the pool opens it
+PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA busy_timeout={config.DB_BUSY_TIMEOUT_MS}",
+    "PRAGMA cache_size=-16000",  # ~16MB page cache per connection
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+]
+
+async def open_connection(db_path: str) -> aiosqlite.Connection:
+    """Open a connection with row access by name and tuned pragmas"""
+    conn = await aiosqlite.connect(db_path)
+    conn.row_factory = aiosqlite.Row
+    for pragma in PRAGMAS:
+        await conn.execute(pragma)
+    return conn
+
+class ConnectionPool:
+    """A fixed set of reader connections plus one dedicated writer.
+
+    SQLite allows a single writer at a time, so writes are serialized on one
+    connection behind a lock while WAL mode lets readers proceed concurrently.
+    """
+
+    def __init__(self, db_path: str, readers: int = config.DB_POOL_READERS):
+        self.db_path = db_path
+        self.size = max(1, readers)
+        self._readers: Optional[asyncio.Queue] = None
+        self._reader_conns: List[aiosqlite.Connection] = []
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._write_lock = asyncio.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._writer is not None
+
+    async def open(self) -> None:
+        """Open the writer first so WAL mode is set before readers attach"""
+        if self.is_open:
+            return
+        self._writer = await open_connection(self.db_path)
+        self._readers = asyncio.Queue()
+        for _ in range(self.size):
+            conn = await open_connection(self.db_path)
+            self._reader_conns.append(conn)
+            self._readers.put_nowait(conn)
+
+    async def close(self) -> None:
+        """Close every connection owned by the pool"""
+        for conn in self._reader_conns:
+            await conn.close()
+        self._reader_conns = []
+        self._readers = None
+        if self._writer is not None:
+            await self._writer.close()
+            self._writer = None
+
+    @asynccontextmanager
+    async def reader(self):
+        """Borrow a read connection, waiting if all are in use"""
+        conn = await self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put_nowait(conn)
+
+    @asynccontextmanager
+    async def writer(self):
+        """Hold the writer for one transaction; rolls back if the block raises"""
+        async with self._write_lock:
+            try:
+                yield self._writer
+            except BaseException:
+                await self._writer.rollback()
+                raise
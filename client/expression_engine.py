@@ -0,0 +1,201 @@
+"""Safe arithmetic expressions: whitelisted AST, compiled once, cached"""
+import ast
+import functools
+import math
+import time
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional
+
+# Kept identical in client/ and server/ (separate build contexts)
+
+MAX_EXPRESSION_LENGTH = 1000
+# Integer results are capped below Python's 4300-digit str() limit
+MAX_INT_BITS = 13000
+# Three-argument pow costs about exponent bits x modulus bits squared
+MAX_MODULUS_BITS = 2048
+# round(n, -ndigits) builds 10**ndigits; beyond this every allowed int rounds to 0
+MAX_ROUND_DIGITS = 4000
+DEFAULT_TIME_LIMIT = 1.0  # Seconds for one evaluate or evaluate_many call
+
+CONSTANTS: Dict[str, float] = {"pi": math.pi, "e": math.e}
+
+class ExpressionError(ValueError):
+    """The expression is malformed, unsupported or over a limit"""
+
+# ** and * are compiled to these checked versions, which also receive the
+# evaluation's deadline (the _deadline local) so a long chain of them stops
+# once the time limit has passed
+
+def _pow(deadline, base, exponent, modulus=None):
+    """pow() that refuses integer results larger than MAX_INT_BITS"""
+    if time.monotonic() > deadline:
+        raise TimeoutError
+    if modulus is None and isinstance(exponent, int) and exponent > 0 and isinstance(base, int):
+        if abs(base) > 1 and math.log2(abs(base)) * exponent > MAX_INT_BITS:
+            raise ExpressionError(f"Exponent too large: {base}**{exponent}")
+    if isinstance(modulus, int) and modulus.bit_length() > MAX_MODULUS_BITS:
+        raise ExpressionError(f"Modulus larger than {MAX_MODULUS_BITS} bits")
+    return pow(base, exponent, modulus)
+
+def _mul(deadline, left, right):
+    """* that refuses integer results larger than MAX_INT_BITS"""
+    if isinstance(left, int) and isinstance(right, int):
+        if time.monotonic() > deadline:
+            raise TimeoutError
+        if left.bit_length() + right.bit_length() > MAX_INT_BITS + 1:
+            raise ExpressionError(f"Result larger than {MAX_INT_BITS} bits")
+    return left * right
+
+def _round(number, ndigits=None):
+    """round() that refuses ndigits large enough to be slow"""
+    if isinstance(ndigits, int) and abs(ndigits) > MAX_ROUND_DIGITS:
+        raise ExpressionError(f"round() ndigits beyond {MAX_ROUND_DIGITS}")
+    return round(number, ndigits)
+
+FUNCTIONS: Dict[str, Any] = {
+    "abs": abs, "round": _round, "min": min, "max": max,
+    "sum": sum, "pow": _pow, "sqrt": math.sqrt,
+    "sin": math.sin, "cos": math.cos, "tan": math.tan,
+}
+
+_BINARY_OPS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow)
+_UNARY_OPS = (ast.UAdd, ast.USub)
+_CHECKED_OPS = {ast.Pow: "_pow", ast.Mult: "_mul"}
+
+def _checked_call(name: str, args: List[ast.expr]) -> ast.Call:
+    deadline = ast.Name(id="_deadline", ctx=ast.Load())
+    return ast.Call(func=ast.Name(id=name, ctx=ast.Load()), args=[deadline, *args], keywords=[])
+
+class _Validator(ast.NodeTransformer):
+    """Rejects anything but arithmetic and routes **, * and pow() through _pow and _mul"""
+
+    def __init__(self):
+        self.names = set()
+
+    def generic_visit(self, node):
+        raise ExpressionError(f"Unsupported syntax: {type(node).__name__}")
+
+    def visit_Expression(self, node):
+        node.body = self.visit(node.body)
+        return node
+
+    def visit_Constant(self, node):
+        if type(node.value) not in (int, float):
+            raise ExpressionError(f"Unsupported constant: {node.value!r}")
+        return node
+
+    def visit_Name(self, node):
+        if node.id.startswith("_") or node.id in FUNCTIONS:
+            raise ExpressionError(f"Unknown name: {node.id}")
+        if node.id not in CONSTANTS:
+            self.names.add(node.id)
+        return node
+
+    def visit_UnaryOp(self, node):
+        if not isinstance(node.op, _UNARY_OPS):
+            raise ExpressionError(f"Unsupported operator: {type(node.op).__name__}")
+        node.operand = self.visit(node.operand)
+        return node
+
+    def visit_BinOp(self, node):
+        if not isinstance(node.op, _BINARY_OPS):
+            hint = " (use ** for powers)" if isinstance(node.op, ast.BitXor) else ""
+            raise ExpressionError(f"Unsupported operator: {type(node.op).__name__}{hint}")
+        left, right = self.visit(node.left), self.visit(node.right)
+        checked = _CHECKED_OPS.get(type(node.op))
+        if checked:
+            return ast.copy_location(_checked_call(checked, [left, right]), node)
+        node.left, node.right = left, right
+        return node
+
+    def visit_Call(self, node):
+        if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS or node.keywords:
+            raise ExpressionError("Only calls to " + ", ".join(FUNCTIONS) + " are allowed")
+        # Lists are only allowed as call arguments, e.g. sum([1, 2]), so
+        # they cannot be repeated into huge sequences with *
+        node.args = [self._sequence(arg) if isinstance(arg, (ast.List, ast.Tuple)) else self.visit(arg)
+                     for arg in node.args]
+        if node.func.id == "pow":
+            return ast.copy_location(_checked_call("_pow", node.args), node)
+        return node
+
+    def _sequence(self, node):
+        node.elts = [self.visit(element) for element in node.elts]
+        return node
+
+class CompiledExpression:
+    """A validated expression compiled to a code object.
+
+    Free names other than pi and e are variables, supplied per evaluation.
+    The time limit is checked before each **, pow() and integer *, the
+    only operations whose cost grows with their operands; each of those
+    also caps its operand sizes, so none runs for long past the deadline.
+    """
+
+    _namespace = {"__builtins__": {}, "_pow": _pow, "_mul": _mul, **FUNCTIONS, **CONSTANTS}
+
+    def __init__(self, text: str, code, names: FrozenSet[str]):
+        self.text = text
+        self.names = names
+        self._code = code
+
+    def evaluate(self, variables: Optional[Mapping[str, Any]] = None,
+                 time_limit: float = DEFAULT_TIME_LIMIT) -> Any:
+        """Evaluate with the given variables, within time_limit seconds"""
+        try:
+            return self._evaluate(variables, time.monotonic() + time_limit)
+        except TimeoutError:
+            raise TimeoutError(f"Evaluation exceeded {time_limit}s") from None
+
+    def evaluate_many(self, rows: Iterable[Mapping[str, Any]],
+                      time_limit: float = DEFAULT_TIME_LIMIT) -> List[Any]:
+        """Evaluate once per row of variables, within time_limit seconds overall"""
+        deadline = time.monotonic() + time_limit
+        results = []
+        try:
+            for row in rows:
+                results.append(self._evaluate(row, deadline))
+                if time.monotonic() > deadline:
+                    raise TimeoutError
+        except TimeoutError:
+            raise TimeoutError(f"Evaluation exceeded {time_limit}s after {len(results)} rows") from None
+        return results
+
+    def _evaluate(self, variables: Optional[Mapping[str, Any]], deadline: float) -> Any:
+        scope = dict(variables) if variables else {}
+        if self.names:
+            missing = self.names.difference(scope)
+            if missing:
+                raise ExpressionError("Unknown name: " + ", ".join(sorted(missing)))
+            for name in self.names:
+                value = scope[name]
+                if isinstance(value, int) and value.bit_length() > MAX_INT_BITS:
+                    raise ExpressionError(f"Variable {name} larger than {MAX_INT_BITS} bits")
+        scope["_deadline"] = deadline
+        result = eval(self._code, self._namespace, scope)
+        if isinstance(result, int) and result.bit_length() > MAX_INT_BITS:
+            raise ExpressionError(f"Result larger than {MAX_INT_BITS} bits")
+        return result
+
+@functools.lru_cache(maxsize=1024)
+def compile_expression(text: str) -> CompiledExpression:
+    """Parse, validate and compile an expression; results are cached by text"""
+    if len(text) > MAX_EXPRESSION_LENGTH:
+        raise ExpressionError(f"Expression longer than {MAX_EXPRESSION_LENGTH} characters")
+    try:
+        tree = ast.parse(text.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ExpressionError(f"Invalid expression: {e.msg}") from None
+    validator = _Validator()
+    tree = ast.fix_missing_locations(validator.visit(tree))
+    return CompiledExpression(text, compile(tree, "<expression>", "eval"), frozenset(validator.names))
+
+def evaluate(text: str, variables: Optional[Mapping[str, Any]] = None) -> Any:
+    """Evaluate an arithmetic expression such as "sqrt(16) + 2**10" """
+    return compile_expression(text).evaluate(variables)
+
+def calculate(expression: str) -> Dict[str, Any]:
+    """The calculator tool's result for an expression"""
+    try:
+        return {"success": True, "expression": expression, "result": evaluate(expression)}
+    except Exception as e:
+        return {"success": False, "expression": expression, "error": str(e)}
@@ -1,12 +1,13 @@
 """Hybrid agent that uses both local and remote tools"""
 import os
 import httpx
-import math
 import datetime
 from typing import Optional, List, Dict, Any
 from pydantic_ai import Agent, RunContext
 from pydantic import BaseModel
 from config import config
+from mcp_client import get_mcp_client
+from expression_engine import calculate
 
 class ChatContext(BaseModel):
     """Context for chat conversations"""
@@ -30,11 +31,8 @@ class HybridChatAgent:
             system_prompt=config.SYSTEM_PROMPT
         )
         
-        # HTTP client for MCP server
-        self.http_client = httpx.AsyncClient(
-            base_url=f"http://{config.MCP_SERVER_HOST}:{config.MCP_SERVER_PORT}",
-            timeout=30.0
-        )
+        # Shared MCP client; its connection pool is closed by the app lifespan
+        self.mcp_client = get_mcp_client()
         
         # Register all tools
         self._register_tools()
@@ -50,25 +48,7 @@ class HybridChatAgent:
         @self.agent.tool
         async def calculator(ctx: RunContext[None], expression: str) -> Dict[str, Any]:
             """Evaluate mathematical expressions safely."""
-            try:
-                safe_dict = {
-                    'abs': abs, 'round': round, 'min': min, 'max': max,
-                    'sum': sum, 'pow': pow, 'sqrt': math.sqrt,
-                    'sin': math.sin, 'cos': math.cos, 'tan': math.tan,
-                    'pi': math.pi, 'e': math.e
-                }
-                result = eval(expression, {"__builtins__": {}}, safe_dict)
-                return {
-                    "success": True,
-                    "expression": expression,
-                    "result": result
-                }
-            except Exception as e:
-                return {
-                    "success": False,
-                    "expression": expression,
-                    "error": str(e)
-                }
+            return calculate(expression)
         
         @self.agent.tool
         async def get_current_time(ctx: RunContext[None], timezone: str = "UTC") -> Dict[str, str]:
@@ -88,7 +68,7 @@ class HybridChatAgent:
             # Try MCP server first
             try:
                 # Direct HTTP call to MCP server endpoint
-                response = await agent.http_client.get(
+                response = await agent.mcp_client.http.get(
                     "/weather",
                     params={"location": location}
                 )
@@ -113,7 +93,7 @@ class HybridChatAgent:
             """Search the web for information."""
             # Try MCP server
             try:
-                response = await agent.http_client.get(
+                response = await agent.mcp_client.http.get(
                     "/search",
                     params={"query": query, "max_results": max_results}
                 )
@@ -166,7 +146,7 @@ class HybridChatAgent:
         async def check_mcp_server(ctx: RunContext[None]) -> Dict[str, Any]:
             """Check if MCP server is available and list its capabilities."""
             try:
-                response = await agent.http_client.get("/health")
+                response = await agent.mcp_client.http.get("/health")
                 if response.status_code == 200:
                     return {
                         "success": True,
@@ -184,7 +164,7 @@ class HybridChatAgent:
         """Enter async context"""
         # Check MCP server
         try:
-            response = await self.http_client.get("/health")
+            response = await self.mcp_client.http.get("/health")
             if response.status_code == 200:
                 print("MCP server is connected and healthy")
         except:
@@ -194,7 +174,7 @@ class HybridChatAgent:
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Exit async context"""
-        await self.http_client.aclose()
+        pass
     
     async def chat(self, message: str, context: Optional[ChatContext] = None) -> str:
         """Process a chat message and return the response."""
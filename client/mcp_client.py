@@ -1,8 +1,22 @@
 """MCP Client for connecting to the FastMCP server"""
+import asyncio
 import httpx
+import itertools
 import json
-from typing import Dict, Any, List, Optional
+import time
+from typing import Dict, Any, List, Optional, Tuple
 from dataclasses import dataclass
+from config import config
+from mcp_sse import MCPSSESession
+
+# The server's streamable HTTP endpoint answers with plain JSON but requires both types
+JSON_RPC_HEADERS = {"Accept": "application/json, text/event-stream"}
+
+try:
+    import h2  # noqa: F401  Installed with httpx[http2]
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
 
 @dataclass
 class MCPTool:
@@ -12,86 +26,215 @@ class MCPTool:
     input_schema: Dict[str, Any]
 
 class MCPClient:
-    """Client for interacting with FastMCP server"""
+    """Client for interacting with FastMCP server.
+    
+    Holds one long-lived keep-alive connection pool (HTTP/2 when the h2
+    package is installed). Share the instance from get_mcp_client() and
+    close it once at shutdown rather than per call.
+    
+    With transport="http" each JSON-RPC request is a one-shot POST to /mcp/.
+    With transport="sse" requests are multiplexed over one long-lived MCP
+    session on /sse/ (see MCPSSESession).
+    """
     
-    def __init__(self, base_url: str = "http://localhost:8001"):
+    def __init__(self, base_url: str = f"http://{config.MCP_SERVER_HOST}:{config.MCP_SERVER_PORT}",
+                 timeout: float = 30.0,
+                 max_connections: int = config.MCP_MAX_CONNECTIONS,
+                 max_keepalive_connections: int = config.MCP_MAX_KEEPALIVE_CONNECTIONS,
+                 keepalive_expiry: float = config.MCP_KEEPALIVE_EXPIRY,
+                 tools_ttl: float = config.MCP_TOOLS_CACHE_TTL,
+                 max_concurrent_calls: int = config.MCP_MAX_CONCURRENT_CALLS,
+                 transport: str = config.MCP_TRANSPORT):
+        if transport not in ("http", "sse"):
+            raise ValueError(f"Unsupported MCP transport: {transport}")
         self.base_url = base_url
-        self.client = httpx.AsyncClient(timeout=30.0)
+        self.transport = transport
+        self.timeout = timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.client: Optional[httpx.AsyncClient] = None
+        
+        # Unique JSON-RPC ids and a cap on concurrent tool calls
+        self._request_ids = itertools.count(1)
+        self._call_slots = asyncio.Semaphore(max_concurrent_calls)
+        
+        # Tool catalog cache
+        self.tools_ttl = tools_ttl
+        self.tools_etag: Optional[str] = None
+        self._tools: Optional[List[MCPTool]] = None
+        self._tools_by_name: Dict[str, MCPTool] = {}
+        self._tools_expires_at = 0.0
+        self._tools_lock = asyncio.Lock()
+        
+        # Streaming session, used when transport is "sse"
+        self.session = MCPSSESession(lambda: self.http, request_timeout=timeout)
     
-    async def __aenter__(self):
+    @property
+    def http(self) -> httpx.AsyncClient:
+        """The pooled HTTP client, (re)opened on first use"""
+        if self.client is None or self.client.is_closed:
+            self.client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=self.limits,
+                http2=config.MCP_HTTP2 and HTTP2_AVAILABLE
+            )
+        return self.client
+    
+    async def open(self) -> "MCPClient":
+        """Create the connection pool; call once at application startup"""
+        self.http
+        if self.transport == "sse":
+            self.session.start()
         return self
     
+    async def aclose(self) -> None:
+        """Close the connection pool; call once at application shutdown"""
+        await self.session.close()
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+    
+    async def __aenter__(self):
+        return await self.open()
+    
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.client.aclose()
+        await self.aclose()
     
-    async def list_tools(self) -> List[MCPTool]:
-        """List available tools from the MCP server"""
-        try:
-            # Try the standard MCP endpoint
-            response = await self.client.post(
-                f"{self.base_url}/mcp",
-                json={
-                    "jsonrpc": "2.0",
-                    "method": "tools/list",
-                    "id": 1
-                }
-            )
+    async def list_tools(self, refresh: bool = False) -> List[MCPTool]:
+        """List available tools from the MCP server.
+        
+        Served from the catalog cache for MCP_TOOLS_CACHE_TTL seconds. After
+        that the cache is revalidated against GET /tools with its ETag, so an
+        unchanged catalog costs a single 304 response.
+        """
+        if not refresh and self._tools_fresh():
+            return self._tools
+        
+        async with self._tools_lock:
+            # Another caller may have refreshed while we waited
+            if not refresh and self._tools_fresh():
+                return self._tools
+            try:
+                tools = await self._fetch_catalog()
+            except Exception as e:
+                print(f"Error listing MCP tools: {e}")
+                if self._tools is not None:
+                    # Keep serving the stale catalog rather than retrying every call
+                    self._tools_expires_at = time.monotonic() + self.tools_ttl
+                return self._tools or []
             
-            if response.status_code == 200:
-                data = response.json()
-                tools = []
-                
-                if "result" in data and "tools" in data["result"]:
-                    for tool_data in data["result"]["tools"]:
-                        tools.append(MCPTool(
-                            name=tool_data["name"],
-                            description=tool_data.get("description", ""),
-                            input_schema=tool_data.get("inputSchema", {})
-                        ))
-                
-                return tools
-            else:
-                print(f"MCP tools/list failed: {response.status_code}")
-                return []
-                
-        except Exception as e:
-            print(f"Error listing MCP tools: {e}")
-            return []
+            self._tools = tools
+            self._tools_by_name = {tool.name: tool for tool in tools}
+            self._tools_expires_at = time.monotonic() + self.tools_ttl
+            return tools
+    
+    def get_tool(self, name: str) -> Optional[MCPTool]:
+        """Look up a tool in the cached catalog without a network call"""
+        return self._tools_by_name.get(name)
+    
+    def invalidate_tools(self) -> None:
+        """Revalidate the catalog on the next list_tools call"""
+        self._tools_expires_at = 0.0
+    
+    def _tools_fresh(self) -> bool:
+        return self._tools is not None and time.monotonic() < self._tools_expires_at
+    
+    async def _fetch_catalog(self) -> List[MCPTool]:
+        headers = {}
+        if self._tools is not None and self.tools_etag:
+            headers["If-None-Match"] = self.tools_etag
+        
+        response = await self.http.get("/tools", headers=headers)
+        if response.status_code == 304:
+            return self._tools
+        if response.status_code == 200:
+            self.tools_etag = response.headers.get("ETag")
+            return [self._parse_tool(tool_data) for tool_data in response.json()["tools"]]
+        if response.status_code == 404:
+            # Server without a catalog endpoint
+            return await self._list_tools_rpc()
+        raise RuntimeError(f"GET /tools failed: {response.status_code}")
+    
+    async def _list_tools_rpc(self) -> List[MCPTool]:
+        data = await self._rpc("tools/list")
+        return [self._parse_tool(tool_data) for tool_data in data.get("result", {}).get("tools", [])]
+    
+    async def _rpc(self, method: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Send one JSON-RPC request over the configured transport and return the response message"""
+        if self.transport == "sse":
+            return await self.session.request(method, params)
+        
+        request_id = next(self._request_ids)
+        message = {"jsonrpc": "2.0", "method": method, "id": request_id}
+        if params is not None:
+            message["params"] = params
+        response = await self.http.post("/mcp/", json=message, headers=JSON_RPC_HEADERS)
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code}: {response.text}")
+        
+        data = response.json()
+        if data.get("id") != request_id:
+            raise RuntimeError(f"Response id {data.get('id')!r} does not match request {request_id}")
+        return data
+    
+    @staticmethod
+    def _parse_tool(tool_data: Dict[str, Any]) -> MCPTool:
+        return MCPTool(
+            name=tool_data["name"],
+            description=tool_data.get("description", ""),
+            input_schema=tool_data.get("inputSchema", {})
+        )
     
     async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Call a tool on the MCP server"""
         try:
-            response = await self.client.post(
-                f"{self.base_url}/mcp",
-                json={
-                    "jsonrpc": "2.0",
-                    "method": "tools/call",
-                    "params": {
-                        "name": tool_name,
-                        "arguments": arguments
-                    },
-                    "id": 2
-                }
-            )
+            async with self._call_slots:
+                data = await self._rpc("tools/call", {
+                    "name": tool_name,
+                    "arguments": arguments
+                })
             
-            if response.status_code == 200:
-                data = response.json()
-                if "result" in data:
-                    return data["result"]
-                elif "error" in data:
-                    return {"error": data["error"]["message"]}
-                else:
-                    return {"error": "Unknown response format"}
+            if "result" in data:
+                return data["result"]
+            elif "error" in data:
+                # The tool may have been renamed or removed
+                self.invalidate_tools()
+                return {"error": data["error"]["message"]}
             else:
-                return {"error": f"HTTP {response.status_code}: {response.text}"}
+                return {"error": "Unknown response format"}
                 
         except Exception as e:
             return {"error": f"Failed to call tool: {str(e)}"}
     
+    async def call_tools_batch(self, calls: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Call several tools concurrently; results come back in call order.
+        
+        Each call has its own request id and reports failure in its own slot.
+        In-flight calls are capped at MCP_MAX_CONCURRENT_CALLS per client, so
+        a large batch queues instead of opening unbounded connections.
+        """
+        return list(await asyncio.gather(
+            *(self.call_tool(tool_name, arguments) for tool_name, arguments in calls)
+        ))
+    
     async def health_check(self) -> bool:
         """Check if the MCP server is healthy"""
         try:
-            response = await self.client.get(f"{self.base_url}/health")
+            response = await self.http.get("/health")
             return response.status_code == 200
         except:
-            return False
\ No newline at end of file
+            return False
+
+# Shared client instance
+_mcp_client_instance: Optional[MCPClient] = None
+
+def get_mcp_client() -> MCPClient:
+    """Get or create the MCP client shared by all agents"""
+    global _mcp_client_instance
+    if _mcp_client_instance is None:
+        _mcp_client_instance = MCPClient()
+    return _mcp_client_instance
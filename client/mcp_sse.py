@@ -0,0 +1,191 @@
+"""Long-lived MCP session over the server's SSE transport"""
+import asyncio
+import itertools
+import json
+import random
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Set, Tuple
+
+import httpx
+
+from config import config
+
+PROTOCOL_VERSION = "2024-11-05"
+
+class MCPSSESession:
+    """One MCP session over Server-Sent Events, shared by concurrent requests.
+
+    GET on the SSE path opens the event stream; the server's first event
+    names the endpoint that JSON-RPC messages are POSTed to. Responses come
+    back on the stream and are matched to their callers by request id, so any
+    number of requests can be in flight on the one session.
+
+    If the stream drops, waiting requests fail with ConnectionError and the
+    session reconnects with jittered exponential backoff.
+    """
+
+    def __init__(self, get_http: Callable[[], httpx.AsyncClient], sse_path: str = "/sse/",
+                 request_timeout: float = 30.0,
+                 backoff_initial: float = config.MCP_SSE_BACKOFF_INITIAL,
+                 backoff_max: float = config.MCP_SSE_BACKOFF_MAX):
+        self._get_http = get_http
+        self.sse_path = sse_path
+        self.request_timeout = request_timeout
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self._backoff = backoff_initial
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._endpoint: Optional[str] = None
+        self._stream: Optional[httpx.Response] = None
+        self._ready = asyncio.Event()
+        self._reader: Optional[asyncio.Task] = None
+        self._initializer: Optional[asyncio.Task] = None
+        # Replies to server requests; referenced until done so they are not collected mid-flight
+        self._replies: Set[asyncio.Task] = set()
+
+    @property
+    def connected(self) -> bool:
+        return self._ready.is_set()
+
+    def start(self) -> None:
+        if self._reader is None:
+            self._reader = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        for task in (self._initializer, self._reader):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._reader = self._initializer = None
+        for task in self._replies:
+            task.cancel()
+        await asyncio.gather(*self._replies, return_exceptions=True)
+        self._disconnected(ConnectionError("MCP SSE session closed"))
+
+    async def request(self, method: str, params: Optional[Dict[str, Any]] = None,
+                      timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Send a JSON-RPC request and wait for its response message"""
+        timeout = self.request_timeout if timeout is None else timeout
+        self.start()
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            raise ConnectionError("MCP SSE session is not connected") from None
+        return await self._send(method, params, timeout)
+
+    async def _send(self, method: str, params: Optional[Dict[str, Any]], timeout: float) -> Dict[str, Any]:
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            message = {"jsonrpc": "2.0", "id": request_id, "method": method}
+            if params is not None:
+                message["params"] = params
+            await self._post(message)
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def _post(self, message: Dict[str, Any]) -> None:
+        if self._endpoint is None:
+            raise ConnectionError("MCP SSE session is not connected")
+        response = await self._get_http().post(self._endpoint, json=message)
+        if response.status_code not in (200, 202):
+            raise RuntimeError(f"HTTP {response.status_code}: {response.text}")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                async with self._get_http().stream(
+                    "GET", self.sse_path,
+                    headers={"Accept": "text/event-stream"},
+                    timeout=httpx.Timeout(None, connect=10.0)
+                ) as response:
+                    response.raise_for_status()
+                    self._stream = response
+                    async for event, data in iter_sse_events(response):
+                        if event == "endpoint":
+                            self._endpoint = data
+                            self._initializer = asyncio.create_task(self._initialize())
+                        elif event == "message":
+                            self._dispatch(json.loads(data))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"MCP SSE stream error: {e}")
+
+            self._disconnected(ConnectionError("MCP SSE stream closed"))
+            delay = self._backoff * random.uniform(0.5, 1.0)
+            self._backoff = min(self._backoff * 2, self.backoff_max)
+            await asyncio.sleep(delay)
+
+    async def _initialize(self) -> None:
+        try:
+            response = await self._send("initialize", {
+                "protocolVersion": PROTOCOL_VERSION,
+                "capabilities": {},
+                "clientInfo": {"name": "task-pilot-client", "version": "1.0.0"}
+            }, self.request_timeout)
+            if "error" in response:
+                raise RuntimeError(response["error"].get("message"))
+            await self._post({"jsonrpc": "2.0", "method": "notifications/initialized"})
+        except Exception as e:
+            print(f"MCP SSE handshake failed: {e}")
+            # Drop the stream so the reader reconnects
+            if self._stream is not None:
+                await self._stream.aclose()
+            return
+        self._backoff = self.backoff_initial
+        self._ready.set()
+
+    def _dispatch(self, message: Dict[str, Any]) -> None:
+        if "method" in message:
+            if "id" in message:
+                # Server-to-client request; only ping is expected
+                reply = {"jsonrpc": "2.0", "id": message["id"]}
+                if message["method"] == "ping":
+                    reply["result"] = {}
+                else:
+                    reply["error"] = {"code": -32601, "message": f"Method not found: {message['method']}"}
+                task = asyncio.create_task(self._post(reply))
+                self._replies.add(task)
+                task.add_done_callback(self._reply_done)
+            return
+        future = self._pending.get(message.get("id"))
+        if future is not None and not future.done():
+            future.set_result(message)
+
+    def _reply_done(self, task: asyncio.Task) -> None:
+        self._replies.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"MCP SSE reply failed: {task.exception()}")
+
+    def _disconnected(self, error: Exception) -> None:
+        self._ready.clear()
+        self._endpoint = None
+        self._stream = None
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+async def iter_sse_events(response: httpx.Response) -> AsyncIterator[Tuple[str, str]]:
+    """Yield (event, data) pairs from a text/event-stream response"""
+    event, data = "message", []
+    async for line in response.aiter_lines():
+        if not line:
+            if data:
+                yield event, "\n".join(data)
+            event, data = "message", []
+        elif line.startswith(":"):
+            continue
+        else:
+            field, _, value = line.partition(":")
+            if value.startswith(" "):
+                value = value[1:]
+            if field == "event":
+                event = value
+            elif field == "data":
+                data.append(value)
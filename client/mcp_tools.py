@@ -0,0 +1,51 @@
+"""Expose cached MCP server tools to pydantic-ai agents as typed tools"""
+import dataclasses
+from typing import Any, Dict, List, Optional
+
+from pydantic_ai import Agent, RunContext
+from pydantic_ai.exceptions import UserError
+from pydantic_ai.tools import ToolDefinition
+
+from mcp_client import MCPClient, MCPTool
+
+def register_mcp_tools(agent: Agent, mcp_client: MCPClient, tools: List[MCPTool]) -> List[str]:
+    """Register each catalog tool under its own name with the server's input schema.
+    
+    The model can then call MCP tools directly instead of discovering them
+    through list_mcp_tools first. Tools whose name is already taken by a
+    local tool are skipped. Returns the names that were registered.
+    
+    Call this at startup only: pydantic-ai iterates its tool table during a
+    run. Later catalog changes are applied by the prepare hook instead.
+    """
+    prepare = _prepare_from_catalog(mcp_client)
+    registered = []
+    for tool in tools:
+        try:
+            agent.tool_plain(prepare=prepare)(_make_tool_function(mcp_client, tool))
+        except UserError:
+            continue
+        registered.append(tool.name)
+    return registered
+
+def _make_tool_function(mcp_client: MCPClient, tool: MCPTool):
+    async def call(**arguments: Any) -> Dict[str, Any]:
+        return await mcp_client.call_tool(tool.name, arguments)
+    
+    call.__name__ = tool.name
+    call.__doc__ = tool.description or f"MCP server tool {tool.name}"
+    return call
+
+def _prepare_from_catalog(mcp_client: MCPClient):
+    async def prepare(ctx: RunContext[Any], tool_def: ToolDefinition) -> Optional[ToolDefinition]:
+        """Take the schema from the cached catalog; hide tools the server removed"""
+        tool = mcp_client.get_tool(tool_def.name)
+        if tool is None:
+            return None
+        return dataclasses.replace(
+            tool_def,
+            description=tool.description or tool_def.description,
+            parameters_json_schema=tool.input_schema or {"type": "object", "properties": {}}
+        )
+    
+    return prepare
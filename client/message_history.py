@@ -0,0 +1,80 @@
+"""Structured pydantic-ai message history, cached per chat session"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from pydantic_ai.messages import (
+    ModelMessage, ModelRequest, ModelResponse, SystemPromptPart, TextPart, UserPromptPart
+)
+
+from cache import TTLCache
+from config import config
+
+# (role, content) of a stored chat message
+Turn = Tuple[str, str]
+
+@dataclass
+class SessionHistory:
+    """The model messages of a session's last run and the chat turns they cover"""
+    summary: str
+    turns: List[Turn]
+    messages: List[ModelMessage]
+
+def context_turns(message: str, history: List[Dict[str, str]]) -> List[Turn]:
+    """Chat turns before the current message, as (role, content) pairs"""
+    turns = [(msg.get("role", "user"), msg.get("content", "")) for msg in history
+             if msg.get("role") in ("user", "assistant")]
+    # The current message is normally the last one stored
+    if turns and turns[-1] == ("user", message):
+        turns = turns[:-1]
+    return turns
+
+def render_messages(turns: List[Turn]) -> List[ModelMessage]:
+    """One ModelRequest per user turn and one ModelResponse per assistant turn"""
+    messages: List[ModelMessage] = []
+    for role, content in turns:
+        if role == "user":
+            messages.append(ModelRequest([UserPromptPart(content)]))
+        else:
+            messages.append(ModelResponse([TextPart(content)]))
+    return messages
+
+class MessageHistoryCache:
+    """Builds the message_history passed to Agent.run for each turn.
+
+    The history is a list of real model messages (system prompt, then the
+    conversation summary, then alternating user and assistant messages)
+    instead of one flattened "User: ... Assistant: ..." prompt. After each
+    run the session's full message list, including tool calls and returns,
+    is kept here. The next turn reuses it unchanged and appends only what is
+    new, so every request starts with the exact bytes of the previous one and
+    the provider's prompt cache covers everything but the latest exchange.
+
+    The prefix only changes when the context manager folds old messages into
+    the summary; the history is then rebuilt from the stored text.
+    """
+
+    def __init__(self, system_prompt: str = config.SYSTEM_PROMPT,
+                 max_sessions: int = config.CONTEXT_CACHE_SIZE,
+                 ttl: float = config.CONTEXT_CACHE_TTL):
+        self.system_prompt = system_prompt
+        self._sessions = TTLCache(maxsize=max_sessions, ttl=ttl)
+
+    def build(self, session_id: str, turns: List[Turn], summary: str = "") -> List[ModelMessage]:
+        """Message history for a run whose earlier turns are ``turns``"""
+        cached: Optional[SessionHistory] = self._sessions.get(session_id)
+        if (cached is not None and cached.summary == summary
+                and cached.turns == turns[:len(cached.turns)]):
+            return cached.messages + render_messages(turns[len(cached.turns):])
+
+        parts = [SystemPromptPart(self.system_prompt)]
+        if summary:
+            parts.append(SystemPromptPart(f"Summary of earlier conversation:\n{summary}"))
+        return [ModelRequest(parts)] + render_messages(turns)
+
+    def remember(self, session_id: str, turns: List[Turn], summary: str,
+                 messages: List[ModelMessage]) -> None:
+        """Keep a finished run's messages; ``turns`` must include its user message and reply"""
+        if not messages or not isinstance(messages[-1], ModelResponse):
+            # stream_text(delta=True) does not record the final response
+            messages = messages + [ModelResponse.from_text(turns[-1][1])]
+        self._sessions.set(session_id, SessionHistory(summary, turns, messages))
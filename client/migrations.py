@@ -0,0 +1,157 @@
+"""Versioned schema migrations for the chat database"""
+from typing import List, Tuple
+
+import aiosqlite
+
+# (version, description, statements). Append new migrations to the end;
+# never edit one that has already shipped.
+MIGRATIONS: List[Tuple[int, str, List[str]]] = [
+    (1, "Initial schema", [
+        """
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                email TEXT UNIQUE NOT NULL,
+                password_hash TEXT NOT NULL,
+                full_name TEXT,
+                display_name TEXT,
+                profile_picture TEXT,
+                job_title TEXT,
+                timezone TEXT DEFAULT 'UTC',
+                is_active BOOLEAN DEFAULT 1,
+                is_verified BOOLEAN DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """,
+        """
+            CREATE TABLE IF NOT EXISTS user_sessions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                session_token TEXT UNIQUE NOT NULL,
+                refresh_token TEXT UNIQUE,
+                expires_at TIMESTAMP NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_used_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                user_agent TEXT,
+                ip_address TEXT,
+                is_active BOOLEAN DEFAULT 1,
+                FOREIGN KEY (user_id) REFERENCES users(id)
+            )
+        """,
+        """
+            CREATE TABLE IF NOT EXISTS password_reset_tokens (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                token TEXT UNIQUE NOT NULL,
+                expires_at TIMESTAMP NOT NULL,
+                used BOOLEAN DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users(id)
+            )
+        """,
+        """
+            CREATE TABLE IF NOT EXISTS email_verification_tokens (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                token TEXT UNIQUE NOT NULL,
+                expires_at TIMESTAMP NOT NULL,
+                used BOOLEAN DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users(id)
+            )
+        """,
+        """
+            CREATE TABLE IF NOT EXISTS chat_sessions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT UNIQUE NOT NULL,
+                user_id TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """,
+        """
+            CREATE TABLE IF NOT EXISTS chat_messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (session_id) REFERENCES chat_sessions(session_id)
+            )
+        """,
+    ]),
+    (2, "Indexes for chat history, session listing and user sessions", [
+        "CREATE INDEX IF NOT EXISTS idx_chat_messages_session_id ON chat_messages (session_id, id)",
+        "CREATE INDEX IF NOT EXISTS idx_chat_sessions_user_updated ON chat_sessions (user_id, updated_at)",
+        "CREATE INDEX IF NOT EXISTS idx_user_sessions_user_id ON user_sessions (user_id)",
+    ]),
+    (3, "Denormalized message_count and last_message_at on chat_sessions", [
+        "ALTER TABLE chat_sessions ADD COLUMN message_count INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE chat_sessions ADD COLUMN last_message_at TIMESTAMP",
+        """
+            UPDATE chat_sessions SET
+                message_count = (
+                    SELECT COUNT(*) FROM chat_messages m WHERE m.session_id = chat_sessions.session_id
+                ),
+                last_message_at = (
+                    SELECT MAX(m.timestamp) FROM chat_messages m WHERE m.session_id = chat_sessions.session_id
+                )
+        """,
+    ]),
+    (4, "Rolling context summary of messages evicted from the prompt", [
+        "ALTER TABLE chat_sessions ADD COLUMN context_summary TEXT NOT NULL DEFAULT ''",
+        "ALTER TABLE chat_sessions ADD COLUMN context_summary_upto INTEGER NOT NULL DEFAULT 0",
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+async def get_schema_version(db: aiosqlite.Connection) -> int:
+    """Return the highest applied migration, or 0 for a fresh database"""
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor = await db.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+    row = await cursor.fetchone()
+    return row[0]
+
+async def migrate(db: aiosqlite.Connection) -> int:
+    """Apply pending migrations in order, one transaction each.
+
+    Databases created before migrations existed already have the version 1
+    tables; their CREATE TABLE IF NOT EXISTS statements are no-ops, so such
+    databases upgrade in place. Several processes may migrate the same
+    file at once; each migration is applied by whichever takes its lock first.
+    """
+    current = await get_schema_version(db)
+    await db.commit()
+
+    for version, description, statements in MIGRATIONS:
+        if version <= current:
+            continue
+        try:
+            # Explicit BEGIN so DDL is rolled back with the rest on failure.
+            # IMMEDIATE takes the write lock up front; another process may
+            # have migrated since the read above, so read the version again
+            await db.execute("BEGIN IMMEDIATE")
+            current = await get_schema_version(db)
+            if version <= current:
+                await db.commit()
+                continue
+            for statement in statements:
+                await db.execute(statement)
+            await db.execute(
+                "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                (version, description)
+            )
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+        current = version
+    
+    return current
@@ -0,0 +1,97 @@
+"""Password hashing with a tunable KDF, run off the event loop"""
+import asyncio
+import hashlib
+import hmac
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from config import config
+
+class PasswordHasher:
+    """Hash and verify passwords with PBKDF2-SHA256 or scrypt.
+
+    Hashes are self-describing so the cost can be raised later:
+        pbkdf2_sha256$<iterations>$<salt>$<hash>
+        scrypt$<n>$<r>$<p>$<salt>$<hash>
+    Records in the original single-round ``salt:hash`` SHA-256 format still
+    verify, and ``needs_rehash`` reports them (and any weaker parameters) so
+    they can be upgraded on the next successful login.
+
+    The async methods run the KDF in a bounded thread pool; hashlib releases
+    the GIL while deriving keys, so a burst of logins does not stall the loop.
+    """
+
+    def __init__(self, algorithm: str = config.PASSWORD_KDF,
+                 pbkdf2_iterations: int = config.PBKDF2_ITERATIONS,
+                 scrypt_n: int = config.SCRYPT_N, scrypt_r: int = 8, scrypt_p: int = 1,
+                 max_workers: int = config.PASSWORD_HASH_WORKERS):
+        if algorithm not in ("pbkdf2_sha256", "scrypt"):
+            raise ValueError(f"Unsupported password KDF: {algorithm}")
+        self.algorithm = algorithm
+        self.pbkdf2_iterations = pbkdf2_iterations
+        self.scrypt_n = scrypt_n
+        self.scrypt_r = scrypt_r
+        self.scrypt_p = scrypt_p
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def hash_sync(self, password: str) -> str:
+        salt = secrets.token_hex(16)
+        if self.algorithm == "scrypt":
+            derived = self._scrypt(password, salt, self.scrypt_n, self.scrypt_r, self.scrypt_p)
+            return f"scrypt${self.scrypt_n}${self.scrypt_r}${self.scrypt_p}${salt}${derived}"
+        derived = self._pbkdf2(password, salt, self.pbkdf2_iterations)
+        return f"pbkdf2_sha256${self.pbkdf2_iterations}${salt}${derived}"
+
+    def verify_sync(self, password: str, stored_hash: str) -> bool:
+        try:
+            if stored_hash.startswith("pbkdf2_sha256$"):
+                _, iterations, salt, expected = stored_hash.split("$")
+                derived = self._pbkdf2(password, salt, int(iterations))
+            elif stored_hash.startswith("scrypt$"):
+                _, n, r, p, salt, expected = stored_hash.split("$")
+                derived = self._scrypt(password, salt, int(n), int(r), int(p))
+            else:
+                # Legacy single-round SHA-256
+                salt, expected = stored_hash.split(":")
+                derived = hashlib.sha256((password + salt).encode()).hexdigest()
+        except ValueError:
+            return False
+        return hmac.compare_digest(derived, expected)
+
+    def needs_rehash(self, stored_hash: str) -> bool:
+        """True if the hash uses another algorithm or weaker parameters than configured"""
+        parts = stored_hash.split("$")
+        if self.algorithm == "pbkdf2_sha256":
+            return parts[0] != "pbkdf2_sha256" or int(parts[1]) < self.pbkdf2_iterations
+        return parts[0] != "scrypt" or (int(parts[1]), int(parts[2]), int(parts[3])) != (
+            self.scrypt_n, self.scrypt_r, self.scrypt_p
+        )
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.hash_sync, password)
+
+    async def verify(self, password: str, stored_hash: str) -> bool:
+        return await self._run(self.verify_sync, password, stored_hash)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def _run(self, func, *args):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="password-kdf")
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    @staticmethod
+    def _pbkdf2(password: str, salt: str, iterations: int) -> str:
+        return hashlib.pbkdf2_hmac("sha256", password.encode(), salt.encode(), iterations).hex()
+
+    @staticmethod
+    def _scrypt(password: str, salt: str, n: int, r: int, p: int) -> str:
+        # maxmem must cover 128 * n * r bytes plus overhead
+        return hashlib.scrypt(
+            password.encode(), salt=salt.encode(), n=n, r=r, p=p, maxmem=256 * n * r + 1024 * 1024
+        ).hex()
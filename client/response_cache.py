@@ -0,0 +1,212 @@
+"""Response cache for repeated prompts: exact tier plus an optional embedding tier"""
+import hashlib
+import json
+import math
+import operator
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pydantic_ai.messages import ModelMessage, ModelResponse, ToolCallPart
+
+from cache import TTLCache
+from config import config
+
+Embedder = Callable[[str], Awaitable[Sequence[float]]]
+
+# Tools whose results depend only on their arguments, or change slowly, with
+# the longest time (None = the cache TTL) a reply that used them may be
+# reused. A turn that called any other tool -- one with side effects
+# (save_note, create_task, ...) or whose answer depends on state or the
+# clock (get_notes, get_current_time, ...) -- is never cached.
+CACHEABLE_TOOLS: Dict[str, Optional[float]] = {
+    "calculator": None,
+    "unit_converter": None,
+    "unit_converter_batch": None,
+    "text_analyzer": None,
+    "base64_encode_decode": None,
+    "get_weather": 600,
+    "list_mcp_tools": 300,
+}
+
+def normalize_prompt(prompt: str) -> str:
+    """Case, spacing and trailing punctuation do not change the question"""
+    return " ".join(prompt.casefold().split()).rstrip("?!. ")
+
+def context_fingerprint(*parts: Any) -> str:
+    """Hash of everything besides the prompt that the reply depends on"""
+    return hashlib.sha256(json.dumps(parts, default=str).encode()).hexdigest()
+
+def tools_called(messages: Iterable[ModelMessage]) -> List[str]:
+    """Names of the tools a run called, including those inside call_mcp_tool"""
+    names = []
+    for message in messages:
+        if not isinstance(message, ModelResponse):
+            continue
+        for part in message.parts:
+            if not isinstance(part, ToolCallPart):
+                continue
+            names.append(part.tool_name)
+            if part.tool_name == "call_mcp_tool":
+                args = part.args_as_dict()
+                if args.get("tool_name"):
+                    names.append(args["tool_name"])
+                names.extend(call.get("tool_name", "") for call in args.get("calls") or [])
+    return names
+
+def cache_ttl(tools: Iterable[str], ttl: float) -> Optional[float]:
+    """How long a reply that used ``tools`` may be cached; None if it must not be"""
+    for name in tools:
+        if name == "call_mcp_tool":
+            continue  # The tool it called is listed separately
+        if name not in CACHEABLE_TOOLS:
+            return None
+        if CACHEABLE_TOOLS[name] is not None:
+            ttl = min(ttl, CACHEABLE_TOOLS[name])
+    return ttl
+
+@dataclass
+class CachedResponse:
+    reply: str
+    latency: float  # Seconds the model took to produce the reply
+
+@dataclass
+class Lookup:
+    """Result of ``ResponseCache.get``; pass it back to ``put`` on a miss"""
+    key: Tuple[str, str]
+    response: Optional[CachedResponse] = None
+    tier: Optional[str] = None  # "exact" or "semantic" on a hit
+    vector: Optional[List[float]] = None
+    started: float = 0.0
+
+class VectorIndex:
+    """Unit vectors grouped by context fingerprint, searched by cosine similarity.
+
+    Only entries with the same context are compared, so each search scans
+    one small bucket; buckets keep their newest ``bucket_size`` entries.
+    """
+
+    def __init__(self, bucket_size: int = 256):
+        self.bucket_size = bucket_size
+        self._buckets: Dict[str, List[Tuple[Tuple[str, str], List[float]]]] = {}
+
+    def __len__(self) -> int:
+        return sum(map(len, self._buckets.values()))
+
+    def add(self, key: Tuple[str, str], vector: List[float]) -> None:
+        bucket = self._buckets.setdefault(key[0], [])
+        bucket[:] = [entry for entry in bucket if entry[0] != key][-(self.bucket_size - 1):]
+        bucket.append((key, vector))
+
+    def search(self, fingerprint: str, vector: List[float]) -> Tuple[Optional[Tuple[str, str]], float]:
+        """The most similar key with this fingerprint and its similarity"""
+        best, best_score = None, -1.0
+        for key, candidate in self._buckets.get(fingerprint, ()):
+            score = sum(map(operator.mul, vector, candidate))
+            if score > best_score:
+                best, best_score = key, score
+        return best, best_score
+
+    def discard(self, key: Tuple[str, str]) -> None:
+        bucket = self._buckets.get(key[0])
+        if bucket is not None:
+            bucket[:] = [entry for entry in bucket if entry[0] != key]
+            if not bucket:
+                del self._buckets[key[0]]
+
+def _unit(vector: Sequence[float]) -> List[float]:
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+class ResponseCache:
+    """Replies keyed on the normalized prompt and a fingerprint of the context.
+
+    The exact tier matches prompts that are equal after normalization. With
+    an ``embed`` function, a miss also looks for an earlier prompt in the
+    same context whose embedding is at least ``similarity`` (cosine) close,
+    so rephrasings of a question can share a reply. Entries expire after
+    their TTL; the agent decides per turn whether a reply may be stored at
+    all (see ``cache_ttl``).
+    """
+
+    def __init__(self, maxsize: int = config.RESPONSE_CACHE_SIZE, ttl: float = config.RESPONSE_CACHE_TTL,
+                 embed: Optional[Embedder] = None, similarity: float = config.RESPONSE_CACHE_SIMILARITY):
+        self.ttl = ttl
+        self.similarity = similarity
+        self._embed = embed
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._index = VectorIndex() if embed else None
+        self._counters = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "stored": 0, "bypassed": 0,
+                          "embedding_errors": 0}
+        self._saved_seconds = 0.0
+        self._lookup_seconds = 0.0
+
+    async def get(self, prompt: str, fingerprint: str) -> Lookup:
+        started = time.monotonic()
+        lookup = Lookup((fingerprint, normalize_prompt(prompt)), started=started)
+        lookup.response = self._entries.get(lookup.key)
+        if lookup.response is not None:
+            lookup.tier = "exact"
+        elif self._embed is not None:
+            try:
+                lookup.vector = _unit(await self._embed(lookup.key[1]))
+            except Exception as e:
+                self._counters["embedding_errors"] += 1
+                print(f"Response cache embedding failed: {e}")
+            else:
+                key, score = self._index.search(fingerprint, lookup.vector)
+                if key is not None and score >= self.similarity:
+                    lookup.response = self._entries.get(key)
+                    if lookup.response is None:
+                        self._index.discard(key)  # Expired or evicted
+                    else:
+                        lookup.tier = "semantic"
+
+        elapsed = time.monotonic() - started
+        self._lookup_seconds += elapsed
+        if lookup.response is None:
+            self._counters["misses"] += 1
+        else:
+            self._counters[f"{lookup.tier}_hits"] += 1
+            self._saved_seconds += max(0.0, lookup.response.latency - elapsed)
+        return lookup
+
+    def put(self, lookup: Lookup, reply: str, ttl: Optional[float]) -> None:
+        """Store the reply for a missed lookup; ``ttl`` None means the turn is not cacheable"""
+        if ttl is None or ttl <= 0:
+            self._counters["bypassed"] += 1
+            return
+        response = CachedResponse(reply, time.monotonic() - lookup.started)
+        self._entries.set(lookup.key, response, ttl)
+        if self._index is not None and lookup.vector is not None:
+            self._index.add(lookup.key, lookup.vector)
+        self._counters["stored"] += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        if self._index is not None:
+            self._index = VectorIndex()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit rate per tier, and the model time the hits saved"""
+        hits = self._counters["exact_hits"] + self._counters["semantic_hits"]
+        lookups = hits + self._counters["misses"]
+        return {
+            "size": len(self._entries),
+            "semantic": self._index is not None,
+            **self._counters,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "saved_seconds": round(self._saved_seconds, 3),
+            "mean_lookup_ms": round(self._lookup_seconds / lookups * 1000, 3) if lookups else 0.0
+        }
+
+def openai_embedder(model: str = config.RESPONSE_CACHE_EMBEDDING_MODEL) -> Embedder:
+    """Embed prompts with the OpenAI embeddings API"""
+    from openai import AsyncOpenAI
+
+    client = AsyncOpenAI()
+
+    async def embed(text: str) -> Sequence[float]:
+        response = await client.embeddings.create(model=model, input=text)
+        return response.data[0].embedding
+    return embed
@@ -0,0 +1,143 @@
+"""Resumable Server-Sent Events streams for chat turns"""
+import asyncio
+import itertools
+import json
+import uuid
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from cache import TTLCache
+from config import config
+
+Frame = Dict[str, Any]
+
+class ReplayExpired(Exception):
+    """The requested event is no longer in the turn's replay buffer"""
+
+class StreamTurn:
+    """The frames of one chat turn, numbered and kept in a bounded replay buffer.
+
+    Frames are published by a background task that does not depend on any
+    HTTP request, so a client that loses its connection can come back with
+    the id of the last event it received and continue from the next one.
+    Only the last ``replay_size`` frames are kept; resuming from before them
+    raises ReplayExpired.
+    """
+
+    def __init__(self, turn_id: str, replay_size: int = config.SSE_REPLAY_EVENTS):
+        self.turn_id = turn_id
+        self.done = False
+        self._events: Deque[Tuple[int, Frame]] = deque(maxlen=replay_size)
+        self._next_seq = 1
+        self._changed = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def last_seq(self) -> int:
+        return self._next_seq - 1
+
+    async def publish(self, frame: Frame) -> None:
+        self._events.append((self._next_seq, frame))
+        self._next_seq += 1
+        self._notify()
+
+    def finish(self) -> None:
+        self.done = True
+        self._notify()
+
+    def _notify(self) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def available(self, after: int) -> bool:
+        """True if every event after ``after`` can still be replayed"""
+        first = self._events[0][0] if self._events else self._next_seq
+        return after + 1 >= first
+
+    async def events(self, after: int = 0,
+                     idle_timeout: Optional[float] = None) -> AsyncIterator[Optional[Tuple[int, Frame]]]:
+        """Yield ``(seq, frame)`` for every event after ``after``, live until the turn ends.
+
+        With ``idle_timeout``, None is yielded whenever no event arrived for
+        that many seconds, so the caller can keep the connection alive.
+        """
+        while True:
+            if not self.available(after):
+                raise ReplayExpired(f"Events after {self.turn_id}:{after} are no longer available")
+            changed = self._changed
+            first = self._events[0][0] if self._events else self._next_seq
+            for seq, frame in list(itertools.islice(self._events, max(0, after + 1 - first), None)):
+                yield seq, frame
+                after = seq
+            if after < self.last_seq:
+                continue
+            if self.done:
+                return
+            try:
+                await asyncio.wait_for(changed.wait(), idle_timeout)
+            except asyncio.TimeoutError:
+                yield None
+
+class StreamTurns:
+    """Running and recently finished SSE turns, by turn id.
+
+    Running turns are always kept. A finished turn stays resumable for
+    ``ttl`` seconds; at most ``maxsize`` finished turns are remembered.
+    """
+
+    def __init__(self, maxsize: int = config.SSE_MAX_TURNS, ttl: float = config.SSE_TURN_TTL):
+        self._turns = TTLCache(maxsize=maxsize, ttl=ttl)  # Finished turns
+        self._live: Dict[str, StreamTurn] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+
+    def start(self, produce: Callable[[Callable[[Frame], Awaitable[None]]], Awaitable[None]]) -> StreamTurn:
+        """Run ``produce(publish)`` in the background as a new turn"""
+        turn = StreamTurn(uuid.uuid4().hex)
+        self._live[turn.turn_id] = turn
+        self._running[turn.turn_id] = asyncio.create_task(self._run(turn, produce))
+        return turn
+
+    async def _run(self, turn: StreamTurn, produce) -> None:
+        try:
+            await produce(turn.publish)
+        except asyncio.CancelledError:
+            await turn.publish({"type": "cancelled", "content": ""})
+        except Exception as e:
+            await turn.publish({"type": "error", "content": str(e)})
+        finally:
+            turn.finish()
+            self._running.pop(turn.turn_id, None)
+            # The resume window starts when the turn ends
+            self._turns.set(turn.turn_id, turn)
+            self._live.pop(turn.turn_id, None)
+
+    def get(self, turn_id: str) -> Optional[StreamTurn]:
+        turn = self._live.get(turn_id)
+        return turn if turn is not None else self._turns.get(turn_id)
+
+    async def aclose(self) -> None:
+        """Cancel turns that are still running"""
+        tasks = list(self._running.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+def parse_event_id(event_id: str) -> Tuple[str, int]:
+    """Split a ``<turn_id>:<seq>`` event id"""
+    turn_id, _, seq = event_id.strip().rpartition(":")
+    if not turn_id or not seq.isdigit():
+        raise ValueError(f"Invalid event id: {event_id!r}")
+    return turn_id, int(seq)
+
+async def sse_events(turn: StreamTurn, after: int = 0,
+                     keepalive: float = config.SSE_KEEPALIVE) -> AsyncIterator[str]:
+    """The turn's events in text/event-stream format, with comment pings while idle"""
+    try:
+        async for event in turn.events(after, idle_timeout=keepalive):
+            if event is None:
+                yield ": ping\n\n"
+                continue
+            seq, frame = event
+            yield f"id: {turn.turn_id}:{seq}\nevent: {frame['type']}\ndata: {json.dumps(frame)}\n\n"
+    except ReplayExpired as e:
+        yield f"event: error\ndata: {json.dumps({'type': 'error', 'content': str(e)})}\n\n"
@@ -0,0 +1,126 @@
+"""Coalescing, back-pressured output stage for streamed chat responses"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from config import config
+
+class CoalescingStream:
+    """Batches streamed text deltas into fewer, larger frames.
+
+    ``write`` only appends the delta to a buffer. A sender task sends the
+    buffered text as one frame at most every ``flush_interval`` seconds, or
+    as soon as ``max_chars`` are waiting. While a send is in progress (for
+    example to a slow WebSocket client) deltas keep accumulating and go out
+    together in the next frame. If more than ``max_pending_chars`` are still
+    unsent, ``write`` waits for the sender to catch up, which slows the
+    model stream to the pace of the consumer instead of buffering without
+    limit.
+
+    ``close`` sends whatever is left and returns the full text, built once
+    with ``str.join``.
+    """
+
+    def __init__(self, send: Callable[[Dict[str, Any]], Awaitable[None]],
+                 flush_interval: float = config.STREAM_FLUSH_INTERVAL,
+                 max_chars: int = config.STREAM_FLUSH_CHARS,
+                 max_pending_chars: int = config.STREAM_MAX_PENDING_CHARS):
+        self._send = send
+        self.flush_interval = flush_interval
+        self.max_chars = max_chars
+        self.max_pending_chars = max_pending_chars
+        self._parts: List[str] = []
+        self._sent_parts = 0
+        self._pending_chars = 0
+        self.characters = 0
+        self.deltas = 0
+        self.frames = 0
+        self._has_data = asyncio.Event()
+        self._drained = asyncio.Event()
+        self._drained.set()
+        self._closing = False
+        self._sender: Optional[asyncio.Task] = None
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    async def write(self, delta: str) -> None:
+        if not delta:
+            return
+        if self._sender is None:
+            self._sender = asyncio.create_task(self._send_loop())
+        self._parts.append(delta)
+        self._pending_chars += len(delta)
+        self.characters += len(delta)
+        self.deltas += 1
+        self._has_data.set()
+        if self._pending_chars > self.max_pending_chars:
+            # Back-pressure: wait for the consumer before producing more
+            self._drained.clear()
+            await self._wait(self._drained)
+
+    async def close(self) -> str:
+        """Send the remaining text and return the whole response"""
+        if self._sender is not None:
+            self._closing = True
+            self._has_data.set()
+            await self._sender
+            self._sender = None
+        return self.text
+
+    async def abort(self) -> None:
+        """Stop sending; buffered text is dropped"""
+        if self._sender is not None:
+            self._sender.cancel()
+            try:
+                await self._sender
+            except (asyncio.CancelledError, Exception):
+                # A send error has already reached write() or close()
+                pass
+            self._sender = None
+        self._drained.set()
+
+    def stats(self) -> Dict[str, int]:
+        return {"characters": self.characters, "deltas": self.deltas, "frames": self.frames}
+
+    async def _wait(self, event: asyncio.Event) -> None:
+        # A failed sender would otherwise leave the writer waiting forever
+        waiter = asyncio.ensure_future(event.wait())
+        await asyncio.wait({waiter, self._sender}, return_when=asyncio.FIRST_COMPLETED)
+        if not waiter.done():
+            waiter.cancel()
+            self._sender.result()
+
+    async def _send_loop(self) -> None:
+        last_sent = 0.0
+        while True:
+            await self._has_data.wait()
+            if not self._closing:
+                # Let deltas accumulate for up to flush_interval since the last frame
+                delay = last_sent + self.flush_interval - time.monotonic()
+                if delay > 0 and self._pending_chars < self.max_chars:
+                    try:
+                        await asyncio.wait_for(self._size_reached(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+            self._has_data.clear()
+            end = len(self._parts)
+            if end > self._sent_parts:
+                content = "".join(self._parts[self._sent_parts:end])
+                self._sent_parts = end
+                self._pending_chars -= len(content)
+                await self._send({"type": "stream", "content": content})
+                self.frames += 1
+                last_sent = time.monotonic()
+            if self._pending_chars <= self.max_pending_chars:
+                self._drained.set()
+            if self._closing and self._sent_parts == len(self._parts):
+                return
+            if self._sent_parts < len(self._parts):
+                self._has_data.set()
+
+    async def _size_reached(self) -> None:
+        while self._pending_chars < self.max_chars and not self._closing:
+            self._has_data.clear()
+            await self._has_data.wait()
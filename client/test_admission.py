@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""Tests for model call admission control"""
+import asyncio
+import time
+
+from admission import (AdmissionController, AdmissionRejected, PRIORITY_RETRY, caller_key,
+                       is_rate_limited)
+
+class RateLimitError(Exception):
+    """Shaped like openai.RateLimitError"""
+    status_code = 429
+
+    def __init__(self, retry_after=None):
+        super().__init__("rate limited")
+        self.response = type("Response", (), {"headers": {"retry-after": retry_after} if retry_after else {}})()
+
+async def noop():
+    await asyncio.sleep(0)
+
+def unlimited(**kwargs):
+    options = dict(rate=0, user_rate=0, max_concurrent=100, max_queue=100, queue_timeout=5,
+                   backoff_initial=0.02, backoff_max=0.1)
+    options.update(kwargs)
+    return AdmissionController(**options)
+
+async def check_priority_order():
+    admission = unlimited(max_concurrent=1)
+    order = []
+    async def call(name, priority):
+        async with admission.admit("k", priority):
+            order.append(name)
+            await asyncio.sleep(0.005)
+
+    async with admission.admit("k"):
+        tasks = [asyncio.create_task(call("low1", 2)), asyncio.create_task(call("low2", 2)),
+                 asyncio.create_task(call("retry", PRIORITY_RETRY)), asyncio.create_task(call("normal", 1))]
+        await asyncio.sleep(0.01)
+        assert admission.stats()["queued"] == 4
+    await asyncio.gather(*tasks)
+    assert order == ["retry", "normal", "low1", "low2"]
+    assert admission.stats()["in_flight"] == 0
+
+async def check_user_buckets():
+    admission = unlimited(user_rate=20, user_burst=2)
+    done = {}
+    async def call(key, name):
+        async with admission.admit(key):
+            done[name] = time.monotonic()
+
+    start = time.monotonic()
+    await asyncio.gather(*[call("a", f"a{i}") for i in range(5)], call("b", "b0"), call("b", "b1"))
+    # The burst goes at once, the rest at the user's rate; user b never waits for a
+    assert done["b1"] - start < 0.02
+    assert done["a4"] - start >= 0.14
+    assert admission.stats()["admitted"] == 7
+
+async def check_global_bucket():
+    admission = unlimited(rate=50, burst=1)
+    start = time.monotonic()
+    await asyncio.gather(*[admission.call(f"user{i}", noop) for i in range(6)])
+    assert time.monotonic() - start >= 0.09
+
+async def check_rejections():
+    admission = unlimited(max_concurrent=1, max_queue=2, queue_timeout=0.05)
+    async with admission.admit("k"):
+        waiting = [asyncio.create_task(admission.call("k", noop)) for _ in range(2)]
+        await asyncio.sleep(0)
+        try:
+            await admission.call("k", noop)
+            assert False, "queue limit not enforced"
+        except AdmissionRejected as e:
+            assert e.retry_after >= 1
+        results = await asyncio.gather(*waiting, return_exceptions=True)
+    assert all(isinstance(r, AdmissionRejected) for r in results)
+    stats = admission.stats()
+    assert stats["rejected"] == 3 and stats["queued"] == 0 and stats["in_flight"] == 0
+
+async def check_rate_limit_retry():
+    admission = unlimited()
+    attempts = []
+    async def flaky():
+        attempts.append(time.monotonic())
+        if len(attempts) < 3:
+            raise RateLimitError()
+        return "ok"
+
+    assert await admission.call("k", flaky) == "ok"
+    assert len(attempts) == 3 and attempts[2] - attempts[0] >= 0.02
+    stats = admission.stats()
+    assert stats["rate_limited"] == 2 and stats["retries"] == 2
+
+    # Give up after max_retries; other errors are not retried
+    admission = unlimited(max_retries=1)
+    calls = []
+    async def always_limited():
+        calls.append(1)
+        raise RateLimitError()
+    try:
+        await admission.call("k", always_limited)
+        assert False
+    except RateLimitError:
+        assert len(calls) == 2
+    async def broken():
+        calls.append(1)
+        raise ValueError("bad request")
+    try:
+        await admission.call("k", broken)
+        assert False
+    except ValueError:
+        assert len(calls) == 3
+
+async def check_rate_limit_pauses_everyone():
+    admission = unlimited(backoff_initial=1, backoff_max=2)
+    assert admission.backoff(RateLimitError(retry_after="0.2"), 0) >= 0.5
+    start = time.monotonic()
+    await admission.call("other", noop)
+    assert time.monotonic() - start >= 0.4
+    assert is_rate_limited(RateLimitError()) and not is_rate_limited(ValueError())
+
+async def check_stream_retry():
+    admission = unlimited()
+    attempts = []
+    def chunks():
+        async def gen():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise RateLimitError()
+            for word in ("a", "b", "c"):
+                yield word
+                if len(attempts) == 2:
+                    raise RateLimitError()
+        return gen()
+
+    # Retried before the first chunk, but not once output has been sent
+    received = []
+    try:
+        async for chunk in admission.stream("k", chunks):
+            received.append(chunk)
+        assert False
+    except RateLimitError:
+        assert received == ["a"] and len(attempts) == 2
+    assert admission.stats()["in_flight"] == 0
+
+async def check_cancel_waiting():
+    admission = unlimited(max_concurrent=1)
+    async with admission.admit("k"):
+        task = asyncio.create_task(admission.call("k", noop))
+        await asyncio.sleep(0)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    assert admission.stats()["queued"] == 0
+    await admission.call("k", noop)
+    assert admission.stats()["in_flight"] == 0
+
+def check_caller_key():
+    assert caller_key("alice", "s1") == "user:alice"
+    assert caller_key("anonymous", "s1") == "session:s1"
+    assert caller_key(None, None) == "anonymous"
+
+def test_priority_order():
+    asyncio.run(check_priority_order())
+
+def test_user_buckets():
+    asyncio.run(check_user_buckets())
+
+def test_global_bucket():
+    asyncio.run(check_global_bucket())
+
+def test_rejections():
+    asyncio.run(check_rejections())
+
+def test_rate_limit_retry():
+    asyncio.run(check_rate_limit_retry())
+
+def test_rate_limit_pauses_everyone():
+    asyncio.run(check_rate_limit_pauses_everyone())
+
+def test_stream_retry():
+    asyncio.run(check_stream_retry())
+
+def test_cancel_waiting():
+    asyncio.run(check_cancel_waiting())
+
+def test_caller_key():
+    check_caller_key()
+
+if __name__ == "__main__":
+    test_priority_order()
+    test_user_buckets()
+    test_global_bucket()
+    test_rejections()
+    test_rate_limit_retry()
+    test_rate_limit_pauses_everyone()
+    test_stream_retry()
+    test_cancel_waiting()
+    test_caller_key()
+    print("✅ Admission control tests passed!")
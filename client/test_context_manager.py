@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Tests for the token-budgeted incremental context manager"""
+import asyncio
+import os
+import tempfile
+
+from context_manager import ContextManager
+from database import ChatDatabase
+
+TURNS = 100
+
+async def check_budget(db_path: str):
+    db = ChatDatabase(db_path)
+    await db.open()
+    await db.init_db()
+    await db.create_session("s1", "u1")
+
+    fetched = []
+    get_messages_after = db.get_messages_after
+    async def counting_fetch(*args, **kwargs):
+        rows = await get_messages_after(*args, **kwargs)
+        fetched.append(len(rows))
+        return rows
+    db.get_messages_after = counting_fetch
+
+    summaries = []
+    save_context_summary = db.save_context_summary
+    async def counting_save(*args):
+        summaries.append(args)
+        await save_context_summary(*args)
+    db.save_context_summary = counting_save
+
+    manager = ContextManager(db, token_budget=1000, low_water=0.6, summary_tokens=200)
+    for turn in range(TURNS):
+        await db.add_message("s1", "user", f"Question {turn}. " + "Some detail about the question. " * 5)
+        state = await manager.get("s1")
+        assert state.tokens <= manager.token_budget
+        assert state.messages[-1]["content"].startswith(f"Question {turn}.")
+        await db.add_message("s1", "assistant", f"Answer {turn}. " + "Some explanation of the answer. " * 8)
+
+    # Each warm turn reads only the rows added since the previous turn
+    assert max(fetched[1:]) == 2, fetched
+    # Hysteresis: the summary is rewritten every few turns, not every turn
+    assert 0 < len(summaries) < TURNS / 3, len(summaries)
+    assert "Question" in state.summary and manager.summary_tokens * 4 >= len(state.summary)
+
+    # A cold start reads the stored summary plus only the rows after it
+    fetched.clear()
+    cold = await ContextManager(db, token_budget=1000, low_water=0.6, summary_tokens=200).get("s1")
+    assert cold.summary == state.summary
+    assert fetched[0] <= len(state.messages) + 1
+    assert cold.tokens <= 1000
+
+    await db.close()
+
+async def check_oversized_message(db_path: str):
+    db = ChatDatabase(db_path)
+    await db.init_db()
+    await db.create_session("s1", "u1")
+    await db.add_message("s1", "user", "x" * 100_000)
+    state = await ContextManager(db, token_budget=1000).get("s1")
+    assert len(state.messages) == 1 and state.tokens <= 1000
+
+def test_budget():
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(check_budget(os.path.join(tmp, "context.db")))
+
+def test_oversized_message():
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(check_oversized_message(os.path.join(tmp, "big.db")))
+
+if __name__ == "__main__":
+    test_budget()
+    test_oversized_message()
+    print("✅ Context manager tests passed!")
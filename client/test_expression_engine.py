@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Tests for the shared calculator expression engine"""
+import math
+import time
+
+import expression_engine
+from expression_engine import ExpressionError, calculate, compile_expression, evaluate
+
+def test_arithmetic_matches_eval():
+    names = {"abs": abs, "round": round, "min": min, "max": max, "sum": sum, "pow": pow,
+             "sqrt": math.sqrt, "sin": math.sin, "cos": math.cos, "tan": math.tan,
+             "pi": math.pi, "e": math.e}
+    for text in ["2 + 2", "sqrt(16) + 2**10", "-3**2", "7 // 2 + 7 % 3", "round(pi, 3)",
+                 "max(1, 5, 3) - min([4, 2])", "sum((1, 2, 3)) / 4", "pow(2, 10, 1000)", "2**-1",
+                 "abs(sin(e) * cos(1) + tan(0.5))"]:
+        assert evaluate(text) == eval(text, {"__builtins__": {}}, names), text
+
+def test_rejects_unsafe_syntax():
+    for text in ['__import__("os")', "().__class__", "[x for x in (1, 2)]", "lambda: 1",
+                 '"a" * 3', "[1] * 10**8", "2 ^ 3", "_pow(2, 2)", "sqrt", "open('f')", "a if 1 else b"]:
+        result = calculate(text)
+        assert result["success"] is False, text
+    assert "use **" in calculate("2 ^ 3")["error"]
+
+def test_limits():
+    start = time.perf_counter()
+    for text in ["9**9**9", "pow(9, 9**9)", "10**100000", "9**4000 * 9**4000", "(2**10000)**2"]:
+        result = calculate(text)
+        assert result["success"] is False, text
+    assert time.perf_counter() - start < 0.5
+    assert evaluate("2**10000") == 2**10000
+    assert evaluate("pow(3, 10**9, 7)") == pow(3, 10**9, 7)
+    assert not calculate("1" * (expression_engine.MAX_EXPRESSION_LENGTH + 1))["success"]
+    start = time.perf_counter()
+    for text in ["pow(3, 3**8000, 2**4096 - 1)", "round(5, -10**7)", "2**10000 * 3**6000"]:
+        assert calculate(text)["success"] is False, text
+    assert time.perf_counter() - start < 0.1
+    try:
+        evaluate("x % 7", {"x": 2**20000})
+        assert False, "oversized variable accepted"
+    except ExpressionError:
+        pass
+
+def test_compiled_cache():
+    compile_expression.cache_clear()
+    for _ in range(100):
+        evaluate("1 + 2 * 3")
+    info = compile_expression.cache_info()
+    assert info.misses == 1 and info.hits == 99
+
+def test_evaluate_many():
+    compiled = compile_expression("x**2 + y")
+    assert compiled.names == frozenset({"x", "y"})
+    assert compiled.evaluate_many([{"x": i, "y": 1} for i in range(4)]) == [1, 2, 5, 10]
+    try:
+        compiled.evaluate({"x": 1})
+        assert False, "missing variable accepted"
+    except ExpressionError as e:
+        assert "y" in str(e)
+
+    rows = ({"x": 2**4000, "y": 0} for _ in range(10**7))
+    start = time.perf_counter()
+    try:
+        compiled.evaluate_many(rows, time_limit=0.05)
+        assert False, "time limit not enforced"
+    except TimeoutError:
+        pass
+    assert time.perf_counter() - start < 1.0
+
+def test_evaluate_time_limit():
+    # Each pow takes tens of milliseconds; twenty of them far exceed the limit
+    compiled = compile_expression(" + ".join(["pow(3**8000, 3**8000, 2**1024 - 159)"] * 20))
+    start = time.perf_counter()
+    try:
+        compiled.evaluate(time_limit=0.05)
+        assert False, "time limit not enforced"
+    except TimeoutError as e:
+        assert "0.05s" in str(e)
+    assert time.perf_counter() - start < 0.5
+    # The deadline belongs to that evaluation only
+    assert compile_expression("2**10 * 3").evaluate() == 3072
+
+if __name__ == "__main__":
+    test_arithmetic_matches_eval()
+    test_rejects_unsafe_syntax()
+    test_limits()
+    test_compiled_cache()
+    test_evaluate_many()
+    test_evaluate_time_limit()
+    print("✅ Expression engine tests passed!")
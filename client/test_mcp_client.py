@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Tests for the shared, pooled MCP client lifecycle"""
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI, Request
+
+from mcp_client import MCPClient, get_mcp_client
+
+TOOL_LATENCY = 0.1
+
+async def check_pool_lifecycle():
+    client = await MCPClient("http://127.0.0.1:9").open()
+    pool = client.http
+    assert client.http is pool, "calls must share one connection pool"
+
+    # A failed call reports an error and leaves the pool usable
+    result = await client.call_tool("echo", {})
+    assert "error" in result
+    assert not pool.is_closed and client.http is pool
+
+    await client.aclose()
+    assert pool.is_closed
+    # Use after shutdown reopens instead of failing on a closed client
+    assert not client.http.is_closed
+    await client.aclose()
+
+def make_slow_server(seen_ids: list) -> FastAPI:
+    """JSON-RPC endpoint where every tool call takes TOOL_LATENCY seconds"""
+    server = FastAPI()
+
+    @server.post("/mcp/")
+    async def mcp(request: Request):
+        body = await request.json()
+        seen_ids.append(body["id"])
+        await asyncio.sleep(TOOL_LATENCY)
+        if body["params"]["name"] == "missing":
+            return {"jsonrpc": "2.0", "id": body["id"], "error": {"code": -32602, "message": "Unknown tool: missing"}}
+        return {"jsonrpc": "2.0", "id": body["id"], "result": {"echo": body["params"]["arguments"]}}
+
+    return server
+
+async def check_batch(max_concurrent_calls: int, calls: int) -> float:
+    seen_ids = []
+    client = MCPClient("http://mcp", max_concurrent_calls=max_concurrent_calls)
+    client.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=make_slow_server(seen_ids)), base_url="http://mcp")
+
+    batch = [("echo", {"n": i}) for i in range(calls)] + [("missing", {})]
+    start = time.perf_counter()
+    results = await client.call_tools_batch(batch)
+    elapsed = time.perf_counter() - start
+
+    # Results line up with the calls, failures stay in their own slot
+    assert [result["echo"]["n"] for result in results[:-1]] == list(range(calls))
+    assert "Unknown tool" in results[-1]["error"]
+    assert len(set(seen_ids)) == len(seen_ids) == calls + 1
+    await client.aclose()
+    return elapsed
+
+def test_batch_runs_concurrently():
+    elapsed = asyncio.run(check_batch(max_concurrent_calls=16, calls=5))
+    # max(latency), not sum(latency)
+    assert elapsed < TOOL_LATENCY * 3, elapsed
+
+def test_batch_concurrency_cap():
+    elapsed = asyncio.run(check_batch(max_concurrent_calls=2, calls=3))
+    # Four calls, two at a time: two rounds of latency
+    assert elapsed >= TOOL_LATENCY * 2, elapsed
+
+def test_pool_lifecycle():
+    asyncio.run(check_pool_lifecycle())
+
+def test_shared_instance():
+    assert get_mcp_client() is get_mcp_client()
+
+if __name__ == "__main__":
+    test_pool_lifecycle()
+    test_shared_instance()
+    test_batch_runs_concurrently()
+    test_batch_concurrency_cap()
+    print("✅ MCP client tests passed!")
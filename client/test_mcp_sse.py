@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Tests for the SSE session's event parsing and request correlation"""
+import asyncio
+
+import httpx
+
+from mcp_sse import MCPSSESession, iter_sse_events
+
+async def check_event_parsing():
+    body = (
+        b": keep-alive\n\n"
+        b"event: endpoint\ndata: /sse/messages/?session_id=abc\n\n"
+        b"event: message\ndata: {\"jsonrpc\": \"2.0\", \"id\": 1,\n"
+        b"data: \"result\": {}}\n\n"
+    )
+    events = [event async for event in iter_sse_events(httpx.Response(200, content=body))]
+    assert events == [
+        ("endpoint", "/sse/messages/?session_id=abc"),
+        ("message", "{\"jsonrpc\": \"2.0\", \"id\": 1,\n\"result\": {}}"),
+    ]
+
+async def check_correlation():
+    session = MCPSSESession(lambda: None)
+    loop = asyncio.get_running_loop()
+    first, second = loop.create_future(), loop.create_future()
+    session._pending = {1: first, 2: second}
+
+    # Responses may arrive in any order
+    session._dispatch({"jsonrpc": "2.0", "id": 2, "result": {"n": 2}})
+    session._dispatch({"jsonrpc": "2.0", "method": "notifications/progress"})
+    assert second.result()["result"] == {"n": 2} and not first.done()
+
+    # A dropped stream fails whatever is still waiting
+    session._disconnected(ConnectionError("MCP SSE stream closed"))
+    assert isinstance(first.exception(), ConnectionError)
+    assert not session.connected
+
+async def check_server_requests():
+    posted = []
+    async def post(message):
+        posted.append(message)
+        if message["id"] == "bad":
+            raise httpx.ConnectError("connection refused")
+
+    session = MCPSSESession(lambda: None)
+    session._post = post
+    session._dispatch({"jsonrpc": "2.0", "id": 7, "method": "ping"})
+    session._dispatch({"jsonrpc": "2.0", "id": 8, "method": "sampling/createMessage"})
+    session._dispatch({"jsonrpc": "2.0", "id": "bad", "method": "ping"})
+    # Replies stay referenced until they finish, failures included
+    assert len(session._replies) == 3
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert not session._replies
+    assert posted[0] == {"jsonrpc": "2.0", "id": 7, "result": {}}
+    assert posted[1]["error"]["code"] == -32601
+
+    async def stalled(message):
+        await asyncio.Event().wait()
+    session._post = stalled
+    session._dispatch({"jsonrpc": "2.0", "id": 9, "method": "ping"})
+    await asyncio.sleep(0)
+    (task,) = session._replies
+    await session.close()
+    assert task.cancelled() and not session._replies
+
+def test_event_parsing():
+    asyncio.run(check_event_parsing())
+
+def test_correlation():
+    asyncio.run(check_correlation())
+
+def test_server_requests():
+    asyncio.run(check_server_requests())
+
+if __name__ == "__main__":
+    test_event_parsing()
+    test_correlation()
+    test_server_requests()
+    print("✅ MCP SSE session tests passed!")
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Tests for the cached MCP tool catalog and typed tool registration"""
+import asyncio
+
+import httpx
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+from pydantic_ai import Agent
+from pydantic_ai.messages import ModelResponse, TextPart, ToolCallPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from mcp_client import MCPClient
+from mcp_tools import register_mcp_tools
+
+LIST_TASKS_SCHEMA = {
+    "type": "object",
+    "properties": {"status": {"type": "string"}, "limit": {"type": "integer", "default": 50}},
+}
+
+def make_server(catalog: dict, requests: list) -> FastAPI:
+    """Minimal stand-in for the MCP server's /tools and /mcp/ endpoints"""
+    server = FastAPI()
+
+    @server.get("/tools")
+    async def tools(request: Request):
+        etag = f'"{catalog["version"]}"'
+        requests.append(("GET /tools", request.headers.get("if-none-match")))
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        return JSONResponse(catalog, headers={"ETag": etag})
+
+    @server.post("/mcp/")
+    async def mcp(request: Request):
+        body = await request.json()
+        requests.append(("POST /mcp/", body["params"]))
+        return {"jsonrpc": "2.0", "id": body["id"], "result": {"tasks": []}}
+
+    return server
+
+def make_client(server: FastAPI, ttl: float) -> MCPClient:
+    client = MCPClient("http://mcp", tools_ttl=ttl)
+    client.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=server), base_url="http://mcp")
+    return client
+
+async def check_catalog_cache():
+    catalog = {"version": "v1", "tools": [{"name": "list_tasks", "description": "List tasks", "inputSchema": LIST_TASKS_SCHEMA}]}
+    requests = []
+    client = make_client(make_server(catalog, requests), ttl=60)
+
+    tools = await client.list_tools()
+    assert [tool.name for tool in tools] == ["list_tasks"]
+    assert await client.list_tools() is tools
+    assert len(requests) == 1, "fresh catalog must not hit the server"
+
+    # Expired: revalidated with the ETag, unchanged catalog is a 304
+    client.invalidate_tools()
+    assert await client.list_tools() is tools
+    assert requests[-1] == ("GET /tools", '"v1"')
+
+    # A new version replaces the cache
+    catalog["version"] = "v2"
+    catalog["tools"].append({"name": "create_task", "description": "Create a task", "inputSchema": {}})
+    client.invalidate_tools()
+    assert {tool.name for tool in await client.list_tools()} == {"list_tasks", "create_task"}
+    assert client.tools_etag == '"v2"'
+    await client.aclose()
+
+async def check_typed_tools():
+    catalog = {"version": "v1", "tools": [{"name": "list_tasks", "description": "List tasks", "inputSchema": LIST_TASKS_SCHEMA}]}
+    requests = []
+    client = make_client(make_server(catalog, requests), ttl=60)
+    seen_tools = []
+
+    def model(messages, info: AgentInfo) -> ModelResponse:
+        if len(messages) == 1:
+            seen_tools.extend(info.function_tools)
+            return ModelResponse(parts=[ToolCallPart.from_raw_args("list_tasks", {"status": "pending"})])
+        return ModelResponse(parts=[TextPart("done")])
+
+    agent = Agent(FunctionModel(model))
+
+    @agent.tool_plain
+    def local_tool() -> str:
+        """A local tool"""
+        return "local"
+
+    tools = await client.list_tools()
+    tools.append(client._parse_tool({"name": "local_tool", "description": "clash"}))
+    assert register_mcp_tools(agent, client, tools) == ["list_tasks"]
+
+    result = await agent.run("show my pending tasks")
+    assert result.data == "done"
+    tool_def = next(tool for tool in seen_tools if tool.name == "list_tasks")
+    assert tool_def.parameters_json_schema == LIST_TASKS_SCHEMA
+    assert tool_def.description == "List tasks"
+    # Called directly by name, no discovery round trip
+    assert requests[-1] == ("POST /mcp/", {"name": "list_tasks", "arguments": {"status": "pending"}})
+    assert [r for r in requests if r[0] == "GET /tools"] == [("GET /tools", None)]
+    await client.aclose()
+
+def test_catalog_cache():
+    asyncio.run(check_catalog_cache())
+
+def test_typed_tools():
+    asyncio.run(check_typed_tools())
+
+if __name__ == "__main__":
+    test_catalog_cache()
+    test_typed_tools()
+    print("✅ MCP tool catalog tests passed!")
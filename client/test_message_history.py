@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""Tests for structured, per-session message history in the chat agents"""
+import asyncio
+import os
+import tempfile
+from statistics import mean
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+import httpx
+from fastapi import FastAPI
+from pydantic_ai.messages import (
+    ModelRequest, ModelResponse, SystemPromptPart, TextPart, ToolCallPart, ToolReturnPart, UserPromptPart
+)
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from admission import AdmissionController
+from config import config
+from context_manager import ContextManager, estimate_tokens
+from conversation_agent import ChatContext, ConversationAgent
+from database import ChatDatabase
+from mcp_client import MCPClient
+
+TURNS = 50
+TOOL_TURN = 10
+
+def part_tokens(part) -> int:
+    if isinstance(part, (SystemPromptPart, UserPromptPart, TextPart)):
+        return estimate_tokens(part.content)
+    if isinstance(part, ToolReturnPart):
+        return estimate_tokens(part.model_response_str())
+    if isinstance(part, ToolCallPart):
+        return estimate_tokens(part.args_as_json_str())
+    return 0
+
+def messages_tokens(messages) -> int:
+    return sum(part_tokens(part) for message in messages for part in message.parts)
+
+def make_agent() -> ConversationAgent:
+    catalog = FastAPI()
+
+    @catalog.get("/tools")
+    async def tools():
+        return {"version": "v1", "tools": []}
+
+    # The model is replaced with a FunctionModel; any provider will do here
+    provider = config.MODEL_PROVIDER
+    config.MODEL_PROVIDER = "openai"
+    try:
+        agent = ConversationAgent()
+    finally:
+        config.MODEL_PROVIDER = provider
+    agent.mcp_client = MCPClient("http://mcp")
+    agent.mcp_client.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=catalog), base_url="http://mcp")
+    # Fifty quick turns from one user would otherwise wait on the per-user rate limit
+    agent.admission = AdmissionController(rate=0, user_rate=0)
+    return agent
+
+async def check_fifty_turns(db_path: str):
+    db = ChatDatabase(db_path)
+    await db.open()
+    await db.init_db()
+    await db.create_session("s1", "u1")
+    contexts = ContextManager(db, token_budget=1500, low_water=0.6, summary_tokens=200)
+    agent = make_agent()
+
+    requests = []
+    def model(messages, info: AgentInfo) -> ModelResponse:
+        requests.append(list(messages))
+        turn = len([m for m in messages if isinstance(m, ModelRequest)
+                    and any(isinstance(p, UserPromptPart) for p in m.parts)])
+        last = messages[-1].parts[-1]
+        if isinstance(last, UserPromptPart) and last.content.startswith(f"Question {TOOL_TURN - 1}."):
+            return ModelResponse([ToolCallPart.from_raw_args("get_weather", {"location": "Paris"})])
+        return ModelResponse([TextPart(f"Answer {turn}. " + "Some explanation of the answer. " * 6)])
+
+    native_input, native_uncached, flat_input, prefix_hits, summaries = [], [], [], 0, set()
+    with agent.agent.override(model=FunctionModel(model)):
+        for turn in range(TURNS):
+            message = f"Question {turn}. " + "Some detail about the question. " * 4
+            await db.add_message("s1", "user", message)
+            state = await contexts.get("s1")
+            summaries.add(state.summary)
+            context = ChatContext(user_id="u1", session_id="s1",
+                                  message_history=state.history(), summary=state.summary)
+            before = len(requests)
+            reply = await agent.chat(message, context)
+            assert reply.startswith("Answer"), reply
+            await db.add_message("s1", "assistant", reply)
+
+            request = requests[before]
+            previous = requests[before - 1] if before else []
+            shared = 0
+            while shared < min(len(request), len(previous)) and request[shared] == previous[shared]:
+                shared += 1
+            if previous and shared == len(previous):
+                prefix_hits += 1
+            native_input.append(messages_tokens(request))
+            native_uncached.append(messages_tokens(request[shared:]))
+
+            # The same context sent the old way: one flattened prompt per turn
+            flattened = agent.histories.system_prompt + "\n".join(
+                [state.summary] + [f"{m['role'].capitalize()}: {m['content']}" for m in state.history()])
+            flat_input.append(estimate_tokens(flattened))
+
+    # Each turn extends the previous request except when older turns are summarized
+    evictions = len(summaries) - 1
+    assert evictions > 0
+    assert prefix_hits >= TURNS - 1 - evictions, (prefix_hits, evictions)
+
+    # The tool call and its return stay in the next turn's history, and are
+    # dropped once the history is rebuilt around a new summary
+    tool_turn = requests[TOOL_TURN + 1]
+    assert any(isinstance(p, ToolReturnPart) for m in tool_turn for p in m.parts)
+    assert not any(isinstance(p, ToolReturnPart) for m in requests[-1] for p in m.parts)
+
+    # Total input stays within the context budget; only the newest exchange is uncached
+    assert max(native_input) <= max(flat_input) + 100, (max(native_input), max(flat_input))
+    assert mean(native_uncached) < mean(native_input) / 4, (mean(native_uncached), mean(native_input))
+    print(f"input tokens/turn: native {mean(native_input):.0f} (uncached {mean(native_uncached):.0f}), "
+          f"flattened {mean(flat_input):.0f} (uncached {mean(flat_input):.0f}); "
+          f"{prefix_hits}/{TURNS - 1} prefix hits, {evictions} summary rewrites")
+
+    await db.close()
+
+async def check_stream_history():
+    agent = make_agent()
+    requests = []
+
+    async def stream_model(messages, info: AgentInfo):
+        requests.append(list(messages))
+        yield "Hello "
+        yield f"number {len(requests)}"
+
+    history = []
+    with agent.agent.override(model=FunctionModel(stream_function=stream_model)):
+        for turn in range(3):
+            message = f"Message {turn}"
+            history.append({"role": "user", "content": message})
+            context = ChatContext(user_id="u1", session_id="s2", message_history=list(history))
+            reply = "".join([chunk async for chunk in agent.stream_chat(message, context)])
+            assert reply == f"Hello number {turn + 1}", reply
+            history.append({"role": "assistant", "content": reply})
+
+    # The first message carries the system prompt, later turns are plain messages
+    first, last = requests[0], requests[-1]
+    assert isinstance(first[0].parts[0], SystemPromptPart)
+    assert last[:len(requests[1])] == requests[1]
+    assert [type(m).__name__ for m in last] == ["ModelRequest", "ModelRequest", "ModelResponse",
+                                                "ModelRequest", "ModelResponse", "ModelRequest"]
+    assert last[-1].parts[0].content == "Message 2"
+
+def test_fifty_turns():
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(check_fifty_turns(os.path.join(tmp, "chat.db")))
+
+def test_stream_history():
+    asyncio.run(check_stream_history())
+
+if __name__ == "__main__":
+    test_fifty_turns()
+    test_stream_history()
+    print("✅ Message history tests passed!")
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Tests for KDF password hashing and transparent rehash of legacy hashes"""
+import asyncio
+import hashlib
+import os
+import tempfile
+
+from database import ChatDatabase
+from passwords import PasswordHasher
+
+def test_hash_formats():
+    pbkdf2 = PasswordHasher("pbkdf2_sha256", pbkdf2_iterations=1000)
+    stored = pbkdf2.hash_sync("secret")
+    assert stored.startswith("pbkdf2_sha256$1000$")
+    assert pbkdf2.verify_sync("secret", stored)
+    assert not pbkdf2.verify_sync("wrong", stored)
+    assert not pbkdf2.needs_rehash(stored)
+    assert PasswordHasher("pbkdf2_sha256", pbkdf2_iterations=2000).needs_rehash(stored)
+
+    scrypt = PasswordHasher("scrypt", scrypt_n=2 ** 10)
+    stored = scrypt.hash_sync("secret")
+    assert stored.startswith("scrypt$1024$8$1$")
+    assert scrypt.verify_sync("secret", stored)
+    assert pbkdf2.needs_rehash(stored)
+
+    assert not pbkdf2.verify_sync("secret", "garbage")
+
+async def check_legacy_rehash(db_path: str):
+    db = ChatDatabase(db_path)
+    db.passwords = PasswordHasher("pbkdf2_sha256", pbkdf2_iterations=1000)
+    await db.open()
+    await db.init_db()
+
+    user_id = await db.create_user("legacy@example.com", "password123")
+    # Store the pre-KDF single-round SHA-256 format
+    salt = "abcd"
+    legacy = f"{salt}:{hashlib.sha256(('password123' + salt).encode()).hexdigest()}"
+    async with db._writer() as conn:
+        await conn.execute("UPDATE users SET password_hash = ? WHERE id = ?", (legacy, user_id))
+        await conn.commit()
+
+    assert await db.authenticate_user("legacy@example.com", "wrong") is None
+    user = await db.authenticate_user("legacy@example.com", "password123")
+    assert user["id"] == user_id
+
+    async with db._reader() as conn:
+        cursor = await conn.execute("SELECT password_hash FROM users WHERE id = ?", (user_id,))
+        stored = (await cursor.fetchone())[0]
+    assert stored.startswith("pbkdf2_sha256$1000$"), stored
+    assert (await db.authenticate_user("legacy@example.com", "password123"))["id"] == user_id
+
+    await db.close()
+
+def test_legacy_rehash():
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(check_legacy_rehash(os.path.join(tmp, "passwords.db")))
+
+if __name__ == "__main__":
+    test_hash_formats()
+    test_legacy_rehash()
+    print("✅ Password hashing tests passed!")
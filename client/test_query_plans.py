@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""Query-plan regression tests for the chat history schema"""
+import asyncio
+import os
+import tempfile
+
+import aiosqlite
+
+from database import ChatDatabase, SESSION_MESSAGES_QUERY, USER_SESSIONS_QUERY
+from migrations import LATEST_VERSION, migrate
+
+LEGACY_SCHEMA = [
+    """
+    CREATE TABLE chat_sessions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id TEXT UNIQUE NOT NULL,
+        user_id TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE chat_messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id TEXT NOT NULL,
+        role TEXT NOT NULL,
+        content TEXT NOT NULL,
+        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    "INSERT INTO chat_sessions (session_id, user_id) VALUES ('legacy', 'alice')",
+    "INSERT INTO chat_messages (session_id, role, content) VALUES ('legacy', 'user', 'hello')",
+]
+
+async def query_plan(db_path: str, query: str, params: tuple) -> str:
+    async with aiosqlite.connect(db_path) as conn:
+        cursor = await conn.execute(f"EXPLAIN QUERY PLAN {query}", params)
+        return "\n".join(row[3] for row in await cursor.fetchall())
+
+async def check_query_plans(db_path: str):
+    db = ChatDatabase(db_path)
+    await db.init_db()
+
+    plan = await query_plan(db_path, SESSION_MESSAGES_QUERY, ("s1", 50))
+    print(f"get_session_messages:\n{plan}")
+    assert "idx_chat_messages_session_id" in plan, plan
+    assert "TEMP B-TREE" not in plan, plan
+
+    plan = await query_plan(db_path, USER_SESSIONS_QUERY, ("alice", "~", 0, 100))
+    print(f"get_user_sessions:\n{plan}")
+    assert "idx_chat_sessions_user_updated" in plan, plan
+    assert "TEMP B-TREE" not in plan, plan
+
+async def check_upgrade_in_place(db_path: str):
+    async with aiosqlite.connect(db_path) as conn:
+        for statement in LEGACY_SCHEMA:
+            await conn.execute(statement)
+        await conn.commit()
+
+    db = ChatDatabase(db_path)
+    await db.init_db()
+    await db.init_db()  # Re-running must be a no-op
+
+    async with aiosqlite.connect(db_path) as conn:
+        cursor = await conn.execute("SELECT MAX(version), COUNT(*) FROM schema_version")
+        version, applied = await cursor.fetchone()
+    assert version == LATEST_VERSION and applied == LATEST_VERSION, (version, applied)
+
+    messages = await db.get_session_messages("legacy")
+    assert [m["content"] for m in messages] == ["hello"], messages
+
+    sessions, _ = await db.get_user_sessions("alice")
+    assert sessions[0]["message_count"] == 1, sessions
+
+async def check_session_pagination(db_path: str):
+    db = ChatDatabase(db_path)
+    await db.init_db()
+    for i in range(7):
+        await db.create_session(f"s{i}", "bob")
+        for _ in range(i):
+            await db.add_message(f"s{i}", "user", "hi")
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = await db.get_user_sessions("bob", limit=3, cursor=cursor)
+        seen.extend(page)
+        if cursor is None:
+            break
+    assert sorted(s["session_id"] for s in seen) == [f"s{i}" for i in range(7)], seen
+    counts = {s["session_id"]: s["message_count"] for s in seen}
+    assert counts == {f"s{i}": i for i in range(7)}, counts
+
+class MigratedMeanwhile:
+    """A connection on which another process finishes migrating right after the first version read"""
+
+    def __init__(self, conn: aiosqlite.Connection, other: aiosqlite.Connection):
+        self.conn, self.other = conn, other
+        self.execute, self.rollback = conn.execute, conn.rollback
+
+    async def commit(self):
+        if self.other is not None:
+            other, self.other = self.other, None
+            assert await migrate(other) == LATEST_VERSION
+        await self.conn.commit()
+
+async def check_concurrent_migrate(db_path: str):
+    async with aiosqlite.connect(db_path) as first, aiosqlite.connect(db_path) as second:
+        assert await migrate(MigratedMeanwhile(first, second)) == LATEST_VERSION
+
+    async with aiosqlite.connect(db_path) as conn:
+        cursor = await conn.execute("SELECT COUNT(*) FROM schema_version")
+        assert (await cursor.fetchone())[0] == LATEST_VERSION
+
+def test_query_plans_use_indexes():
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(check_query_plans(os.path.join(tmp, "plans.db")))
+
+def test_legacy_database_upgrades_in_place():
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(check_upgrade_in_place(os.path.join(tmp, "legacy.db")))
+
+def test_session_listing_paginates_with_counts():
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(check_session_pagination(os.path.join(tmp, "pages.db")))
+
+def test_concurrent_migrate_applies_once():
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(check_concurrent_migrate(os.path.join(tmp, "race.db")))
+
+if __name__ == "__main__":
+    test_query_plans_use_indexes()
+    test_legacy_database_upgrades_in_place()
+    test_session_listing_paginates_with_counts()
+    test_concurrent_migrate_applies_once()
+    print("\n✅ Query plan tests passed!")
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""Tests for the exact and semantic response cache"""
+import asyncio
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+import httpx
+from fastapi import FastAPI
+from pydantic_ai.messages import ModelResponse, TextPart, ToolCallPart, ToolReturnPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from admission import AdmissionController
+from config import config
+from conversation_agent import ChatContext, ConversationAgent
+from mcp_client import MCPClient
+from response_cache import ResponseCache, cache_ttl, context_fingerprint, normalize_prompt, tools_called
+
+VOCABULARY = ["what", "which", "tools", "do", "you", "have", "time", "is", "it", "weather", "paris"]
+
+async def bag_of_words(text):
+    """A toy embedding: word counts over a fixed vocabulary"""
+    words = text.replace("?", "").split()
+    return [float(words.count(word)) for word in VOCABULARY] + [0.1]
+
+async def check_exact_tier():
+    cache = ResponseCache(maxsize=10, ttl=60)
+    empty = context_fingerprint("", [])
+    lookup = await cache.get("What tools do you have?", empty)
+    assert lookup.response is None
+    cache.put(lookup, "calculator, weather, ...", 60)
+
+    hit = await cache.get("  what TOOLS do you   have ", empty)
+    assert hit.tier == "exact" and hit.response.reply == "calculator, weather, ..."
+    # Another conversation, or a reply that must not be reused
+    assert (await cache.get("What tools do you have?", context_fingerprint("", [("user", "hi")]))).response is None
+    lookup = await cache.get("save a note", empty)
+    cache.put(lookup, "saved", None)
+    assert (await cache.get("save a note", empty)).response is None
+
+    # Per-entry TTL
+    lookup = await cache.get("weather in paris", empty)
+    cache.put(lookup, "sunny", 0.05)
+    assert (await cache.get("weather in paris", empty)).response is not None
+    time.sleep(0.06)
+    assert (await cache.get("weather in paris", empty)).response is None
+
+    stats = cache.stats()
+    assert stats["exact_hits"] == 2 and stats["misses"] == 6 and stats["stored"] == 2 and stats["bypassed"] == 1
+    assert stats["hit_rate"] == 0.25 and stats["saved_seconds"] >= 0
+    assert normalize_prompt(" What time is it in UTC?? ") == "what time is it in utc"
+
+async def check_semantic_tier():
+    cache = ResponseCache(maxsize=10, ttl=60, embed=bag_of_words, similarity=0.8)
+    empty = context_fingerprint("", [])
+    lookup = await cache.get("What tools do you have?", empty)
+    cache.put(lookup, "tool list", 60)
+
+    hit = await cache.get("Which tools do you have", empty)
+    assert hit.tier == "semantic" and hit.response.reply == "tool list"
+    assert (await cache.get("what is the weather in paris", empty)).response is None
+    assert (await cache.get("Which tools do you have", context_fingerprint("x", []))).response is None
+
+    async def broken(text):
+        raise ConnectionError("embedding service down")
+    cache = ResponseCache(embed=broken)
+    assert (await cache.get("anything", empty)).response is None
+    assert cache.stats()["embedding_errors"] == 1
+
+def check_tool_policy():
+    def call(name, **args):
+        return ModelResponse(parts=[ToolCallPart.from_raw_args(name, args)])
+
+    assert cache_ttl([], 3600) == 3600
+    assert cache_ttl(tools_called([call("calculator", expression="1+1")]), 3600) == 3600
+    assert cache_ttl(tools_called([call("calculator"), call("get_weather", location="Paris")]), 3600) == 600
+    assert cache_ttl(tools_called([call("save_note", title="t", content="c")]), 3600) is None
+    assert cache_ttl(tools_called([call("get_current_time")]), 3600) is None
+    mcp = call("call_mcp_tool", tool_name="create_task", arguments={"title": "x"})
+    assert tools_called([mcp]) == ["call_mcp_tool", "create_task"]
+    assert cache_ttl(tools_called([mcp]), 3600) is None
+    batch = call("call_mcp_tool", calls=[{"tool_name": "unit_converter"}, {"tool_name": "calculator"}])
+    assert cache_ttl(tools_called([batch]), 3600) == 3600
+
+def make_agent() -> ConversationAgent:
+    catalog = FastAPI()
+
+    @catalog.get("/tools")
+    async def tools():
+        return {"version": "v1", "tools": []}
+
+    provider = config.MODEL_PROVIDER
+    config.MODEL_PROVIDER = "openai"
+    try:
+        agent = ConversationAgent()
+    finally:
+        config.MODEL_PROVIDER = provider
+    agent.mcp_client = MCPClient("http://mcp")
+    agent.mcp_client.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=catalog), base_url="http://mcp")
+    agent.admission = AdmissionController(rate=0, user_rate=0)
+    agent.responses = ResponseCache(maxsize=100, ttl=60)
+    return agent
+
+async def check_agent_cache():
+    agent = make_agent()
+    runs = []
+
+    async def model(messages, info: AgentInfo):
+        last = messages[-1].parts[-1]
+        if isinstance(last, ToolReturnPart):
+            return ModelResponse(parts=[TextPart("Saved it.")])
+        prompt = last.content
+        runs.append(prompt)
+        await asyncio.sleep(0.01)
+        if prompt.startswith("Save"):
+            return ModelResponse(parts=[ToolCallPart.from_raw_args("save_note", {"title": "t", "content": prompt})])
+        return ModelResponse(parts=[TextPart(f"Answer to {prompt}")])
+
+    async def stream_model(messages, info: AgentInfo):
+        runs.append(messages[-1].parts[-1].content)
+        yield "Streamed answer"
+
+    with agent.agent.override(model=FunctionModel(model, stream_function=stream_model)):
+        # The same user in a new session gets the cached reply
+        first = await agent.chat("What tools do you have?", ChatContext(user_id="a", session_id="s1"))
+        second = await agent.chat("what tools do you have", ChatContext(user_id="a", session_id="s2"))
+        assert first == second == "Answer to What tools do you have?"
+        assert runs == ["What tools do you have?"]
+
+        # Same question later in a conversation: different context, so the model runs
+        context = ChatContext(user_id="a", session_id="s1", message_history=[
+            {"role": "user", "content": "What tools do you have?"},
+            {"role": "assistant", "content": first}])
+        await agent.chat("What tools do you have?", context)
+        assert len(runs) == 2
+
+        # A turn with a side-effecting tool is never served from the cache
+        for _ in range(2):
+            assert await agent.chat("Save this note", ChatContext(user_id="a", session_id="s3")) == "Saved it."
+        assert runs.count("Save this note") == 2
+        assert len(agent.notes_storage) == 2
+
+        # Streaming turns share the cache; a hit is one chunk
+        chunks = [c async for c in agent.stream_chat("Tell me a joke", ChatContext(user_id="a", session_id="s4"))]
+        again = [c async for c in agent.stream_chat("Tell me a joke!", ChatContext(user_id="a", session_id="s5"))]
+        assert "".join(chunks) == "Streamed answer" and again == ["Streamed answer"]
+        assert runs.count("Tell me a joke") == 1
+
+    stats = agent.responses.stats()
+    assert stats["exact_hits"] == 2 and stats["bypassed"] == 2, stats
+    assert stats["saved_seconds"] > 0.005
+
+async def check_callers_isolated():
+    agent = make_agent()
+    runs = []
+
+    async def model(messages, info: AgentInfo):
+        runs.append(messages[-1].parts[-1].content)
+        return ModelResponse(parts=[TextPart(f"Reply {len(runs)}")])
+
+    with agent.agent.override(model=FunctionModel(model)):
+        # Two users sending the same first prompt each get their own reply
+        alice = await agent.chat("What is on my list?", ChatContext(user_id="alice", session_id="s1"))
+        bob = await agent.chat("What is on my list?", ChatContext(user_id="bob", session_id="s2"))
+        assert (alice, bob) == ("Reply 1", "Reply 2")
+        assert await agent.chat("What is on my list?", ChatContext(user_id="alice", session_id="s3")) == alice
+        assert await agent.chat("What is on my list?", ChatContext(user_id="bob", session_id="s4")) == bob
+
+        # Anonymous callers are scoped to their session
+        first = await agent.chat("What is on my list?", ChatContext(user_id="anonymous", session_id="anon1"))
+        assert await agent.chat("What is on my list?", ChatContext(user_id="anonymous", session_id="anon2")) != first
+        assert await agent.chat("What is on my list?", ChatContext(user_id="anonymous", session_id="anon1")) == first
+
+        # A different system prompt is a different context
+        agent.system_prompt = "You are a pirate."
+        assert await agent.chat("What is on my list?", ChatContext(user_id="alice", session_id="s5")) != alice
+    assert len(runs) == 5
+
+def test_exact_tier():
+    asyncio.run(check_exact_tier())
+
+def test_semantic_tier():
+    asyncio.run(check_semantic_tier())
+
+def test_tool_policy():
+    check_tool_policy()
+
+def test_agent_cache():
+    asyncio.run(check_agent_cache())
+
+def test_callers_isolated():
+    asyncio.run(check_callers_isolated())
+
+def test_disabled_by_default():
+    assert "RESPONSE_CACHE_ENABLED" in os.environ or not config.RESPONSE_CACHE_ENABLED
+
+if __name__ == "__main__":
+    test_exact_tier()
+    test_semantic_tier()
+    test_tool_policy()
+    test_agent_cache()
+    test_callers_isolated()
+    test_disabled_by_default()
+    print("✅ Response cache tests passed!")
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""Tests for the session-token cache and batched last_used_at writes"""
+import asyncio
+import os
+import tempfile
+
+from database import ChatDatabase
+
+async def check_session_cache(db_path: str):
+    db = ChatDatabase(db_path)
+    await db.open()
+    await db.init_db()
+
+    user_id = await db.create_user("cache@example.com", "password123", full_name="Cache User")
+    token = (await db.create_session_token(user_id))["session_token"]
+
+    user = await db.get_session_user(token)
+    assert user["id"] == user_id and user["full_name"] == "Cache User", user
+    assert await db.get_session_user("not-a-token") is None
+
+    # Served from cache: no last_used_at write until the batch is flushed
+    await db.get_session_user(token)
+    assert token in db._session_activity
+    await db.flush_session_activity()
+    assert not db._session_activity
+
+    # Profile and verification changes are visible immediately
+    await db.update_user_profile(user_id, full_name="Renamed")
+    assert (await db.get_session_user(token))["full_name"] == "Renamed"
+
+    # Logging out takes effect immediately despite the cache
+    await db.invalidate_session(token)
+    assert await db.get_session_user(token) is None
+
+    await db.close()
+
+def test_session_cache():
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(check_session_cache(os.path.join(tmp, "cache.db")))
+
+if __name__ == "__main__":
+    test_session_cache()
+    print("✅ Session cache tests passed!")
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Tests for resumable SSE chat streams"""
+import asyncio
+import json
+
+from sse_stream import ReplayExpired, StreamTurn, StreamTurns, parse_event_id, sse_events
+
+def producer(count, delay=0.002):
+    async def produce(publish):
+        for i in range(count):
+            await asyncio.sleep(delay)
+            await publish({"type": "stream", "content": f"c{i} "})
+        await publish({"type": "complete"})
+    return produce
+
+def parse(text):
+    """SSE text -> list of (id, event, data)"""
+    events = []
+    for block in text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n") if not line.startswith(":"))
+        if fields:
+            events.append((fields.get("id"), fields.get("event"), json.loads(fields["data"])))
+    return events
+
+async def collect(turn):
+    return [frame async for _, frame in turn.events()]
+
+async def check_live_and_resume():
+    turns = StreamTurns()
+    turn = turns.start(producer(20))
+
+    # Read part of the stream, then drop the connection
+    received = []
+    async for seq, frame in turn.events():
+        received.append((seq, frame))
+        if len(received) == 7:
+            break
+
+    # Reconnect with the last event id and read to the end
+    turn_id, after = parse_event_id(f"{turn.turn_id}:{received[-1][0]}")
+    assert turns.get(turn_id) is turn
+    async for seq, frame in turn.events(after):
+        received.append((seq, frame))
+
+    assert [seq for seq, _ in received] == list(range(1, 22))
+    assert "".join(f.get("content", "") for _, f in received) == "".join(f"c{i} " for i in range(20))
+    assert received[-1][1]["type"] == "complete" and turn.done
+
+    # A finished turn replays from any retained position
+    assert [seq async for seq, _ in turn.events(18)] == [19, 20, 21]
+
+async def check_bounded_replay():
+    turn = StreamTurn("t", replay_size=5)
+    for i in range(12):
+        await turn.publish({"type": "stream", "content": str(i)})
+    turn.finish()
+
+    assert turn.available(7) and not turn.available(6)
+    assert [seq async for seq, _ in turn.events(7)] == [8, 9, 10, 11, 12]
+    try:
+        async for _ in turn.events(3):
+            pass
+        assert False, "expired events were replayed"
+    except ReplayExpired:
+        pass
+
+async def check_sse_format_and_keepalive():
+    turns = StreamTurns()
+    turn = turns.start(producer(3, delay=0.03))
+    text = "".join([chunk async for chunk in sse_events(turn, keepalive=0.01)])
+
+    assert ": ping" in text
+    events = parse(text)
+    assert [e[0] for e in events] == [f"{turn.turn_id}:{i}" for i in range(1, 5)]
+    assert [e[1] for e in events] == ["stream", "stream", "stream", "complete"]
+
+async def check_failed_and_cancelled_turns():
+    turns = StreamTurns()
+    async def broken(publish):
+        await publish({"type": "typing", "content": ""})
+        raise RuntimeError("model unavailable")
+    turn = turns.start(broken)
+    frames = [frame async for _, frame in turn.events()]
+    assert frames[-1] == {"type": "error", "content": "model unavailable"}
+
+    turn = turns.start(producer(1000))
+    await asyncio.sleep(0.01)
+    await turns.aclose()
+    frames = [frame async for _, frame in turn.events()]
+    assert frames[-1]["type"] == "cancelled" and turn.done
+
+async def check_running_turns_not_evicted():
+    turns = StreamTurns(maxsize=2, ttl=0.05)
+    release = asyncio.Event()
+    async def held(publish):
+        await publish({"type": "typing", "content": ""})
+        await release.wait()
+        await publish({"type": "complete"})
+    running = [turns.start(held) for _ in range(4)]
+    await asyncio.sleep(0.1)
+    # More running turns than maxsize, all older than the TTL
+    assert all(turns.get(turn.turn_id) is turn for turn in running)
+
+    release.set()
+    await asyncio.gather(*(collect(turn) for turn in running))
+    await asyncio.sleep(0)
+    # Once finished they are bounded by maxsize, then expire
+    assert sum(turns.get(turn.turn_id) is not None for turn in running) == 2
+    await asyncio.sleep(0.1)
+    assert all(turns.get(turn.turn_id) is None for turn in running)
+
+def check_parse_event_id():
+    assert parse_event_id("abc:12") == ("abc", 12)
+    for bad in ("abc", ":3", "abc:x", "abc:-1"):
+        try:
+            parse_event_id(bad)
+            assert False, bad
+        except ValueError:
+            pass
+
+def test_live_and_resume():
+    asyncio.run(check_live_and_resume())
+
+def test_bounded_replay():
+    asyncio.run(check_bounded_replay())
+
+def test_sse_format_and_keepalive():
+    asyncio.run(check_sse_format_and_keepalive())
+
+def test_failed_and_cancelled_turns():
+    asyncio.run(check_failed_and_cancelled_turns())
+
+def test_running_turns_not_evicted():
+    asyncio.run(check_running_turns_not_evicted())
+
+def test_parse_event_id():
+    check_parse_event_id()
+
+if __name__ == "__main__":
+    test_live_and_resume()
+    test_bounded_replay()
+    test_sse_format_and_keepalive()
+    test_failed_and_cancelled_turns()
+    test_running_turns_not_evicted()
+    test_parse_event_id()
+    print("✅ SSE stream tests passed!")
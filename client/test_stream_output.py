@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Tests for the coalescing, back-pressured stream output stage"""
+import asyncio
+import json
+
+from stream_output import CoalescingStream
+
+DELTAS = [f"tok{i % 10} " for i in range(2000)]
+
+async def check_coalescing():
+    frames = []
+    async def send(frame):
+        frames.append(json.dumps(frame))
+
+    stream = CoalescingStream(send, flush_interval=0.02, max_chars=512)
+    for i, delta in enumerate(DELTAS):
+        await stream.write(delta)
+        if i % 20 == 0:
+            await asyncio.sleep(0.001)  # Tokens arrive in bursts
+    text = await stream.close()
+
+    assert text == "".join(DELTAS)
+    assert "".join(json.loads(frame)["content"] for frame in frames) == text
+    assert stream.stats() == {"characters": len(text), "deltas": len(DELTAS), "frames": len(frames)}
+    assert len(frames) < len(DELTAS) / 10, len(frames)
+
+    # Old protocol: one frame per delta plus the whole text again in "complete"
+    old_bytes = sum(len(json.dumps({"type": "stream", "content": d})) for d in DELTAS)
+    old_bytes += len(json.dumps({"type": "complete", "content": text}))
+    new_bytes = sum(map(len, frames)) + len(json.dumps({"type": "complete", **stream.stats()}))
+    assert new_bytes < old_bytes / 2, (new_bytes, old_bytes)
+
+async def check_first_delta_not_delayed():
+    sent = asyncio.Event()
+    async def send(frame):
+        sent.set()
+    stream = CoalescingStream(send, flush_interval=10)
+    await stream.write("Hello")
+    await asyncio.wait_for(sent.wait(), 0.5)
+    await stream.close()
+
+async def check_back_pressure():
+    frames, pending = [], []
+    async def slow_send(frame):
+        await asyncio.sleep(0.01)
+        frames.append(frame["content"])
+
+    stream = CoalescingStream(slow_send, flush_interval=0.001, max_chars=100, max_pending_chars=4000)
+    for i in range(200):
+        await stream.write("x" * 999 + str(i % 10))
+        pending.append(stream._pending_chars)
+    text = await stream.close()
+
+    # The writer never ran more than one delta past the pending limit
+    assert max(pending) <= 4000 + 1000, max(pending)
+    assert "".join(frames) == text and len(text) == 200 * 1000
+
+async def check_send_error():
+    async def broken_send(frame):
+        raise ConnectionError("client went away")
+    stream = CoalescingStream(broken_send, flush_interval=0.001, max_pending_chars=10)
+    try:
+        for _ in range(100):
+            await stream.write("0123456789abc")
+        await stream.close()
+        assert False, "send error was swallowed"
+    except ConnectionError:
+        pass
+    await stream.abort()
+
+def test_coalescing():
+    asyncio.run(check_coalescing())
+
+def test_first_delta_not_delayed():
+    asyncio.run(check_first_delta_not_delayed())
+
+def test_back_pressure():
+    asyncio.run(check_back_pressure())
+
+def test_send_error():
+    asyncio.run(check_send_error())
+
+if __name__ == "__main__":
+    test_coalescing()
+    test_first_delta_not_delayed()
+    test_back_pressure()
+    test_send_error()
+    print("✅ Stream output tests passed!")
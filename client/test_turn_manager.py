@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Tests for concurrent, cancellable WebSocket turns"""
+import asyncio
+
+from turn_manager import TurnManager, UserTurnSlots
+
+def recorder():
+    frames = []
+    async def send(frame):
+        frames.append(frame)
+    return frames, send
+
+def streaming_turn(name, deltas, delay=0.005):
+    async def run(send):
+        for i in range(deltas):
+            await asyncio.sleep(delay)
+            await send({"type": "stream", "content": f"{name}{i}"})
+        await send({"type": "complete"})
+    return run
+
+async def check_interleaved_turns():
+    frames, send = recorder()
+    turns = TurnManager(send, UserTurnSlots(limit=2))
+    await turns.start("alice", streaming_turn("a", 10), "r1")
+    await turns.start("alice", streaming_turn("b", 10), "r2")
+    await turns.join()
+
+    # Both turns streamed at the same time, and every frame says which it belongs to
+    ids = [frame["request_id"] for frame in frames]
+    assert ids.index("r2") < max(i for i, rid in enumerate(ids) if rid == "r1")
+    for rid, name in (("r1", "a"), ("r2", "b")):
+        content = [f["content"] for f in frames if f["request_id"] == rid and f["type"] == "stream"]
+        assert content == [f"{name}{i}" for i in range(10)]
+    assert len(turns) == 0
+
+async def check_cancel():
+    frames, send = recorder()
+    turns = TurnManager(send, UserTurnSlots(limit=2))
+    await turns.start("alice", streaming_turn("slow", 1000), "slow")
+    await turns.start("alice", streaming_turn("fast", 3), "fast")
+    await asyncio.sleep(0.03)
+    assert await turns.cancel("slow")
+    assert not await turns.cancel("slow")
+    await turns.join()
+
+    slow = [f["type"] for f in frames if f["request_id"] == "slow"]
+    assert slow[-1] == "cancelled" and "complete" not in slow
+    assert [f["type"] for f in frames if f["request_id"] == "fast"][-1] == "complete"
+
+async def check_user_limit():
+    running, peak = 0, 0
+    async def run(send):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        await send({"type": "complete"})
+    async def other_user(send):
+        await send({"type": "complete"})
+
+    slots = UserTurnSlots(limit=2)
+    frames, send = recorder()
+    connections = [TurnManager(send, slots) for _ in range(3)]
+    for turns in connections:
+        for _ in range(3):
+            await turns.start("alice", run)
+    await turns.start("bob", other_user)
+    await asyncio.gather(*(turns.join() for turns in connections))
+
+    # Nine turns over three connections, never more than two running at once
+    assert peak == 2
+    assert sum(f["type"] == "complete" for f in frames) == 10
+    assert any(f["type"] == "queued" for f in frames)
+    assert slots.stats() == {"limit": 2, "running": {}, "waiting": {}}
+
+async def check_refused_and_failed_turns():
+    frames, send = recorder()
+    turns = TurnManager(send, UserTurnSlots(), max_turns=1)
+    async def broken(send):
+        raise RuntimeError("model unavailable")
+
+    assert await turns.start("alice", streaming_turn("a", 5), "r1") == "r1"
+    assert await turns.start("alice", streaming_turn("a", 5), "r1") is None
+    assert await turns.start("alice", streaming_turn("a", 5), "r2") is None
+    await turns.join()
+    assert await turns.start("alice", broken, "r3") == "r3"
+    await turns.join()
+
+    errors = [f for f in frames if f["type"] == "error"]
+    assert [f["request_id"] for f in errors] == ["r1", "r2", "r3"]
+    assert errors[-1]["content"] == "model unavailable"
+
+async def check_cancel_all():
+    frames, send = recorder()
+    turns = TurnManager(send, UserTurnSlots(limit=1))
+    for _ in range(3):
+        await turns.start("alice", streaming_turn("x", 1000))
+    await asyncio.sleep(0.02)
+    await turns.cancel_all()
+    assert len(turns) == 0
+    assert sum(f["type"] == "cancelled" for f in frames) == 3
+
+def test_interleaved_turns():
+    asyncio.run(check_interleaved_turns())
+
+def test_cancel():
+    asyncio.run(check_cancel())
+
+def test_user_limit():
+    asyncio.run(check_user_limit())
+
+def test_refused_and_failed_turns():
+    asyncio.run(check_refused_and_failed_turns())
+
+def test_cancel_all():
+    asyncio.run(check_cancel_all())
+
+if __name__ == "__main__":
+    test_interleaved_turns()
+    test_cancel()
+    test_user_limit()
+    test_refused_and_failed_turns()
+    test_cancel_all()
+    print("✅ Turn manager tests passed!")
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Tests for batched chat message writes"""
+import asyncio
+import os
+import tempfile
+
+from database import ChatDatabase
+
+async def message_count(db: ChatDatabase, session_id: str) -> int:
+    async with db._reader() as conn:
+        cursor = await conn.execute(
+            "SELECT message_count FROM chat_sessions WHERE session_id = ?", (session_id,)
+        )
+        return (await cursor.fetchone())[0]
+
+async def check_write_queue(db_path: str):
+    db = ChatDatabase(db_path)
+    db._messages.flush_interval = 60  # Only explicit flushes in this test
+    await db.open()
+    await db.init_db()
+    await db.create_session("s1", "u1")
+    await db.create_session("s2", "u1")
+
+    for i in range(3):
+        await db.add_message("s1", "user", f"message {i}")
+    await db.add_message("s2", "user", "other session")
+    assert len(db._messages) == 4
+    assert await message_count(db, "s1") == 0
+
+    # Reading a session with queued messages commits them first
+    messages = await db.get_session_messages("s1")
+    assert [m["content"] for m in messages] == ["message 0", "message 1", "message 2"]
+    assert len(db._messages) == 0
+    assert await message_count(db, "s1") == 3
+    assert await message_count(db, "s2") == 1
+
+    # Shutdown flushes whatever is still queued
+    await db.add_message("s2", "assistant", "reply")
+    await db.close()
+
+    db = ChatDatabase(db_path)
+    assert [m["content"] for m in await db.get_session_messages("s2")] == ["other session", "reply"]
+    assert await message_count(db, "s2") == 2
+
+async def check_write_through(db_path: str):
+    # Without an opened pool each message is committed immediately
+    db = ChatDatabase(db_path)
+    await db.init_db()
+    await db.create_session("s1", "u1")
+    await db.add_message("s1", "user", "hello")
+    assert len(db._messages) == 0
+    assert await message_count(db, "s1") == 1
+
+def test_write_queue():
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(check_write_queue(os.path.join(tmp, "queue.db")))
+
+def test_write_through():
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(check_write_through(os.path.join(tmp, "through.db")))
+
+if __name__ == "__main__":
+    test_write_queue()
+    test_write_through()
+    print("✅ Write queue tests passed!")
@@ -0,0 +1,139 @@
+"""Concurrent, cancellable chat turns on one WebSocket connection"""
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from config import config
+
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+
+class UserTurnSlots:
+    """Limits how many turns each user runs at once, across all connections.
+
+    A turn over the limit waits for a slot instead of being rejected, so a
+    user who opens many turns (or many sockets) gets them served in order
+    without holding more than ``limit`` model streams at a time.
+    """
+
+    def __init__(self, limit: int = config.MAX_CONCURRENT_TURNS_PER_USER):
+        self.limit = limit
+        self._slots: Dict[str, asyncio.Semaphore] = {}
+        self._running: Dict[str, int] = {}
+        self._waiting: Dict[str, int] = {}
+
+    def full(self, user_id: str) -> bool:
+        return self._running.get(user_id, 0) >= self.limit
+
+    @asynccontextmanager
+    async def acquire(self, user_id: str):
+        semaphore = self._slots.get(user_id)
+        if semaphore is None:
+            semaphore = self._slots[user_id] = asyncio.Semaphore(self.limit)
+        self._waiting[user_id] = self._waiting.get(user_id, 0) + 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self._waiting[user_id] -= 1
+        self._running[user_id] = self._running.get(user_id, 0) + 1
+        try:
+            yield
+        finally:
+            self._running[user_id] -= 1
+            semaphore.release()
+            # Drop idle users so the tables stay as small as the active set
+            if not self._running[user_id] and not self._waiting[user_id]:
+                del self._slots[user_id], self._running[user_id], self._waiting[user_id]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "running": {user: count for user, count in self._running.items() if count},
+            "waiting": {user: count for user, count in self._waiting.items() if count},
+        }
+
+class TurnManager:
+    """Runs the chat turns of one connection as concurrent tasks.
+
+    Every turn has a request id (the client's, or a generated one) that is
+    added to each frame it sends, so frames of concurrent turns can be
+    interleaved on the one socket and still be told apart. Sends go through
+    a lock so frames are never written concurrently. A turn can be cancelled
+    by id, which cancels its ``stream_chat``; all turns are cancelled when the
+    connection closes. At most ``max_turns`` turns may be open per connection,
+    and ``slots`` limits how many of a user's turns actually run.
+    """
+
+    def __init__(self, send: Send, slots: UserTurnSlots,
+                 max_turns: int = config.MAX_TURNS_PER_CONNECTION):
+        self._send = send
+        self._send_lock = asyncio.Lock()
+        self.slots = slots
+        self.max_turns = max_turns
+        self._turns: Dict[str, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._turns)
+
+    def sender(self, request_id: str) -> Send:
+        """A send function that tags frames with ``request_id``"""
+        async def send(frame: Dict[str, Any]) -> None:
+            async with self._send_lock:
+                await self._send({**frame, "request_id": request_id})
+        return send
+
+    async def start(self, user_id: str, run: Callable[[Send], Awaitable[None]],
+                    request_id: Optional[str] = None) -> Optional[str]:
+        """Start ``run(send)`` as a new turn; returns its request id, or None if refused"""
+        request_id = str(request_id) if request_id else uuid.uuid4().hex
+        send = self.sender(request_id)
+        if request_id in self._turns:
+            await send({"type": "error", "content": "A turn with this request_id is already running"})
+            return None
+        if len(self._turns) >= self.max_turns:
+            await send({"type": "error", "content": f"Too many turns in progress (max {self.max_turns})"})
+            return None
+        self._turns[request_id] = asyncio.create_task(self._run(request_id, user_id, run, send))
+        return request_id
+
+    async def _run(self, request_id: str, user_id: str, run: Callable[[Send], Awaitable[None]],
+                   send: Send) -> None:
+        try:
+            if self.slots.full(user_id):
+                await send({"type": "queued", "content": ""})
+            async with self.slots.acquire(user_id):
+                await run(send)
+        except asyncio.CancelledError:
+            await self._notify(send, {"type": "cancelled", "content": ""})
+        except Exception as e:
+            await self._notify(send, {"type": "error", "content": str(e)})
+        finally:
+            self._turns.pop(request_id, None)
+
+    @staticmethod
+    async def _notify(send: Send, frame: Dict[str, Any]) -> None:
+        try:
+            await send(frame)
+        except Exception:
+            # The connection is already gone
+            pass
+
+    async def cancel(self, request_id: str) -> bool:
+        """Cancel a running or queued turn; False if there is no such turn"""
+        task = self._turns.get(request_id)
+        if task is None:
+            return False
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return True
+
+    async def cancel_all(self) -> None:
+        tasks = list(self._turns.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def join(self) -> None:
+        """Wait for every open turn to finish"""
+        while self._turns:
+            await asyncio.gather(*list(self._turns.values()), return_exceptions=True)
@@ -0,0 +1,113 @@
+"""Write-behind queue that batches chat message inserts"""
+import asyncio
+from collections import Counter
+from datetime import datetime
+from typing import Callable, List, Optional, Set, Tuple
+
+from config import config
+
+class MessageWriteQueue:
+    """Groups chat messages and their session updates into one transaction.
+
+    ``add`` only appends to an in-memory list. A background task commits the
+    list at most ``flush_interval`` seconds after the first message arrived,
+    so a busy server pays one commit per interval instead of one per message.
+    Once ``max_batch`` messages are waiting, ``add`` flushes inline, which
+    caps memory and applies back-pressure if the disk falls behind.
+    """
+
+    def __init__(self, writer: Callable, flush_interval: float = config.MESSAGE_FLUSH_INTERVAL,
+                 max_batch: int = config.MESSAGE_FLUSH_MAX_BATCH):
+        self._writer = writer
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        # (session_id, role, content, timestamp) in arrival order
+        self._pending: List[Tuple[str, str, str, str]] = []
+        self._inflight: Set[str] = set()
+        self._has_work = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._flusher: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._flusher is not None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    async def add(self, session_id: str, role: str, content: str) -> None:
+        # Stamp now so batching does not shift message times
+        timestamp = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        self._pending.append((session_id, role, content, timestamp))
+        self._has_work.set()
+        if not self.running or len(self._pending) >= self.max_batch:
+            await self.flush()
+
+    def has_pending(self, session_id: str) -> bool:
+        """True if messages for the session are queued or being committed"""
+        return session_id in self._inflight or any(item[0] == session_id for item in self._pending)
+
+    async def flush(self) -> None:
+        """Commit everything queued so far in one transaction"""
+        async with self._lock:
+            if not self._pending:
+                self._has_work.clear()
+                return
+            batch, self._pending = self._pending, []
+            self._has_work.clear()
+            self._inflight = {item[0] for item in batch}
+            try:
+                await self._write(batch)
+            except Exception:
+                # Keep the messages for the next attempt
+                self._pending = batch + self._pending
+                self._has_work.set()
+                raise
+            finally:
+                self._inflight = set()
+
+    async def _write(self, batch: List[Tuple[str, str, str, str]]) -> None:
+        counts = Counter(item[0] for item in batch)
+        last_at = {item[0]: item[3] for item in batch}
+        async with self._writer() as db:
+            await db.executemany(
+                "INSERT INTO chat_messages (session_id, role, content, timestamp) VALUES (?, ?, ?, ?)",
+                batch
+            )
+            await db.executemany(
+                """
+                UPDATE chat_sessions
+                SET updated_at = ?,
+                    last_message_at = ?,
+                    message_count = message_count + ?
+                WHERE session_id = ?
+                """,
+                [(last_at[session_id], last_at[session_id], count, session_id)
+                 for session_id, count in counts.items()]
+            )
+            await db.commit()
+
+    def start(self) -> None:
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        """Stop the background task and commit whatever is still queued"""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await self._has_work.wait()
+            # Let the batch fill for at most one interval
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Message flush failed: {e}")
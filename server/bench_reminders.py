@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Benchmark reminder polling: full scan vs the time-ordered scheduler"""
+import datetime
+import random
+import time
+
+from reminder_scheduler import ReminderScheduler, REMIND_AT_FORMAT
+
+REMINDERS = 1_000_000
+DUE_PER_POLL = 10
+
+def make_reminders(now: datetime.datetime):
+    reminders = {}
+    for i in range(REMINDERS):
+        # All but a handful are in the future
+        offset = -1 if i < DUE_PER_POLL else random.randint(60, 60 * 24 * 365)
+        remind_at = (now + datetime.timedelta(minutes=offset)).strftime(REMIND_AT_FORMAT)
+        reminders[f"r{i}"] = {"id": f"r{i}", "remind_at": remind_at, "status": "active"}
+    return reminders
+
+def full_scan_poll(reminders, now: datetime.datetime):
+    """The previous check_reminders loop"""
+    due = []
+    for reminder in reminders.values():
+        if reminder["status"] == "active":
+            remind_time = datetime.datetime.strptime(reminder["remind_at"], REMIND_AT_FORMAT)
+            if remind_time <= now:
+                due.append(reminder)
+    return due
+
+def main():
+    now = datetime.datetime.utcnow()
+    print(f"Generating {REMINDERS:,} reminders ({DUE_PER_POLL} due)...")
+    reminders = make_reminders(now)
+
+    start = time.perf_counter()
+    due = full_scan_poll(reminders, now)
+    scan = time.perf_counter() - start
+    print(f"full scan poll:      {scan * 1000:10.2f}ms  ({len(due)} due)")
+
+    scheduler = ReminderScheduler()
+    start = time.perf_counter()
+    for reminder_id, reminder in reminders.items():
+        scheduler.update(reminder_id, None, reminder)
+    build = time.perf_counter() - start
+    print(f"scheduler build:     {build * 1000:10.2f}ms  (one-time, at startup)")
+
+    start = time.perf_counter()
+    due = scheduler.pop_due(time.time())
+    poll = time.perf_counter() - start
+    print(f"scheduler poll:      {poll * 1000:10.4f}ms  ({len(due)} due)")
+
+    start = time.perf_counter()
+    empty = scheduler.pop_due(time.time())
+    idle = time.perf_counter() - start
+    print(f"scheduler idle poll: {idle * 1000:10.4f}ms  ({len(empty)} due)")
+
+    print(f"\nPoll speedup: {scan / poll:,.0f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Benchmark single-item storage operations: plain dict vs storage backends"""
+import asyncio
+import os
+import tempfile
+import time
+import uuid
+
+from storage import MemoryStorage, SQLiteStorage
+
+OPERATIONS = 100_000
+
+def make_records():
+    return [
+        (str(uuid.uuid4()), {"title": f"Task {i}", "priority": "medium", "status": "todo"})
+        for i in range(OPERATIONS)
+    ]
+
+def bench_dict(records):
+    data = {}
+    start = time.perf_counter()
+    for key, record in records:
+        data[key] = record
+    put = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for key, _ in records:
+        data.get(key)
+    get = time.perf_counter() - start
+    return put, get
+
+async def bench_backend(backend, records):
+    start = time.perf_counter()
+    for key, record in records:
+        await backend.put("tasks", key, record)
+    put = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for key, _ in records:
+        await backend.get("tasks", key)
+    get = time.perf_counter() - start
+    return put, get
+
+def report(label, put, get):
+    print(f"{label:<28} put={put / OPERATIONS * 1e9:7.0f}ns/op  get={get / OPERATIONS * 1e9:7.0f}ns/op")
+
+async def main():
+    records = make_records()
+    print(f"{OPERATIONS} single-item operations\n")
+
+    report("dict", *bench_dict(records))
+    report("MemoryStorage", *await bench_backend(MemoryStorage(), records))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        backend = SQLiteStorage(path)
+        await backend.open()
+        report("SQLiteStorage (write-behind)", *await bench_backend(backend, records))
+
+        start = time.perf_counter()
+        await backend.close()
+        print(f"\nFinal flush to disk: {(time.perf_counter() - start) * 1000:.1f}ms")
+
+        start = time.perf_counter()
+        reopened = SQLiteStorage(path)
+        await reopened.open()
+        count = await reopened.count("tasks")
+        print(f"Reload {count} records on startup: {(time.perf_counter() - start) * 1000:.1f}ms")
+        await reopened.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Benchmark text_analyzer: the old multi-pass version vs the streaming analyzer"""
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from text_analysis import analyze_file, analyze_text
+
+SIZE_MB = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+WORDS = ["the", "analysis", "streaming", "server", "quickly", "tokens", "memory", "(chunked)",
+         "document", "reader", "large", "upload", "\"quoted\"", "words", "throughput", "and"]
+
+def make_text(size: int) -> str:
+    random.seed(0)
+    parts, length = [], 0
+    while length < size:
+        sentence = " ".join(random.choices(WORDS, k=random.randint(5, 20)))
+        sentence = sentence.capitalize() + random.choice([". ", "! ", "? ", ".\n\n"])
+        parts.append(sentence)
+        length += len(sentence)
+    return "".join(parts)
+
+def multi_pass(text: str):
+    """text_analyzer as it was: several passes over one in-memory string"""
+    char_count_no_spaces = len(text.replace(" ", ""))
+    word_count = len(text.split())
+    sentence_count = len([s for s in re.split(r'[.!?]+', text) if s.strip()])
+    paragraph_count = len([p for p in text.split('\n\n') if p.strip()])
+    words = text.split()
+    avg_word_length = round(sum(len(word) for word in words) / len(words), 1) if words else 0
+    long_words = [word.lower().strip('.,!?";()') for word in words if len(word) > 3]
+    word_freq = {}
+    for word in long_words:
+        word_freq[word] = word_freq.get(word, 0) + 1
+    return sorted(word_freq.items(), key=lambda x: x[1], reverse=True)[:5]
+
+def timed(label: str, func, size_mb: float):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} {size_mb / elapsed:8.1f} MB/s  ({elapsed:.2f}s)")
+
+def peak_memory(func) -> float:
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1e6
+
+def main():
+    text = make_text(SIZE_MB * 1_000_000)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "upload.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        size_mb = os.path.getsize(path) / 1e6
+        print(f"{size_mb:.0f} MB of text\n")
+
+        timed("multi-pass (old, in memory)", lambda: multi_pass(text), size_mb)
+        timed("streaming, in-memory string", lambda: analyze_text(text), size_mb)
+        timed("streaming, memory-mapped file", lambda: analyze_file(path), size_mb)
+
+        # Peak memory on top of the input, measured on a smaller slice
+        sample = text[:10_000_000]
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(sample)
+        print(f"\nPeak extra memory for 10 MB: multi-pass {peak_memory(lambda: multi_pass(sample)):.0f} MB, "
+              f"memory-mapped file {peak_memory(lambda: analyze_file(path)):.0f} MB")
+
+if __name__ == "__main__":
+    main()
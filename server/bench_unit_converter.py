@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Benchmark converting a column of values: one unit_converter call per value vs unit_converter_batch"""
+import asyncio
+import os
+import random
+import time
+
+os.environ.setdefault("MCP_STORAGE_BACKEND", "memory")
+
+import httpx
+
+import mcp_server
+import units
+from units import Conversion
+
+VALUES = 1000
+HEADERS = {"Accept": "application/json, text/event-stream"}
+
+def bench_python(values):
+    conversion = Conversion("mi", "km")
+    start = time.perf_counter()
+    for value in values:
+        Conversion("mi", "km").convert(value)
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    conversion.convert_many(values)
+    batch = time.perf_counter() - start
+    backend = "numpy" if units.np is not None and len(values) >= units.NUMPY_MIN_BATCH else "python"
+    print(f"in process: per value {len(values) / single:10.0f}/s, "
+          f"convert_many ({backend}) {len(values) / batch:10.0f}/s")
+
+async def call(client, request_id, name, arguments):
+    response = await client.post("/mcp/", headers=HEADERS, json={
+        "jsonrpc": "2.0", "id": request_id, "method": "tools/call",
+        "params": {"name": name, "arguments": arguments}
+    })
+    response.raise_for_status()
+
+async def bench_round_trips(values):
+    app = mcp_server.app
+    async with mcp_server.lifespan(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://mcp") as client:
+            mcp_server.tool_cache.clear()
+            start = time.perf_counter()
+            for i, value in enumerate(values):
+                await call(client, i, "unit_converter", {"value": value, "from_unit": "mi", "to_unit": "km"})
+            single = time.perf_counter() - start
+
+            start = time.perf_counter()
+            await call(client, 0, "unit_converter_batch", {"values": values, "from_unit": "mi", "to_unit": "km"})
+            batch = time.perf_counter() - start
+    print(f"over MCP:   {len(values)} unit_converter calls {single * 1000:8.1f}ms, "
+          f"one unit_converter_batch call {batch * 1000:8.1f}ms ({single / batch:.0f}x)")
+
+if __name__ == "__main__":
+    values = [round(random.uniform(0, 500), 2) for _ in range(VALUES)]
+    bench_python(values * 100)
+    asyncio.run(bench_round_trips(values))
@@ -1,20 +1,104 @@
 """MCP Server with basic tools for the chatbot"""
+import asyncio
 import os
 import datetime
 import json
 import uuid
 import hashlib
 import random
-import re
-from typing import Any, Dict, List
-from fastapi import FastAPI
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, RedirectResponse, StreamingResponse
 from fastmcp import FastMCP
 import httpx
-import math
+
+from storage import create_storage
+from task_index import TaskIndex
+from reminder_scheduler import ReminderScheduler, parse_remind_at
+from url_index import ClickCounter, UrlIndex
+from tool_cache import ToolResultCache
+from expression_engine import calculate
+from text_analysis import analyze_chunks, analyze_file, analyze_text
+from units import Conversion
+
+# Persistent storage for tool data (see storage.py for backends)
+storage = create_storage()
+
+# Storage collections
+NOTES = "notes"
+TASKS = "tasks"
+REMINDERS = "reminders"
+URLS = "urls"
+
+# In-process indexes, kept current by storage listeners
+task_index = TaskIndex()
+storage.add_listener(TASKS, task_index.update)
+reminder_scheduler = ReminderScheduler()
+storage.add_listener(REMINDERS, reminder_scheduler.update)
+
+url_index = UrlIndex()
+storage.add_listener(URLS, url_index.update)
+click_counter = ClickCounter(storage, URLS)
+
+# Results of pure tools, keyed on their arguments (see tool_cache.py)
+tool_cache = ToolResultCache(maxsize=int(os.getenv("MCP_TOOL_CACHE_SIZE", 1024)))
+PURE_TOOL_TTL = float(os.getenv("MCP_TOOL_CACHE_TTL", 3600))
+# The weather is mock data today, but a real provider's answer goes stale
+WEATHER_CACHE_TTL = float(os.getenv("MCP_WEATHER_CACHE_TTL", 600))
+
+# Directory that analyze_text_file may read from; unset disables the tool
+TEXT_FILES_DIR = os.getenv("MCP_TEXT_FILES_DIR")
+
+# Push due reminders to /reminders/stream subscribers instead of waiting for polls
+REMINDER_DISPATCHER = os.getenv("MCP_REMINDER_DISPATCHER", "false").lower() in ("1", "true", "yes")
+
+async def trigger_reminders(reminder_ids: List[str]) -> List[Dict[str, Any]]:
+    """Mark due reminders as triggered and return them.
+
+    The status change is conditional on the stored reminder still being
+    active, so when several workers pop the same reminder only one returns
+    it. Reminders that fail to update go back on the scheduler to retry.
+    """
+    triggered, failed = [], []
+    for reminder_id in reminder_ids:
+        try:
+            reminder = await storage.update_if(
+                REMINDERS, reminder_id,
+                lambda r: r.get("status") == "active",
+                lambda r: {**r, "status": "triggered"}
+            )
+        except Exception as e:
+            print(f"Triggering reminder {reminder_id} failed: {e}")
+            failed.append(reminder_id)
+            continue
+        if reminder is not None:
+            triggered.append(reminder)
+    reminder_scheduler.retry(failed)
+    return triggered
+
+# Lifespan context manager for startup/shutdown
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup
+    await storage.open()
+    if REMINDER_DISPATCHER:
+        reminder_scheduler.start(trigger_reminders)
+    click_counter.start()
+    try:
+        # The streamable HTTP transport needs its own lifespan to run
+        async with mcp_http_app.lifespan(app):
+            yield
+    finally:
+        # Shutdown: persist any pending writes
+        await reminder_scheduler.stop()
+        await click_counter.stop()
+        await storage.close()
 
 # Initialize FastAPI app
-app = FastAPI(title="Chatbot MCP Server")
+app = FastAPI(title="Chatbot MCP Server", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -30,6 +114,7 @@ mcp = FastMCP(name="chatbot-tools", version="1.0.0")
 
 # Tool 1: Calculator
 @mcp.tool()
+@tool_cache.pure(ttl=PURE_TOOL_TTL)
 async def calculator(expression: str) -> Dict[str, Any]:
     """
     Evaluate mathematical expressions safely.
@@ -40,29 +125,7 @@ async def calculator(expression: str) -> Dict[str, Any]:
     Returns:
         Result of the calculation
     """
-    try:
-        # Define safe functions
-        safe_dict = {
-            'abs': abs, 'round': round, 'min': min, 'max': max,
-            'sum': sum, 'pow': pow, 'sqrt': math.sqrt,
-            'sin': math.sin, 'cos': math.cos, 'tan': math.tan,
-            'pi': math.pi, 'e': math.e
-        }
-        
-        # Evaluate expression safely
-        result = eval(expression, {"__builtins__": {}}, safe_dict)
-        
-        return {
-            "success": True,
-            "expression": expression,
-            "result": result
-        }
-    except Exception as e:
-        return {
-            "success": False,
-            "expression": expression,
-            "error": str(e)
-        }
+    return calculate(expression)
 
 # Tool 2: Current datetime
 @mcp.tool()
@@ -88,6 +151,7 @@ async def get_current_time(timezone: str = "UTC") -> Dict[str, str]:
 
 # Tool 3: Weather (mock implementation)
 @mcp.tool()
+@tool_cache.pure(ttl=WEATHER_CACHE_TTL)
 async def get_weather(location: str) -> Dict[str, Any]:
     """
     Get weather information for a location (mock data for demo).
@@ -160,15 +224,6 @@ async def web_search(query: str, max_results: int = 3) -> Dict[str, Any]:
         }
 
 # Tool 5: Note taking
-notes_storage = {}
-
-# Storage for new project management tools
-tasks_storage = {}
-projects_storage = {}
-reminders_storage = {}
-templates_storage = {}
-url_storage = {}
-password_storage = {}
 
 @mcp.tool()
 async def save_note(title: str, content: str) -> Dict[str, Any]:
@@ -182,13 +237,14 @@ async def save_note(title: str, content: str) -> Dict[str, Any]:
     Returns:
         Confirmation of saved note
     """
-    note_id = f"note_{len(notes_storage) + 1}"
-    notes_storage[note_id] = {
+    # A count-based id would repeat when two workers save at once
+    note_id = f"note_{uuid.uuid4().hex}"
+    await storage.put(NOTES, note_id, {
         "id": note_id,
         "title": title,
         "content": content,
         "created_at": datetime.datetime.utcnow().isoformat()
-    }
+    })
     
     return {
         "success": True,
@@ -204,10 +260,11 @@ async def get_notes() -> Dict[str, Any]:
     Returns:
         List of all notes
     """
+    notes = await storage.values(NOTES)
     return {
         "success": True,
-        "notes": list(notes_storage.values()),
-        "count": len(notes_storage)
+        "notes": notes,
+        "count": len(notes)
     }
 
 # ==== NEW PROJECT MANAGEMENT TOOLS ====
@@ -239,7 +296,7 @@ async def create_task(title: str, description: str = "", priority: str = "medium
             "updated_at": datetime.datetime.utcnow().isoformat()
         }
         
-        tasks_storage[task_id] = task
+        await storage.put(TASKS, task_id, task)
         
         return {
             "success": True,
@@ -265,7 +322,8 @@ async def update_task_status(task_id: str, status: str) -> Dict[str, Any]:
         Updated task information
     """
     try:
-        if task_id not in tasks_storage:
+        task = await storage.get(TASKS, task_id)
+        if task is None:
             return {
                 "success": False,
                 "error": "Task not found"
@@ -278,12 +336,16 @@ async def update_task_status(task_id: str, status: str) -> Dict[str, Any]:
                 "error": f"Invalid status. Must be one of: {', '.join(valid_statuses)}"
             }
         
-        tasks_storage[task_id]["status"] = status.lower()
-        tasks_storage[task_id]["updated_at"] = datetime.datetime.utcnow().isoformat()
+        task = {
+            **task,
+            "status": status.lower(),
+            "updated_at": datetime.datetime.utcnow().isoformat()
+        }
+        await storage.put(TASKS, task_id, task)
         
         return {
             "success": True,
-            "task": tasks_storage[task_id],
+            "task": task,
             "message": f"Task status updated to '{status}'"
         }
     except Exception as e:
@@ -293,33 +355,40 @@ async def update_task_status(task_id: str, status: str) -> Dict[str, Any]:
         }
 
 @mcp.tool()
-async def list_tasks(status: str = None, priority: str = None) -> Dict[str, Any]:
+async def list_tasks(status: str = None, priority: str = None, limit: int = 50, cursor: str = None) -> Dict[str, Any]:
     """
-    List tasks with optional filtering by status or priority.
+    List tasks with optional filtering by status or priority, newest first.
     
     Args:
         status: Filter by status (optional)
         priority: Filter by priority (optional)
+        limit: Maximum number of tasks to return (1-500, default 50)
+        cursor: next_cursor from a previous call, to fetch the following page (optional)
     
     Returns:
-        List of tasks matching filters
+        One page of tasks matching filters
     """
     try:
-        tasks = list(tasks_storage.values())
-        
-        if status:
-            tasks = [t for t in tasks if t["status"] == status.lower()]
-        
-        if priority:
-            tasks = [t for t in tasks if t["priority"] == priority.lower()]
+        if limit < 1 or limit > 500:
+            return {
+                "success": False,
+                "error": "Limit must be between 1 and 500"
+            }
         
-        # Sort by created_at (newest first)
-        tasks.sort(key=lambda x: x["created_at"], reverse=True)
+        task_ids, next_cursor, total = task_index.page(
+            status=status.lower() if status else None,
+            priority=priority.lower() if priority else None,
+            limit=limit,
+            cursor=cursor
+        )
+        tasks = [await storage.get(TASKS, task_id) for task_id in task_ids]
         
         return {
             "success": True,
             "tasks": tasks,
             "count": len(tasks),
+            "total": total,
+            "next_cursor": next_cursor,
             "filters": {"status": status, "priority": priority}
         }
     except Exception as e:
@@ -420,7 +489,7 @@ async def create_reminder(title: str, message: str, remind_at: str) -> Dict[str,
     try:
         # Validate date format
         try:
-            remind_datetime = datetime.datetime.strptime(remind_at, "%Y-%m-%d %H:%M")
+            parse_remind_at(remind_at)
         except ValueError:
             return {
                 "success": False,
@@ -437,7 +506,7 @@ async def create_reminder(title: str, message: str, remind_at: str) -> Dict[str,
             "status": "active"
         }
         
-        reminders_storage[reminder_id] = reminder
+        await storage.put(REMINDERS, reminder_id, reminder)
         
         return {
             "success": True,
@@ -459,16 +528,7 @@ async def check_reminders() -> Dict[str, Any]:
         List of due reminders
     """
     try:
-        now = datetime.datetime.utcnow()
-        due_reminders = []
-        
-        for reminder_id, reminder in reminders_storage.items():
-            if reminder["status"] == "active":
-                remind_time = datetime.datetime.strptime(reminder["remind_at"], "%Y-%m-%d %H:%M")
-                if remind_time <= now:
-                    due_reminders.append(reminder)
-                    # Mark as triggered
-                    reminder["status"] = "triggered"
+        due_reminders = await trigger_reminders(reminder_scheduler.pop_due())
         
         return {
             "success": True,
@@ -503,15 +563,31 @@ async def url_shortener(long_url: str, custom_alias: str = None) -> Dict[str, An
         
         if custom_alias:
             # Check if alias already exists
-            if any(data["alias"] == custom_alias for data in url_storage.values()):
+            if custom_alias in url_index.by_alias:
                 return {
                     "success": False,
                     "error": "Custom alias already exists"
                 }
             alias = custom_alias
         else:
-            # Generate random alias
-            alias = hashlib.md5(long_url.encode()).hexdigest()[:8]
+            # Reuse the existing short URL for a URL that was already shortened
+            existing_alias = url_index.by_long_url.get(long_url)
+            if existing_alias is not None:
+                url_data = await storage.get(URLS, url_index.by_alias[existing_alias])
+                return {
+                    "success": True,
+                    "url_data": url_data,
+                    "message": "URL was already shortened"
+                }
+            
+            # Derive the alias from the URL hash, lengthening it on collision
+            digest = hashlib.md5(long_url.encode()).hexdigest()
+            alias = next(
+                (digest[:length] for length in range(8, len(digest) + 1) if digest[:length] not in url_index.by_alias),
+                None
+            )
+            if alias is None:
+                alias = uuid.uuid4().hex
         
         url_id = str(uuid.uuid4())
         url_data = {
@@ -523,7 +599,7 @@ async def url_shortener(long_url: str, custom_alias: str = None) -> Dict[str, An
             "clicks": 0
         }
         
-        url_storage[url_id] = url_data
+        await storage.put(URLS, url_id, url_data)
         
         return {
             "success": True,
@@ -536,52 +612,66 @@ async def url_shortener(long_url: str, custom_alias: str = None) -> Dict[str, An
             "error": str(e)
         }
 
+async def resolve_alias(alias: str, count_click: bool = True) -> Optional[Dict[str, Any]]:
+    """Look up a short URL by alias, optionally counting a click"""
+    url_id = url_index.by_alias.get(alias)
+    if url_id is None:
+        return None
+    
+    url_data = await storage.get(URLS, url_id)
+    if count_click:
+        click_counter.record(url_id)
+    return {**url_data, "clicks": url_data["clicks"] + click_counter.pending(url_id)}
+
+@mcp.tool()
+async def resolve_short_url(alias: str, count_click: bool = True) -> Dict[str, Any]:
+    """
+    Resolve a short URL alias back to its original URL.
+    
+    Args:
+        alias: The short URL alias (the part after short.ly/)
+        count_click: Whether to count this lookup as a click (default True)
+    
+    Returns:
+        The original URL and click statistics
+    """
+    try:
+        url_data = await resolve_alias(alias, count_click)
+        if url_data is None:
+            return {
+                "success": False,
+                "error": f"Unknown alias '{alias}'"
+            }
+        
+        return {
+            "success": True,
+            "url_data": url_data
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
 @mcp.tool()
-async def text_analyzer(text: str) -> Dict[str, Any]:
+@tool_cache.pure(ttl=PURE_TOOL_TTL)
+async def text_analyzer(text: str = "", chunks: Optional[List[str]] = None, top_k: int = 5) -> Dict[str, Any]:
     """
     Analyze text for various metrics like word count, reading time, etc.
     
     Args:
         text: Text to analyze
+        chunks: Consecutive pieces of a long text, analyzed as if joined (instead of text)
+        top_k: Number of most common words to return
     
     Returns:
         Text analysis results
     """
     try:
-        # Basic metrics
-        char_count = len(text)
-        char_count_no_spaces = len(text.replace(" ", ""))
-        word_count = len(text.split())
-        sentence_count = len([s for s in re.split(r'[.!?]+', text) if s.strip()])
-        paragraph_count = len([p for p in text.split('\n\n') if p.strip()])
-        
-        # Reading time (average 200 words per minute)
-        reading_time_minutes = round(word_count / 200, 1)
-        
-        # Average word length
-        words = text.split()
-        avg_word_length = round(sum(len(word) for word in words) / len(words), 1) if words else 0
-        
-        # Most common words (excluding very short words)
-        long_words = [word.lower().strip('.,!?";()') for word in words if len(word) > 3]
-        word_freq = {}
-        for word in long_words:
-            word_freq[word] = word_freq.get(word, 0) + 1
-        
-        most_common = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)[:5]
-        
+        analysis = analyze_chunks(chunks, top_k) if chunks else analyze_text(text, top_k)
         return {
             "success": True,
-            "analysis": {
-                "character_count": char_count,
-                "character_count_no_spaces": char_count_no_spaces,
-                "word_count": word_count,
-                "sentence_count": sentence_count,
-                "paragraph_count": paragraph_count,
-                "reading_time_minutes": reading_time_minutes,
-                "average_word_length": avg_word_length,
-                "most_common_words": most_common
-            }
+            "analysis": analysis
         }
     except Exception as e:
         return {
@@ -590,110 +680,100 @@ async def text_analyzer(text: str) -> Dict[str, Any]:
         }
 
 @mcp.tool()
+async def analyze_text_file(file_path: str, top_k: int = 5) -> Dict[str, Any]:
+    """
+    Analyze an uploaded text file (UTF-8) without loading it into memory.
+    
+    Args:
+        file_path: Path of the file, relative to the server's text files directory
+        top_k: Number of most common words to return
+    
+    Returns:
+        Text analysis results and throughput
+    """
+    if not TEXT_FILES_DIR:
+        return {"success": False, "error": "File analysis is disabled (MCP_TEXT_FILES_DIR is not set)"}
+    root = os.path.realpath(TEXT_FILES_DIR)
+    path = os.path.realpath(os.path.join(root, file_path))
+    if os.path.commonpath([root, path]) != root or not os.path.isfile(path):
+        return {"success": False, "error": f"File not found: {file_path}"}
+    try:
+        # Reading a large file blocks, so keep it off the event loop
+        start = time.perf_counter()
+        analysis = await asyncio.to_thread(analyze_file, path, top_k)
+        elapsed = time.perf_counter() - start
+        size_mb = os.path.getsize(path) / 1e6
+        return {
+            "success": True,
+            "file_path": file_path,
+            "size_mb": round(size_mb, 2),
+            "mb_per_second": round(size_mb / elapsed, 1) if elapsed else None,
+            "analysis": analysis
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
+@mcp.tool()
+@tool_cache.pure(ttl=PURE_TOOL_TTL)
 async def unit_converter(value: float, from_unit: str, to_unit: str) -> Dict[str, Any]:
     """
-    Convert between different units (length, weight, temperature).
+    Convert between units of length, weight, temperature, volume, time, data size or speed.
     
     Args:
         value: Value to convert
-        from_unit: Source unit
-        to_unit: Target unit
+        from_unit: Source unit (e.g. "km", "lb", "f", "gal", "h", "GiB", "mph"); data sizes are case-sensitive
+        to_unit: Target unit of the same kind
     
     Returns:
         Conversion result
     """
     try:
-        # Length conversions (to meters)
-        length_units = {
-            "mm": 0.001, "cm": 0.01, "m": 1, "km": 1000,
-            "in": 0.0254, "ft": 0.3048, "yd": 0.9144, "mi": 1609.34
+        conversion = Conversion(from_unit, to_unit)
+        return {
+            "success": True,
+            "conversion": {
+                "original_value": value,
+                "original_unit": conversion.from_unit,
+                "converted_value": conversion.convert(value),
+                "converted_unit": conversion.to_unit,
+                "type": conversion.family
+            }
         }
-        
-        # Weight conversions (to grams)
-        weight_units = {
-            "mg": 0.001, "g": 1, "kg": 1000, "t": 1000000,
-            "oz": 28.3495, "lb": 453.592
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e)
         }
-        
-        # Temperature conversion
-        def convert_temperature(temp, from_t, to_t):
-            # Convert to Celsius first
-            if from_t == "f":
-                celsius = (temp - 32) * 5/9
-            elif from_t == "k":
-                celsius = temp - 273.15
-            else:  # celsius
-                celsius = temp
-            
-            # Convert from Celsius to target
-            if to_t == "f":
-                return celsius * 9/5 + 32
-            elif to_t == "k":
-                return celsius + 273.15
-            else:  # celsius
-                return celsius
-        
-        from_unit = from_unit.lower()
-        to_unit = to_unit.lower()
-        
-        # Check if it's temperature conversion
-        temp_units = ["c", "f", "k", "celsius", "fahrenheit", "kelvin"]
-        if from_unit in temp_units and to_unit in temp_units:
-            # Normalize temperature unit names
-            from_t = from_unit[0] if len(from_unit) == 1 else from_unit[0]
-            to_t = to_unit[0] if len(to_unit) == 1 else to_unit[0]
-            
-            result = convert_temperature(value, from_t, to_t)
-            
-            return {
-                "success": True,
-                "conversion": {
-                    "original_value": value,
-                    "original_unit": from_unit,
-                    "converted_value": round(result, 4),
-                    "converted_unit": to_unit,
-                    "type": "temperature"
-                }
-            }
-        
-        # Check if it's length conversion
-        elif from_unit in length_units and to_unit in length_units:
-            meters = value * length_units[from_unit]
-            result = meters / length_units[to_unit]
-            
-            return {
-                "success": True,
-                "conversion": {
-                    "original_value": value,
-                    "original_unit": from_unit,
-                    "converted_value": round(result, 6),
-                    "converted_unit": to_unit,
-                    "type": "length"
-                }
-            }
-        
-        # Check if it's weight conversion
-        elif from_unit in weight_units and to_unit in weight_units:
-            grams = value * weight_units[from_unit]
-            result = grams / weight_units[to_unit]
-            
-            return {
-                "success": True,
-                "conversion": {
-                    "original_value": value,
-                    "original_unit": from_unit,
-                    "converted_value": round(result, 6),
-                    "converted_unit": to_unit,
-                    "type": "weight"
-                }
-            }
-        
-        else:
-            return {
-                "success": False,
-                "error": f"Unsupported unit conversion from '{from_unit}' to '{to_unit}'"
-            }
+
+@mcp.tool()
+@tool_cache.pure(ttl=PURE_TOOL_TTL)
+async def unit_converter_batch(values: List[float], from_unit: str, to_unit: str) -> Dict[str, Any]:
+    """
+    Convert a list of values (e.g. a table column) between units in one call.
     
+    Args:
+        values: Values to convert
+        from_unit: Source unit, as for unit_converter
+        to_unit: Target unit of the same kind
+    
+    Returns:
+        Converted values in the same order
+    """
+    try:
+        conversion = Conversion(from_unit, to_unit)
+        return {
+            "success": True,
+            "conversion": {
+                "original_unit": conversion.from_unit,
+                "converted_unit": conversion.to_unit,
+                "type": conversion.family,
+                "count": len(values),
+                "converted_values": conversion.convert_many(values)
+            }
+        }
     except Exception as e:
         return {
             "success": False,
@@ -701,6 +781,7 @@ async def unit_converter(value: float, from_unit: str, to_unit: str) -> Dict[str
         }
 
 @mcp.tool()
+@tool_cache.pure(ttl=PURE_TOOL_TTL)
 async def base64_encode_decode(text: str, operation: str = "encode") -> Dict[str, Any]:
     """
     Encode or decode base64 text.
@@ -745,15 +826,78 @@ async def base64_encode_decode(text: str, operation: str = "encode") -> Dict[str
 # ==== END NEW TOOLS ====
 
 # Mount MCP endpoints to FastAPI
-# Use SSE for Pydantic AI compatibility
-app.mount("/sse", mcp.sse_app())
-app.mount("/mcp", mcp.http_app())
+# Use SSE for Pydantic AI compatibility and long-lived client sessions;
+# /mcp/ is stateless so one-shot JSON-RPC POSTs need no session handshake
+mcp_http_app = mcp.http_app(path="/", stateless_http=True, json_response=True)
+app.mount("/sse", mcp.sse_app(path="/", message_path="/messages/"))
+app.mount("/mcp", mcp_http_app)
 
 # Health check endpoint
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "service": "mcp-server"}
 
+# Tool catalog, built once: tools are registered at import time
+_tool_catalog: Optional[Dict[str, Any]] = None
+
+async def get_tool_catalog() -> Dict[str, Any]:
+    """Tool names, descriptions and input schemas plus a version hash"""
+    global _tool_catalog
+    if _tool_catalog is None:
+        tools = await mcp.get_tools()
+        catalog = [
+            {"name": tool.name, "description": tool.description or "", "inputSchema": tool.parameters}
+            for tool in sorted(tools.values(), key=lambda tool: tool.name)
+        ]
+        version = hashlib.sha256(json.dumps(catalog, sort_keys=True).encode()).hexdigest()[:16]
+        _tool_catalog = {"version": version, "tools": catalog}
+    return _tool_catalog
+
+@app.get("/tools")
+async def tool_catalog(request: Request):
+    """Tool catalog for client-side caching; revalidate with If-None-Match"""
+    catalog = await get_tool_catalog()
+    etag = f'"{catalog["version"]}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(catalog, headers=headers)
+
+@app.get("/tools/cache")
+async def tool_cache_stats():
+    """Hit/miss counters of the pure-tool result cache"""
+    return tool_cache.stats()
+
+@app.get("/s/{alias}")
+async def redirect_short_url(alias: str):
+    """Redirect a short URL alias to its original URL, counting the click"""
+    url_data = await resolve_alias(alias)
+    if url_data is None:
+        raise HTTPException(status_code=404, detail="Short URL not found")
+    return RedirectResponse(url_data["long_url"], status_code=307)
+
+@app.get("/reminders/stream")
+async def reminder_stream(request: Request):
+    """Server-Sent Events stream of reminders as the dispatcher triggers them"""
+    if not REMINDER_DISPATCHER:
+        raise HTTPException(status_code=404, detail="Reminder dispatcher is disabled")
+    
+    queue = reminder_scheduler.subscribe()
+    
+    async def events():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    reminder = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: reminder\ndata: {json.dumps(reminder)}\n\n"
+        finally:
+            reminder_scheduler.unsubscribe(queue)
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
 if __name__ == "__main__":
     import uvicorn
     
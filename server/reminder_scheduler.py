@@ -0,0 +1,156 @@
+"""Time-ordered due queue for reminders"""
+import asyncio
+import datetime
+import heapq
+import re
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from storage import Record
+
+REMIND_AT_FORMAT = "%Y-%m-%d %H:%M"
+
+# Seconds before a reminder whose trigger failed is tried again
+RETRY_DELAY = 5.0
+
+_REMIND_AT_PATTERN = re.compile(r"(\d{4})-(\d{2})-(\d{2}) (\d{2}):(\d{2})")
+
+def parse_remind_at(remind_at: str) -> float:
+    """Parse a YYYY-MM-DD HH:MM string (UTC) to a POSIX timestamp.
+    
+    Matches the fixed format directly, which is several times faster than
+    strptime when loading many reminders; raises ValueError like strptime.
+    """
+    match = _REMIND_AT_PATTERN.fullmatch(remind_at)
+    if match is None:
+        raise ValueError(f"remind_at {remind_at!r} does not match format {REMIND_AT_FORMAT!r}")
+    parsed = datetime.datetime(*map(int, match.groups()), tzinfo=datetime.timezone.utc)
+    return parsed.timestamp()
+
+class ReminderScheduler:
+    """Min-heap of active reminders keyed on their pre-parsed due time.
+
+    ``pop_due`` only touches reminders that are due, instead of re-parsing
+    every reminder ever created on each poll. Register ``update`` as a storage
+    listener on the reminders collection; reminders that are cancelled or
+    triggered are dropped lazily when they reach the top of the heap.
+    """
+
+    def __init__(self, retry_delay: float = RETRY_DELAY):
+        self.retry_delay = retry_delay
+        self._heap: List[Tuple[float, str]] = []
+        self._due_at: Dict[str, float] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._due_at)
+
+    def update(self, reminder_id: str, old: Optional[Record], new: Optional[Record]) -> None:
+        """Storage listener: schedule active reminders, forget the rest"""
+        if new is None or new.get("status") != "active":
+            self._due_at.pop(reminder_id, None)
+            return
+        due_at = parse_remind_at(new["remind_at"])
+        if self._due_at.get(reminder_id) == due_at:
+            return
+        self._due_at[reminder_id] = due_at
+        heapq.heappush(self._heap, (due_at, reminder_id))
+        # A new earliest reminder shortens the dispatcher's sleep
+        if self._wakeup is not None and self._heap[0][1] == reminder_id:
+            self._wakeup.set()
+
+    def next_due(self) -> Optional[float]:
+        """Due time of the earliest active reminder, or None if there are none"""
+        while self._heap:
+            due_at, reminder_id = self._heap[0]
+            if self._due_at.get(reminder_id) == due_at:
+                return due_at
+            heapq.heappop(self._heap)  # Stale entry
+        return None
+
+    def pop_due(self, now: Optional[float] = None) -> List[str]:
+        """Remove and return the ids of reminders due at or before ``now``"""
+        now = time.time() if now is None else now
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due_at, reminder_id = heapq.heappop(self._heap)
+            if self._due_at.get(reminder_id) == due_at:
+                del self._due_at[reminder_id]
+                due.append(reminder_id)
+        return due
+
+    def retry(self, reminder_ids: List[str]) -> None:
+        """Put popped reminders back on the heap after their trigger failed.
+
+        They fall due again ``retry_delay`` seconds from now. A reminder that
+        was rescheduled, triggered or cancelled meanwhile is left alone; one
+        triggered by another worker is skipped by the conditional update
+        when it comes round again.
+        """
+        due_at = time.time() + self.retry_delay
+        for reminder_id in reminder_ids:
+            if reminder_id in self._due_at:
+                continue
+            self._due_at[reminder_id] = due_at
+            heapq.heappush(self._heap, (due_at, reminder_id))
+
+    def subscribe(self, maxsize: int = 1000) -> asyncio.Queue:
+        """Queue that receives each due reminder pushed by the dispatcher"""
+        queue = asyncio.Queue(maxsize=maxsize)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+
+    def publish(self, reminders: List[Record]) -> None:
+        for queue in self._subscribers:
+            for reminder in reminders:
+                try:
+                    queue.put_nowait(reminder)
+                except asyncio.QueueFull:
+                    print("Reminder subscriber queue full; dropping reminder")
+
+    def start(self, trigger: Callable[[List[str]], Awaitable[List[Record]]], max_sleep: float = 60.0) -> None:
+        """Run a background task that triggers reminders as they fall due.
+
+        ``trigger`` marks the given reminder ids as triggered and returns the
+        records, which are then pushed to every subscriber. If it raises, the
+        reminders are retried later.
+        """
+        if self._dispatcher is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._dispatcher = asyncio.create_task(self._dispatch_loop(trigger, max_sleep))
+
+    async def stop(self) -> None:
+        if self._dispatcher is None:
+            return
+        self._dispatcher.cancel()
+        try:
+            await self._dispatcher
+        except asyncio.CancelledError:
+            pass
+        self._dispatcher = None
+        self._wakeup = None
+
+    async def _dispatch_loop(self, trigger, max_sleep: float) -> None:
+        while True:
+            next_due = self.next_due()
+            delay = max_sleep if next_due is None else min(max_sleep, max(0.0, next_due - time.time()))
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            due = self.pop_due()
+            if not due:
+                continue
+            try:
+                self.publish(await trigger(due))
+            except Exception as e:
+                print(f"Reminder dispatch failed: {e}")
+                self.retry(due)
@@ -0,0 +1,329 @@
+"""Pluggable record storage for the MCP server tools"""
+import asyncio
+import json
+import os
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional
+
+import aiosqlite
+
+Record = Dict[str, Any]
+
+# Called as listener(key, old_record, new_record); either record may be None
+Listener = Callable[[str, Optional[Record], Optional[Record]], None]
+
+# For update_if and update_many: whether to change a record, and its replacement
+Predicate = Callable[[Record], bool]
+Change = Callable[[Record], Record]
+
+class StorageBackend(ABC):
+    """Keyed JSON records grouped into named collections (tasks, notes, ...)"""
+
+    def __init__(self):
+        self._listeners: Dict[str, List[Listener]] = {}
+
+    def add_listener(self, collection: str, listener: Listener) -> None:
+        """Register a callback run synchronously on every change to a collection.
+
+        Used to keep in-process secondary indexes in step with the records,
+        including records loaded at startup or written by other processes.
+        """
+        self._listeners.setdefault(collection, []).append(listener)
+
+    def _notify(self, collection: str, key: str, old: Optional[Record], new: Optional[Record]) -> None:
+        for listener in self._listeners.get(collection, ()):
+            listener(key, old, new)
+
+    async def open(self) -> None:
+        """Prepare the backend for use"""
+
+    async def close(self) -> None:
+        """Release resources, persisting anything still pending"""
+
+    @abstractmethod
+    async def get(self, collection: str, key: str) -> Optional[Record]:
+        """Return a record, or None if it does not exist"""
+
+    @abstractmethod
+    async def put(self, collection: str, key: str, record: Record) -> None:
+        """Insert or replace a record"""
+
+    @abstractmethod
+    async def delete(self, collection: str, key: str) -> bool:
+        """Remove a record; returns False if it did not exist"""
+
+    async def update_if(self, collection: str, key: str, predicate: Predicate, change: Change) -> Optional[Record]:
+        """Replace a record with ``change(record)`` only if ``predicate(record)`` holds.
+
+        Returns the new record, or None if the record is missing or the
+        predicate failed. Backends shared between processes check the latest
+        committed version, so only one caller can win (e.g. claiming a
+        reminder). This default suits process-local backends whose get and
+        put do not yield to other tasks.
+        """
+        updated = await self.update_many(collection, {key: change}, predicate)
+        return updated.get(key)
+
+    async def update_many(self, collection: str, changes: Dict[str, Change],
+                          predicate: Optional[Predicate] = None) -> Dict[str, Record]:
+        """Apply ``changes[key]`` to each existing record, as update_if does, all at once.
+
+        Returns the new records by key; missing records and those failing
+        ``predicate`` are left out. Suits read-modify-write updates such as
+        adding to a counter, which would lose concurrent updates as get+put.
+        """
+        updated = {}
+        for key, change in changes.items():
+            current = await self.get(collection, key)
+            if current is not None and (predicate is None or predicate(current)):
+                updated[key] = change(current)
+                await self.put(collection, key, updated[key])
+        return updated
+
+    @abstractmethod
+    async def values(self, collection: str) -> List[Record]:
+        """Return every record in a collection"""
+
+    @abstractmethod
+    async def count(self, collection: str) -> int:
+        """Return the number of records in a collection"""
+
+class MemoryStorage(StorageBackend):
+    """Process-local dictionaries; data is lost on restart"""
+
+    def __init__(self):
+        super().__init__()
+        self._collections: Dict[str, Dict[str, Record]] = {}
+
+    def _collection(self, collection: str) -> Dict[str, Record]:
+        records = self._collections.get(collection)
+        if records is None:
+            records = self._collections[collection] = {}
+        return records
+
+    def _apply(self, collection: str, key: str, record: Optional[Record]) -> Optional[Record]:
+        """Single mutation point: store a record (or remove it when None); returns the old one"""
+        records = self._collection(collection)
+        if record is None:
+            old = records.pop(key, None)
+        else:
+            old = records.get(key)
+            records[key] = record
+        if old is not None or record is not None:
+            self._notify(collection, key, old, record)
+        return old
+
+    async def get(self, collection: str, key: str) -> Optional[Record]:
+        return self._collection(collection).get(key)
+
+    async def put(self, collection: str, key: str, record: Record) -> None:
+        self._apply(collection, key, record)
+
+    async def delete(self, collection: str, key: str) -> bool:
+        return self._apply(collection, key, None) is not None
+
+    async def values(self, collection: str) -> List[Record]:
+        return list(self._collection(collection).values())
+
+    async def count(self, collection: str) -> int:
+        return len(self._collection(collection))
+
+class SQLiteStorage(MemoryStorage):
+    """Durable storage in a WAL-mode SQLite file.
+
+    Reads are served from an in-memory copy, so they cost the same as the
+    plain dicts. Writes update that copy immediately and are persisted by a
+    background task that commits everything pending in one transaction every
+    ``flush_interval`` seconds, or sooner once ``batch_size`` writes are queued.
+
+    Several processes (e.g. uvicorn workers) can share one file. Each flush
+    stamps its rows with a global sequence number, and each process pulls rows
+    with a newer sequence than it has seen, so writes from other workers
+    become visible within about one flush interval.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 0.05, batch_size: int = 500):
+        super().__init__()
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._db: Optional[aiosqlite.Connection] = None
+        self._pending: Dict[tuple, Optional[Record]] = {}
+        self._seen_seq = 0
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._flusher: Optional[asyncio.Task] = None
+
+    async def open(self) -> None:
+        if self._db is not None:
+            return
+        # Autocommit mode; transactions are opened explicitly in _flush()
+        self._db = await aiosqlite.connect(self.path, isolation_level=None)
+        for pragma in (
+            "PRAGMA journal_mode=WAL",
+            "PRAGMA synchronous=NORMAL",
+            "PRAGMA busy_timeout=5000",
+        ):
+            await self._db.execute(pragma)
+        await self._db.execute("""
+            CREATE TABLE IF NOT EXISTS records (
+                collection TEXT NOT NULL,
+                key TEXT NOT NULL,
+                data TEXT,
+                seq INTEGER NOT NULL,
+                PRIMARY KEY (collection, key)
+            ) WITHOUT ROWID
+        """)
+        await self._db.execute("CREATE INDEX IF NOT EXISTS idx_records_seq ON records (seq)")
+        await self._db.execute("""
+            CREATE TABLE IF NOT EXISTS storage_meta (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                seq INTEGER NOT NULL
+            )
+        """)
+        await self._db.execute("INSERT OR IGNORE INTO storage_meta (id, seq) VALUES (1, 0)")
+        await self._pull_changes()
+        self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def close(self) -> None:
+        if self._db is None:
+            return
+        self._flusher.cancel()
+        try:
+            await self._flusher
+        except asyncio.CancelledError:
+            pass
+        await self._flush()
+        await self._db.close()
+        self._db = None
+
+    async def put(self, collection: str, key: str, record: Record) -> None:
+        self._apply(collection, key, record)
+        self._mark_dirty(collection, key, record)
+
+    async def delete(self, collection: str, key: str) -> bool:
+        existed = self._apply(collection, key, None) is not None
+        if existed:
+            self._mark_dirty(collection, key, None)
+        return existed
+
+    async def flush(self) -> None:
+        """Persist pending writes now instead of waiting for the next interval"""
+        await self._flush()
+
+    def _mark_dirty(self, collection: str, key: str, record: Optional[Record]) -> None:
+        self._pending[(collection, key)] = record
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self._flush()
+            except Exception as e:
+                print(f"Storage flush failed: {e}")
+
+    async def _pull_changes(self, batch: Dict[tuple, Optional[Record]] = None) -> None:
+        """Load rows committed by other processes since the last pull"""
+        cursor = await self._db.execute(
+            "SELECT collection, key, data, seq FROM records WHERE seq > ? ORDER BY seq",
+            (self._seen_seq,)
+        )
+        for collection, key, data, seq in await cursor.fetchall():
+            # Local writes that have not been committed yet win
+            if (collection, key) not in self._pending and (not batch or (collection, key) not in batch):
+                self._apply(collection, key, json.loads(data) if data is not None else None)
+            self._seen_seq = max(self._seen_seq, seq)
+
+    async def _flush(self) -> None:
+        async with self._flush_lock:
+            await self._flush_pending()
+
+    async def update_many(self, collection: str, changes: Dict[str, Change],
+                          predicate: Optional[Predicate] = None) -> Dict[str, Record]:
+        # Check and write in one transaction, after pulling what other
+        # processes committed, so two workers cannot both apply a change to
+        # the same version of a record
+        async with self._flush_lock:
+            batch, self._pending = self._pending, {}
+            updated = {}
+            try:
+                await self._db.execute("BEGIN IMMEDIATE")
+                await self._pull_changes(batch)
+                records = self._collection(collection)
+                for key, change in changes.items():
+                    current = records.get(key)
+                    if current is not None and (predicate is None or predicate(current)):
+                        updated[key] = change(current)
+                writes = {**batch, **{(collection, key): record for key, record in updated.items()}}
+                seq = await self._write(writes) if writes else None
+                await self._db.execute("COMMIT")
+                if seq is not None:
+                    self._seen_seq = seq
+            except Exception:
+                await self._abort(batch)
+                raise
+        for key, record in updated.items():
+            self._apply(collection, key, record)
+        return updated
+
+    async def _flush_pending(self) -> None:
+        if not self._pending:
+            cursor = await self._db.execute("SELECT seq FROM storage_meta WHERE id = 1")
+            (seq,) = await cursor.fetchone()
+            if seq > self._seen_seq:
+                await self._pull_changes()
+            return
+
+        batch, self._pending = self._pending, {}
+        try:
+            await self._db.execute("BEGIN IMMEDIATE")
+            await self._pull_changes(batch)
+            seq = await self._write(batch)
+            await self._db.execute("COMMIT")
+            self._seen_seq = seq
+        except Exception:
+            await self._abort(batch)
+            raise
+
+    async def _write(self, batch: Dict[tuple, Optional[Record]]) -> int:
+        """Write a batch inside the open transaction; returns its sequence number"""
+        await self._db.execute("UPDATE storage_meta SET seq = seq + 1 WHERE id = 1")
+        cursor = await self._db.execute("SELECT seq FROM storage_meta WHERE id = 1")
+        (seq,) = await cursor.fetchone()
+        # Deletes are kept as tombstones (data NULL) so other processes see them
+        await self._db.executemany(
+            """
+            INSERT INTO records (collection, key, data, seq) VALUES (?, ?, ?, ?)
+            ON CONFLICT (collection, key) DO UPDATE SET data = excluded.data, seq = excluded.seq
+            """,
+            [
+                (collection, key, json.dumps(record) if record is not None else None, seq)
+                for (collection, key), record in batch.items()
+            ]
+        )
+        return seq
+
+    async def _abort(self, batch: Dict[tuple, Optional[Record]]) -> None:
+        if self._db.in_transaction:
+            await self._db.execute("ROLLBACK")
+        # Requeue without overwriting anything written since
+        for item, record in batch.items():
+            self._pending.setdefault(item, record)
+
+def create_storage() -> StorageBackend:
+    """Build the backend selected by MCP_STORAGE_BACKEND (sqlite or memory)"""
+    backend = os.getenv("MCP_STORAGE_BACKEND", "sqlite").lower()
+    if backend == "memory":
+        return MemoryStorage()
+    if backend == "sqlite":
+        return SQLiteStorage(
+            os.getenv("MCP_STORAGE_PATH", "./mcp_storage.db"),
+            flush_interval=float(os.getenv("MCP_STORAGE_FLUSH_INTERVAL", 0.05)),
+        )
+    raise ValueError(f"Unknown MCP_STORAGE_BACKEND: {backend}")
@@ -0,0 +1,78 @@
+"""Secondary indexes for listing tasks without scanning the whole store"""
+from bisect import bisect_left, insort
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from storage import Record
+
+SortKey = Tuple[str, str]  # (created_at, task_id)
+
+class TaskIndex:
+    """Tasks ordered by creation time, per status, priority and status+priority.
+
+    Each filter combination has its own list of (created_at, id) kept sorted,
+    so a page of matching tasks is a binary search plus a slice of the page
+    size, no matter how many tasks exist. Register ``update`` as a storage
+    listener on the tasks collection to keep the index current.
+    """
+
+    def __init__(self):
+        self._lists: Dict[tuple, List[SortKey]] = {}
+
+    @staticmethod
+    def _filter_keys(task: Record) -> Iterator[tuple]:
+        status, priority = task.get("status"), task.get("priority")
+        yield ()
+        yield ("status", status)
+        yield ("priority", priority)
+        yield ("status", status, "priority", priority)
+
+    @staticmethod
+    def _sort_key(task_id: str, task: Record) -> SortKey:
+        return (task.get("created_at") or "", task_id)
+
+    def update(self, task_id: str, old: Optional[Record], new: Optional[Record]) -> None:
+        """Storage listener: move a task between index lists"""
+        if old is not None:
+            sort_key = self._sort_key(task_id, old)
+            for filter_key in self._filter_keys(old):
+                entries = self._lists.get(filter_key)
+                if entries:
+                    i = bisect_left(entries, sort_key)
+                    if i < len(entries) and entries[i] == sort_key:
+                        del entries[i]
+        if new is not None:
+            sort_key = self._sort_key(task_id, new)
+            for filter_key in self._filter_keys(new):
+                insort(self._lists.setdefault(filter_key, []), sort_key)
+
+    def page(self, status: Optional[str] = None, priority: Optional[str] = None,
+             limit: int = 50, cursor: Optional[str] = None) -> Tuple[List[str], Optional[str], int]:
+        """Return (task ids newest first, next cursor or None, total matches)"""
+        if status and priority:
+            filter_key = ("status", status, "priority", priority)
+        elif status:
+            filter_key = ("status", status)
+        elif priority:
+            filter_key = ("priority", priority)
+        else:
+            filter_key = ()
+        entries = self._lists.get(filter_key, [])
+
+        # Entries are ascending; walk backwards from just before the cursor
+        end = len(entries)
+        if cursor:
+            end = bisect_left(entries, decode_cursor(cursor))
+        start = max(0, end - limit)
+        page = entries[start:end][::-1]
+
+        next_cursor = encode_cursor(page[-1]) if start > 0 and page else None
+        return [task_id for _, task_id in page], next_cursor, len(entries)
+
+def encode_cursor(sort_key: SortKey) -> str:
+    return f"{sort_key[0]}|{sort_key[1]}"
+
+def decode_cursor(cursor: str) -> SortKey:
+    created_at, sep, task_id = cursor.partition("|")
+    if not sep:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return (created_at, task_id)
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""Tests for the server's copy of the calculator expression engine"""
+import asyncio
+import os
+
+os.environ["MCP_STORAGE_BACKEND"] = "memory"
+
+import expression_engine
+import mcp_server
+
+CLIENT_COPY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "client", "expression_engine.py")
+
+def test_matches_client_copy():
+    # client/ and server/ are separate build contexts, so each has a copy;
+    # client/test_expression_engine.py covers the engine itself
+    if not os.path.exists(CLIENT_COPY):
+        print("client/ is not checked out alongside server/, skipping")
+        return
+    with open(expression_engine.__file__, "rb") as server, open(CLIENT_COPY, "rb") as client:
+        assert server.read() == client.read(), "server/expression_engine.py differs from client/expression_engine.py"
+
+async def check_calculator_tool():
+    calculator = mcp_server.calculator.fn
+    assert await calculator("sqrt(16) + 2**10") == {"success": True, "expression": "sqrt(16) + 2**10", "result": 1028.0}
+    assert (await calculator("round(pi, 2)"))["result"] == 3.14
+    for expression in ["2 ^ 3", '__import__("os")', "9**9**9", "1 / 0", "pow(2, 10**9, 10**1000)"]:
+        result = await calculator(expression)
+        assert result["success"] is False and result["expression"] == expression, result
+        assert result["error"], result
+
+def test_calculator_tool():
+    asyncio.run(check_calculator_tool())
+
+if __name__ == "__main__":
+    test_matches_client_copy()
+    test_calculator_tool()
+    print("✅ Expression engine tests passed!")
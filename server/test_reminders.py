@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""Tests for triggering due reminders"""
+import asyncio
+import os
+import tempfile
+import time
+
+os.environ["MCP_STORAGE_BACKEND"] = "memory"
+
+import mcp_server
+from reminder_scheduler import ReminderScheduler
+from storage import MemoryStorage, SQLiteStorage
+
+REMINDER = {"id": "r1", "title": "Call", "message": "Call Bob", "remind_at": "2020-01-01 09:00",
+            "status": "active"}
+
+_saved = None
+_running = 0
+
+class Worker:
+    """One server process: its own storage connection and scheduler"""
+
+    def __init__(self, storage, retry_delay: float = 5.0):
+        self.storage = storage
+        self.scheduler = ReminderScheduler(retry_delay=retry_delay)
+        storage.add_listener(mcp_server.REMINDERS, self.scheduler.update)
+
+    async def trigger(self, reminder_ids):
+        """Run mcp_server.trigger_reminders against this worker's state"""
+        # Triggers may overlap, so the module state is restored by the last to finish
+        global _saved, _running
+        if not _running:
+            _saved = mcp_server.storage, mcp_server.reminder_scheduler
+        _running += 1
+        mcp_server.storage, mcp_server.reminder_scheduler = self.storage, self.scheduler
+        try:
+            return await mcp_server.trigger_reminders(reminder_ids)
+        finally:
+            _running -= 1
+            if not _running:
+                mcp_server.storage, mcp_server.reminder_scheduler = _saved
+
+async def check_triggered_once(path: str):
+    first = Worker(SQLiteStorage(path, flush_interval=10))
+    second = Worker(SQLiteStorage(path, flush_interval=10))
+    await first.storage.open()
+    await second.storage.open()
+    await first.storage.put(mcp_server.REMINDERS, "r1", REMINDER)
+    await first.storage.flush()
+    await second.storage.flush()
+
+    # Both workers see the reminder fall due
+    assert first.scheduler.pop_due() == ["r1"]
+    assert second.scheduler.pop_due() == ["r1"]
+    triggered = await first.trigger(["r1"])
+    assert [r["status"] for r in triggered] == ["triggered"]
+    # The second worker's copy still says active, but the update checks the stored one
+    assert (await second.storage.get(mcp_server.REMINDERS, "r1"))["status"] == "active"
+    assert await second.trigger(["r1"]) == []
+    assert (await second.storage.get(mcp_server.REMINDERS, "r1"))["status"] == "triggered"
+
+    # Within one worker, the dispatcher and check_reminders racing
+    await first.storage.put(mcp_server.REMINDERS, "r2", dict(REMINDER, id="r2"))
+    results = await asyncio.gather(first.trigger(["r2"]), first.trigger(["r2"]))
+    assert sorted(map(len, results)) == [0, 1]
+
+    # Missing, cancelled and already triggered reminders are skipped
+    await first.storage.put(mcp_server.REMINDERS, "r3", dict(REMINDER, id="r3", status="cancelled"))
+    assert await first.trigger(["r1", "r3", "missing"]) == []
+    await first.storage.close()
+    await second.storage.close()
+
+    reopened = SQLiteStorage(path)
+    await reopened.open()
+    assert (await reopened.get(mcp_server.REMINDERS, "r1"))["status"] == "triggered"
+    assert (await reopened.get(mcp_server.REMINDERS, "r2"))["status"] == "triggered"
+    await reopened.close()
+
+async def check_failed_trigger_retried():
+    worker = Worker(MemoryStorage(), retry_delay=60)
+    await worker.storage.put(mcp_server.REMINDERS, "r1", REMINDER)
+    await worker.storage.put(mcp_server.REMINDERS, "r2", dict(REMINDER, id="r2"))
+
+    update_if = worker.storage.update_if
+    async def flaky(collection, key, predicate, change):
+        if key == "r1":
+            raise OSError("database is locked")
+        return await update_if(collection, key, predicate, change)
+    worker.storage.update_if = flaky
+
+    due = worker.scheduler.pop_due()
+    assert sorted(due) == ["r1", "r2"]
+    assert [r["id"] for r in await worker.trigger(due)] == ["r2"]
+    # r1 is back on the heap, due after the retry delay
+    assert len(worker.scheduler) == 1
+    assert worker.scheduler.pop_due() == []
+    assert worker.scheduler.next_due() > time.time() + 50
+    worker.storage.update_if = update_if
+    assert worker.scheduler.pop_due(time.time() + 61) == ["r1"]
+    assert [r["id"] for r in await worker.trigger(["r1"])] == ["r1"]
+    assert len(worker.scheduler) == 0
+
+    # Retrying a reminder cancelled in the meantime does not trigger it
+    await worker.storage.put(mcp_server.REMINDERS, "r3", dict(REMINDER, id="r3"))
+    worker.scheduler.retry(worker.scheduler.pop_due())
+    await worker.storage.put(mcp_server.REMINDERS, "r3", dict(REMINDER, id="r3", status="cancelled"))
+    assert worker.scheduler.next_due() is None
+
+async def check_dispatcher_retries():
+    worker = Worker(MemoryStorage(), retry_delay=0.05)
+    await worker.storage.put(mcp_server.REMINDERS, "r1", REMINDER)
+    calls = []
+
+    async def trigger(reminder_ids):
+        calls.append(list(reminder_ids))
+        if len(calls) == 1:
+            raise ConnectionError("storage unavailable")
+        return await worker.trigger(reminder_ids)
+
+    queue = worker.scheduler.subscribe()
+    worker.scheduler.start(trigger, max_sleep=0.01)
+    try:
+        reminder = await asyncio.wait_for(queue.get(), timeout=2)
+    finally:
+        await worker.scheduler.stop()
+    assert calls == [["r1"], ["r1"]]
+    assert reminder["id"] == "r1" and reminder["status"] == "triggered"
+
+def test_triggered_once():
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(check_triggered_once(os.path.join(directory, "storage.db")))
+
+def test_failed_trigger_retried():
+    asyncio.run(check_failed_trigger_retried())
+
+def test_dispatcher_retries():
+    asyncio.run(check_dispatcher_retries())
+
+if __name__ == "__main__":
+    test_triggered_once()
+    test_failed_trigger_retried()
+    test_dispatcher_retries()
+    print("✅ Reminder tests passed!")
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""Tests for the SQLite storage backend"""
+import asyncio
+import os
+import sqlite3
+import tempfile
+
+os.environ["MCP_STORAGE_BACKEND"] = "memory"
+
+import mcp_server
+from storage import SQLiteStorage
+
+def db_path(directory: str) -> str:
+    return os.path.join(directory, "storage.db")
+
+async def check_survives_reopen(path: str):
+    storage = SQLiteStorage(path, flush_interval=10)
+    await storage.open()
+    await storage.put("tasks", "t1", {"title": "First"})
+    await storage.put("tasks", "t2", {"title": "Second"})
+    await storage.put("tasks", "t1", {"title": "First, edited"})
+    await storage.put("notes", "n1", {"title": "Note"})
+    await storage.delete("tasks", "t2")
+    # Nothing flushed yet: close() must persist what is pending
+    await storage.close()
+
+    reopened = SQLiteStorage(path)
+    await reopened.open()
+    assert await reopened.get("tasks", "t1") == {"title": "First, edited"}
+    assert await reopened.get("tasks", "t2") is None
+    assert await reopened.count("tasks") == 1
+    assert await reopened.values("notes") == [{"title": "Note"}]
+    await reopened.close()
+
+async def check_delete_tombstones(path: str):
+    writer, reader = SQLiteStorage(path, flush_interval=10), SQLiteStorage(path, flush_interval=10)
+    await writer.open()
+    await writer.put("tasks", "t1", {"title": "Doomed"})
+    await writer.flush()
+    await reader.open()
+    assert await reader.get("tasks", "t1") == {"title": "Doomed"}
+
+    removed = []
+    reader.add_listener("tasks", lambda key, old, new: removed.append((key, old, new)))
+    assert await writer.delete("tasks", "t1")
+    assert not await writer.delete("tasks", "t1")
+    await writer.flush()
+
+    # The row stays as a tombstone so that other processes learn of the delete
+    with sqlite3.connect(path) as db:
+        assert db.execute("SELECT data FROM records WHERE key = 't1'").fetchall() == [(None,)]
+    await reader.flush()
+    assert await reader.get("tasks", "t1") is None
+    assert removed == [("t1", {"title": "Doomed"}, None)]
+    await writer.close()
+    await reader.close()
+
+async def check_other_connection_writes(path: str):
+    first, second = SQLiteStorage(path, flush_interval=10), SQLiteStorage(path, flush_interval=10)
+    await first.open()
+    await second.open()
+    seen = []
+    second.add_listener("tasks", lambda key, old, new: seen.append(key))
+
+    await first.put("tasks", "a", {"v": 1})
+    await first.flush()
+    await second.flush()
+    assert await second.get("tasks", "a") == {"v": 1} and seen == ["a"]
+
+    # A write not yet committed locally wins over an older one from elsewhere
+    await second.put("tasks", "b", {"v": "second"})
+    await first.put("tasks", "b", {"v": "first"})
+    await first.flush()
+    await second.flush()
+    await first.flush()
+    assert await second.get("tasks", "b") == {"v": "second"}
+    assert await first.get("tasks", "b") == {"v": "second"}
+
+    # The background flusher picks up changes without an explicit flush
+    fast = SQLiteStorage(path, flush_interval=0.01)
+    await fast.open()
+    await first.put("tasks", "c", {"v": 3})
+    await first.flush()
+    await asyncio.sleep(0.1)
+    assert await fast.get("tasks", "c") == {"v": 3}
+    for storage in (first, second, fast):
+        await storage.close()
+
+async def check_failed_flush_requeues(path: str):
+    storage = SQLiteStorage(path, flush_interval=10)
+    await storage.open()
+    await storage.put("tasks", "t1", {"v": 1})
+    await storage.put("tasks", "t2", {"v": 1})
+
+    executemany = storage._db.executemany
+    async def broken(*args, **kwargs):
+        raise sqlite3.OperationalError("disk I/O error")
+    storage._db.executemany = broken
+    try:
+        await storage.flush()
+        assert False, "flush error was swallowed"
+    except sqlite3.OperationalError:
+        pass
+    assert not storage._db.in_transaction
+    assert set(storage._pending) == {("tasks", "t1"), ("tasks", "t2")}
+
+    # A write made after the failure is not overwritten by the requeued one
+    await storage.put("tasks", "t1", {"v": 2})
+    storage._db.executemany = executemany
+    await storage.flush()
+    assert not storage._pending
+    await storage.close()
+
+    reopened = SQLiteStorage(path)
+    await reopened.open()
+    assert await reopened.get("tasks", "t1") == {"v": 2}
+    assert await reopened.get("tasks", "t2") == {"v": 1}
+    await reopened.close()
+
+async def check_notes_from_two_workers(path: str):
+    first, second = SQLiteStorage(path, flush_interval=10), SQLiteStorage(path, flush_interval=10)
+    await first.open()
+    await second.open()
+    saved = mcp_server.storage
+    try:
+        # Each worker has seen no notes when it saves one
+        note_ids = []
+        for storage in (first, second):
+            mcp_server.storage = storage
+            note_ids.append((await mcp_server.save_note.fn("Note", "Text"))["note_id"])
+    finally:
+        mcp_server.storage = saved
+        await first.close()
+        await second.close()
+    assert note_ids[0] != note_ids[1]
+
+    reopened = SQLiteStorage(path)
+    await reopened.open()
+    assert sorted(note["id"] for note in await reopened.values(mcp_server.NOTES)) == sorted(note_ids)
+    await reopened.close()
+
+def run_in_tempdir(check):
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(check(db_path(directory)))
+
+def test_survives_reopen():
+    run_in_tempdir(check_survives_reopen)
+
+def test_delete_tombstones():
+    run_in_tempdir(check_delete_tombstones)
+
+def test_other_connection_writes():
+    run_in_tempdir(check_other_connection_writes)
+
+def test_failed_flush_requeues():
+    run_in_tempdir(check_failed_flush_requeues)
+
+def test_notes_from_two_workers():
+    run_in_tempdir(check_notes_from_two_workers)
+
+if __name__ == "__main__":
+    test_survives_reopen()
+    test_delete_tombstones()
+    test_other_connection_writes()
+    test_failed_flush_requeues()
+    test_notes_from_two_workers()
+    print("✅ Storage tests passed!")
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Tests for the task listing index"""
+import asyncio
+
+from storage import MemoryStorage
+from task_index import TaskIndex, decode_cursor, encode_cursor
+
+def make_task(n: int, status: str = "pending", priority: str = "medium") -> dict:
+    return {"title": f"Task {n}", "status": status, "priority": priority,
+            "created_at": f"2026-01-01T00:00:{n:02d}"}
+
+def all_pages(index: TaskIndex, **filters) -> list:
+    ids, cursor = [], None
+    while True:
+        page, cursor, _ = index.page(cursor=cursor, **filters)
+        ids.extend(page)
+        if cursor is None:
+            return ids
+
+def check_cursor_paging():
+    index = TaskIndex()
+    for n in range(10):
+        index.update(f"t{n}", None, make_task(n))
+
+    page, cursor, total = index.page(limit=4)
+    assert page == ["t9", "t8", "t7", "t6"] and total == 10
+    page, cursor, _ = index.page(limit=4, cursor=cursor)
+    assert page == ["t5", "t4", "t3", "t2"]
+    page, cursor, _ = index.page(limit=4, cursor=cursor)
+    assert page == ["t1", "t0"] and cursor is None
+    assert all_pages(index, limit=3) == [f"t{n}" for n in reversed(range(10))]
+
+    # An exact fit has no trailing empty page
+    page, cursor, _ = index.page(limit=10)
+    assert len(page) == 10 and cursor is None
+    assert index.page(status="done") == ([], None, 0)
+
+    # Ties on created_at fall back to the task id
+    index.update("same-b", None, make_task(99))
+    index.update("same-a", None, make_task(99))
+    assert index.page(limit=2)[0] == ["same-b", "same-a"]
+    assert decode_cursor(encode_cursor(("2026-01-01T00:00:01", "a|b"))) == ("2026-01-01T00:00:01", "a|b")
+    try:
+        decode_cursor("garbage")
+        assert False, "invalid cursor accepted"
+    except ValueError:
+        pass
+
+def check_stable_across_changes():
+    index = TaskIndex()
+    tasks = {f"t{n}": make_task(n) for n in range(10)}
+    for task_id, task in tasks.items():
+        index.update(task_id, None, task)
+
+    page, cursor, _ = index.page(limit=4)
+    assert page == ["t9", "t8", "t7", "t6"]
+    # New tasks sort before the cursor; deleting the cursor's own task must
+    # not lose or repeat anything on later pages
+    index.update("t10", None, make_task(10))
+    index.update("t6", tasks["t6"], None)
+    index.update("t4", tasks["t4"], None)
+    page, cursor, total = index.page(limit=4, cursor=cursor)
+    assert page == ["t5", "t3", "t2", "t1"] and total == 9
+    page, cursor, _ = index.page(limit=4, cursor=cursor)
+    assert page == ["t0"] and cursor is None
+
+async def check_bucket_moves():
+    storage = MemoryStorage()
+    index = TaskIndex()
+    storage.add_listener("tasks", index.update)
+    for n in range(6):
+        await storage.put("tasks", f"t{n}", make_task(n, priority="high" if n % 2 else "low"))
+
+    assert index.page(status="pending", priority="high")[0] == ["t5", "t3", "t1"]
+    task = dict(await storage.get("tasks", "t3"), status="completed", priority="low")
+    await storage.put("tasks", "t3", task)
+
+    assert index.page(status="pending")[0] == ["t5", "t4", "t2", "t1", "t0"]
+    assert index.page(status="completed") == (["t3"], None, 1)
+    assert index.page(priority="high")[0] == ["t5", "t1"]
+    assert index.page(priority="low")[0] == ["t4", "t3", "t2", "t0"]
+    assert index.page(status="pending", priority="high")[0] == ["t5", "t1"]
+    assert index.page(status="completed", priority="low")[0] == ["t3"]
+    assert index.page()[2] == 6
+
+    await storage.delete("tasks", "t3")
+    assert index.page(status="completed") == ([], None, 0)
+    assert index.page()[2] == 5
+
+def test_cursor_paging():
+    check_cursor_paging()
+
+def test_stable_across_changes():
+    check_stable_across_changes()
+
+def test_bucket_moves():
+    asyncio.run(check_bucket_moves())
+
+if __name__ == "__main__":
+    test_cursor_paging()
+    test_stable_across_changes()
+    test_bucket_moves()
+    print("✅ Task index tests passed!")
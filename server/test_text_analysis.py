@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Tests that chunked text statistics match analyzing the whole text"""
+import os
+import random
+import tempfile
+import time
+
+from text_analysis import MAX_TOKEN_LENGTH, TextStats, analyze_chunks, analyze_file, analyze_text
+
+PIECES = ["word", "Words", "tiny", "a", "éclair", "naïve", " ", " ", "  ", "\t", "\n", "\n\n", "\n\n\n",
+          ".", "!", "?", "...", "?!", ",", '"quoted"', "(aside)", "end.", "Hello,", "....", "—"]
+
+def random_text(rng: random.Random, length: int) -> str:
+    return "".join(rng.choice(PIECES) for _ in range(length))
+
+def random_split(rng: random.Random, text: str) -> list:
+    cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, rng.randint(0, 20))))
+    return [text[start:end] for start, end in zip([0] + cuts, cuts + [len(text)])]
+
+def test_chunks_match_whole_text():
+    rng = random.Random(19)
+    for _ in range(500):
+        text = random_text(rng, rng.randint(0, 60))
+        expected = analyze_text(text)
+        assert analyze_chunks(random_split(rng, text)) == expected, repr(text)
+        # Every chunk a single character, including empty chunks in between
+        assert analyze_chunks([c for ch in text for c in (ch, "")]) == expected, repr(text)
+
+def test_paragraph_and_sentence_boundaries():
+    text = "One. Two!\n\nThree?\n\n\n\nFour...\nstill four\n\n"
+    expected = analyze_text(text)
+    assert expected["sentence_count"] == 5 and expected["paragraph_count"] == 3
+    for i in range(len(text) + 1):
+        for j in range(i, len(text) + 1):
+            assert analyze_chunks([text[:i], text[i:j], text[j:]]) == expected, (i, j)
+
+def test_file_matches_text():
+    rng = random.Random(7)
+    text = random_text(rng, 3000)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "sample.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        # Odd byte chunk sizes split multi-byte characters
+        for chunk_size in (1, 3, 7, 1000):
+            assert analyze_file(path, chunk_size=chunk_size) == analyze_text(text), chunk_size
+        open(path, "w").close()
+        assert analyze_file(path) == analyze_text("")
+
+def test_punctuation_only_tokens_not_counted():
+    # Tokens that are empty once punctuation is stripped are not words
+    result = analyze_text('Well .... "()" well, WELL! done')
+    assert result["most_common_words"] == [("well", 3), ("done", 1)]
+    assert result["word_count"] == 6
+
+def test_long_token_in_many_chunks():
+    # 8MB without whitespace, fed 4KB at a time
+    token = "abcd.efgh!" * (800 << 10)
+    text = "start here\n" + token + " end.\n\nNext paragraph"
+    stats = TextStats()
+    start = time.perf_counter()
+    longest_carry = 0
+    for i in range(0, len(text), 4096):
+        stats.feed(text[i:i + 4096])
+        longest_carry = max(longest_carry, len(stats._carry))
+    result = stats.result()
+    assert time.perf_counter() - start < 2.0
+    assert longest_carry <= MAX_TOKEN_LENGTH + 4096
+    assert result == analyze_text(text) == analyze_chunks([text[:5], text[5:(3 << 20)], text[(3 << 20):]])
+    assert result["word_count"] == 6 and result["paragraph_count"] == 2
+    assert result["sentence_count"] == 2 * (800 << 10) + 2
+    assert result["average_word_length"] == round((len(text) - 6) / 6, 1)
+    assert (token[:MAX_TOKEN_LENGTH].strip("!."), 1) in result["most_common_words"]
+
+    # Random splits around the length limit agree with the whole text
+    rng = random.Random(3)
+    for _ in range(20):
+        pieces = [rng.choice(["x" * (MAX_TOKEN_LENGTH + rng.randint(-2, 2)), "\n", " ", ".", "\n\n"])
+                  for _ in range(6)]
+        text = "".join(pieces)
+        assert analyze_chunks(random_split(rng, text)) == analyze_text(text)
+
+if __name__ == "__main__":
+    test_chunks_match_whole_text()
+    test_paragraph_and_sentence_boundaries()
+    test_file_matches_text()
+    test_punctuation_only_tokens_not_counted()
+    test_long_token_in_many_chunks()
+    print("✅ Text analysis tests passed!")
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Tests for the pure tool result cache"""
+import asyncio
+import inspect
+import time
+
+from tool_cache import ToolResultCache
+
+async def check_hits_and_misses():
+    cache = ToolResultCache(maxsize=10)
+    calls = []
+
+    @cache.pure(ttl=60)
+    async def convert(value: float, unit: str = "km") -> dict:
+        """Convert a value"""
+        calls.append((value, unit))
+        return {"success": True, "result": value * 2, "unit": unit}
+
+    assert convert.__name__ == "convert" and convert.__doc__ == "Convert a value"
+    assert list(inspect.signature(convert).parameters) == ["value", "unit"]
+
+    first = await convert(1.0)
+    assert await convert(1.0) is first
+    await convert(2.0)
+    await convert(1.0, unit="mi")
+    assert calls == [(1.0, "km"), (2.0, "km"), (1.0, "mi")]
+
+    stats = cache.stats()
+    assert stats["size"] == 3 and stats["hits"] == 1 and stats["misses"] == 3 and stats["hit_rate"] == 0.25
+    assert stats["tools"]["convert"] == {"hits": 1, "misses": 3, "ttl": 60}
+
+    cache.clear()
+    await convert(1.0)
+    assert len(calls) == 4
+
+async def check_default_arguments():
+    cache = ToolResultCache()
+    calls = []
+
+    @cache.pure(ttl=60)
+    async def convert(value: float, unit: str = "km", precision: int = 2) -> dict:
+        calls.append(value)
+        return {"success": True}
+
+    # Positional, keyword, and explicit defaults all bind to the same arguments
+    await convert(1.0)
+    await convert(1.0, "km")
+    await convert(value=1.0, precision=2)
+    await convert(1.0, unit="km", precision=2)
+    assert calls == [1.0] and len(cache) == 1
+    await convert(1.0, precision=3)
+    assert calls == [1.0, 1.0] and len(cache) == 2
+
+async def check_ttl_expiry():
+    cache = ToolResultCache()
+    calls = []
+
+    @cache.pure(ttl=0.05)
+    async def weather(location: str) -> dict:
+        calls.append(location)
+        return {"success": True, "temperature": len(calls)}
+
+    @cache.pure(ttl=60)
+    async def calculator(expression: str) -> dict:
+        calls.append(expression)
+        return {"success": True}
+
+    assert (await weather("Paris"))["temperature"] == 1
+    await calculator("1+1")
+    assert (await weather("Paris"))["temperature"] == 1
+    time.sleep(0.06)
+    # Each tool keeps its own TTL; an expired entry is replaced
+    assert (await weather("Paris"))["temperature"] == 3
+    await calculator("1+1")
+    assert calls == ["Paris", "1+1", "Paris"] and len(cache) == 2
+
+async def check_errors_not_cached():
+    cache = ToolResultCache()
+    calls = []
+
+    @cache.pure(ttl=60)
+    async def calculator(expression: str) -> dict:
+        calls.append(expression)
+        if expression == "1/0":
+            return {"success": False, "error": "division by zero"}
+        if expression == "boom":
+            raise RuntimeError("unexpected")
+        return {"success": True, "result": 1}
+
+    for _ in range(2):
+        assert (await calculator("1/0"))["success"] is False
+        try:
+            await calculator("boom")
+            assert False, "exception was swallowed"
+        except RuntimeError:
+            pass
+    assert calls == ["1/0", "boom", "1/0", "boom"] and len(cache) == 0
+
+    # Results that are not success dicts are still cached
+    @cache.pure(ttl=60)
+    async def echo(text: str) -> str:
+        calls.append(text)
+        return text
+    await echo("hi")
+    await echo("hi")
+    assert calls.count("hi") == 1
+
+async def check_lru_eviction():
+    cache = ToolResultCache(maxsize=2)
+    calls = []
+
+    @cache.pure(ttl=60)
+    async def square(n: int) -> int:
+        calls.append(n)
+        return n * n
+
+    await square(1)
+    await square(2)
+    await square(1)  # 1 is now the most recently used
+    await square(3)  # Evicts 2
+    await square(1)
+    await square(2)
+    assert calls == [1, 2, 3, 2] and len(cache) == 2
+
+def test_hits_and_misses():
+    asyncio.run(check_hits_and_misses())
+
+def test_default_arguments():
+    asyncio.run(check_default_arguments())
+
+def test_ttl_expiry():
+    asyncio.run(check_ttl_expiry())
+
+def test_errors_not_cached():
+    asyncio.run(check_errors_not_cached())
+
+def test_lru_eviction():
+    asyncio.run(check_lru_eviction())
+
+if __name__ == "__main__":
+    test_hits_and_misses()
+    test_default_arguments()
+    test_ttl_expiry()
+    test_errors_not_cached()
+    test_lru_eviction()
+    print("✅ Tool cache tests passed!")
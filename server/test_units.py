@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""Tests for unit conversions and the batch unit converter tool"""
+import asyncio
+import math
+import os
+import random
+
+os.environ["MCP_STORAGE_BACKEND"] = "memory"
+
+import mcp_server
+import units
+from units import NUMPY_MIN_BATCH, Conversion
+
+def convert(value: float, from_unit: str, to_unit: str) -> float:
+    return Conversion(from_unit, to_unit).convert(value)
+
+def test_each_family():
+    assert convert(1, "km", "mi") == 0.621373
+    assert convert(12, "in", "ft") == 1.0
+    assert convert(1, "kg", "lb") == 2.204624
+    assert convert(16, "oz", "lb") == 1.0
+    assert convert(1, "gal", "l") == 3.78541
+    assert convert(1000, "cm3", "l") == 1.0
+    assert convert(90, "min", "h") == 1.5
+    assert convert(1, "week", "day") == 7.0
+    assert convert(1, "byte", "bit") == 8.0
+    assert convert(1, "GiB", "MiB") == 1024.0
+    assert convert(100, "km/h", "m/s") == 27.777778
+    assert convert(10, "knot", "mph") == 11.507785
+    # Aliases and case-insensitive names outside data sizes
+    assert convert(3, "Feet", "YD") == 1.0
+    assert convert(2, "hours", "minutes") == 120.0
+    assert Conversion("KM", "Miles").from_unit == "km"
+
+def test_temperature_offsets():
+    assert convert(100, "c", "f") == 212.0
+    assert convert(-40, "f", "c") == -40.0
+    assert convert(0, "k", "c") == -273.15
+    assert convert(32, "fahrenheit", "kelvin") == 273.15
+    assert convert(37.5, "C", "F") == 99.5
+    assert Conversion("c", "f").family == "temperature"
+
+def test_data_sizes_are_case_sensitive():
+    assert convert(1, "MB", "kB") == 1000.0
+    assert convert(1, "KB", "B") == 1000.0
+    assert convert(8, "Mb", "MB") == 1.0
+    assert convert(1, "Gb", "Mb") == 1000.0
+    assert convert(1, "MiB", "MB") == 1.048576
+    assert convert(2, "megabytes", "megabits") == 16.0
+    for unit in ("mb", "mB", "b", "kb", "gib", "KIB", "tb"):
+        try:
+            Conversion(unit, "B")
+            assert False, unit
+        except ValueError as e:
+            assert str(e).startswith(f"Ambiguous unit '{unit}'")
+
+def test_unsupported_and_mismatched_units():
+    # Reported as lowercased, except for data size symbols
+    for from_unit, to_unit, message in [("km", "kg", "'km' to 'kg'"), ("C", "m", "'c' to 'm'"),
+                                        ("MB", "s", "'MB' to 's'"), ("Furlong", "m", "'furlong' to 'm'"),
+                                        ("m", "", "'m' to ''")]:
+        try:
+            Conversion(from_unit, to_unit)
+            assert False, (from_unit, to_unit)
+        except ValueError as e:
+            assert str(e) == f"Unsupported unit conversion from {message}"
+
+def check_convert_many(numpy_installed: bool):
+    rng = random.Random(20)
+    for from_unit, to_unit in [("km", "mi"), ("f", "c"), ("GiB", "MB"), ("ms", "h")]:
+        conversion = Conversion(from_unit, to_unit)
+        for length in (0, 1, NUMPY_MIN_BATCH - 1, NUMPY_MIN_BATCH, 500):
+            values = [rng.uniform(-1e6, 1e6) for _ in range(length)]
+            converted = conversion.convert_many(values)
+            assert type(converted) is list and all(type(value) is float for value in converted)
+            expected = [conversion.convert(value) for value in values]
+            if numpy_installed:
+                # np.round scales by 10**digits, so large values can differ in the last bits
+                assert len(converted) == len(expected)
+                assert all(math.isclose(a, b, rel_tol=1e-12, abs_tol=10 ** -conversion.digits)
+                           for a, b in zip(converted, expected))
+            else:
+                assert converted == expected
+
+def test_convert_many_without_numpy():
+    saved, units.np = units.np, None
+    try:
+        check_convert_many(numpy_installed=False)
+    finally:
+        units.np = saved
+
+def test_convert_many_with_numpy():
+    if units.np is None:
+        print("NumPy is not installed, skipping")
+        return
+    check_convert_many(numpy_installed=True)
+    assert Conversion("c", "f").convert_many([0.0] * NUMPY_MIN_BATCH) == [32.0] * NUMPY_MIN_BATCH
+
+async def check_batch_tool():
+    result = await mcp_server.unit_converter_batch.fn([1, 2.5, -3], "KM", "m")
+    assert result == {
+        "success": True,
+        "conversion": {
+            "original_unit": "km",
+            "converted_unit": "m",
+            "type": "length",
+            "count": 3,
+            "converted_values": [1000.0, 2500.0, -3000.0],
+        },
+    }
+    many = await mcp_server.unit_converter_batch.fn(list(range(100)), "c", "k")
+    assert many["conversion"]["converted_values"][99] == 372.15
+    assert (await mcp_server.unit_converter_batch.fn([], "s", "min"))["conversion"]["count"] == 0
+
+    mismatched = await mcp_server.unit_converter_batch.fn([1], "kg", "m")
+    assert mismatched == {"success": False, "error": "Unsupported unit conversion from 'kg' to 'm'"}
+    ambiguous = await mcp_server.unit_converter_batch.fn([1], "mb", "kB")
+    assert ambiguous["success"] is False and "Ambiguous unit 'mb'" in ambiguous["error"]
+
+def test_batch_tool():
+    asyncio.run(check_batch_tool())
+
+if __name__ == "__main__":
+    test_each_family()
+    test_temperature_offsets()
+    test_data_sizes_are_case_sensitive()
+    test_unsupported_and_mismatched_units()
+    test_convert_many_without_numpy()
+    test_convert_many_with_numpy()
+    test_batch_tool()
+    print("✅ Unit conversion tests passed!")
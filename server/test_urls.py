@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""Tests for short URL indexes, click counting and resolving"""
+import asyncio
+import os
+import tempfile
+
+os.environ["MCP_STORAGE_BACKEND"] = "memory"
+
+import httpx
+
+import mcp_server
+from storage import MemoryStorage, SQLiteStorage
+from url_index import ClickCounter, UrlIndex
+
+def url(url_id: str, alias: str, long_url: str, clicks: int = 0) -> dict:
+    return {"id": url_id, "alias": alias, "long_url": long_url, "clicks": clicks}
+
+def check_url_index():
+    index = UrlIndex()
+    index.update("u1", None, url("u1", "abc", "https://example.com"))
+    index.update("u2", None, url("u2", "mine", "https://example.com"))
+    assert index.by_alias == {"abc": "u1", "mine": "u2"}
+    # The first alias for a URL is the one reused
+    assert index.by_long_url == {"https://example.com": "abc"}
+
+    index.update("u2", url("u2", "mine", "https://example.com"), url("u2", "yours", "https://example.com"))
+    assert index.by_alias == {"abc": "u1", "yours": "u2"}
+    index.update("u1", url("u1", "abc", "https://example.com"), None)
+    assert index.by_alias == {"yours": "u2"} and index.by_long_url == {}
+
+async def check_click_counter():
+    storage = MemoryStorage()
+    await storage.put("urls", "u1", url("u1", "abc", "https://example.com", clicks=2))
+    counter = ClickCounter(storage, "urls")
+    for _ in range(3):
+        counter.record("u1")
+    counter.record("gone")
+    assert counter.pending("u1") == 3 and counter.pending("u2") == 0
+    await counter.flush()
+    assert (await storage.get("urls", "u1"))["clicks"] == 5
+    assert counter.pending("u1") == 0 and await storage.get("urls", "gone") is None
+
+    # A failed write keeps the clicks, added to any recorded since
+    update_many = storage.update_many
+    async def broken(*args, **kwargs):
+        raise OSError("disk full")
+    storage.update_many = broken
+    counter.record("u1")
+    try:
+        await counter.flush()
+        assert False, "flush error was swallowed"
+    except OSError:
+        pass
+    counter.record("u1")
+    assert counter.pending("u1") == 2
+    storage.update_many = update_many
+    await counter.flush()
+    assert (await storage.get("urls", "u1"))["clicks"] == 7
+
+    # The background flusher, and stop() flushing what is left
+    counter = ClickCounter(storage, "urls", flush_interval=0.01)
+    counter.start()
+    counter.record("u1")
+    await asyncio.sleep(0.05)
+    assert (await storage.get("urls", "u1"))["clicks"] == 8
+    counter.record("u1")
+    await counter.stop()
+    assert (await storage.get("urls", "u1"))["clicks"] == 9
+
+async def check_shared_sqlite_flushes(path: str):
+    first, second = SQLiteStorage(path, flush_interval=10), SQLiteStorage(path, flush_interval=10)
+    await first.open()
+    await first.put("urls", "u1", url("u1", "abc", "https://example.com"))
+    await first.flush()
+    await second.open()
+
+    # Both workers hold clicks=0 locally when they flush
+    first_counter, second_counter = ClickCounter(first, "urls"), ClickCounter(second, "urls")
+    for _ in range(5):
+        first_counter.record("u1")
+    for _ in range(7):
+        second_counter.record("u1")
+    await first_counter.flush()
+    await second_counter.flush()
+    assert (await second.get("urls", "u1"))["clicks"] == 12
+    await first.close()
+    await second.close()
+
+    reopened = SQLiteStorage(path)
+    await reopened.open()
+    assert (await reopened.get("urls", "u1"))["clicks"] == 12
+    await reopened.close()
+
+async def check_shorten_and_resolve():
+    shorten, resolve = mcp_server.url_shortener.fn, mcp_server.resolve_short_url.fn
+    created = await shorten("https://example.com/resolve-test")
+    assert created["success"]
+    alias = created["url_data"]["alias"]
+    again = await shorten("https://example.com/resolve-test")
+    assert again["message"] == "URL was already shortened" and again["url_data"]["alias"] == alias
+    assert (await shorten("https://example.com/other", custom_alias=alias))["success"] is False
+    assert (await shorten("ftp://example.com"))["success"] is False
+
+    # Clicks not yet flushed are included in what resolve reports
+    assert (await resolve(alias))["url_data"]["clicks"] == 1
+    assert (await resolve(alias, count_click=False))["url_data"]["clicks"] == 1
+    unknown = await resolve("no-such-alias")
+    assert unknown["success"] is False and "no-such-alias" in unknown["error"]
+
+    transport = httpx.ASGITransport(app=mcp_server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://mcp") as client:
+        response = await client.get(f"/s/{alias}")
+        assert response.status_code == 307
+        assert response.headers["location"] == "https://example.com/resolve-test"
+        assert (await client.get("/s/no-such-alias")).status_code == 404
+
+    await mcp_server.click_counter.flush()
+    url_id = mcp_server.url_index.by_alias[alias]
+    assert (await mcp_server.storage.get(mcp_server.URLS, url_id))["clicks"] == 2
+
+def test_url_index():
+    check_url_index()
+
+def test_click_counter():
+    asyncio.run(check_click_counter())
+
+def test_shared_sqlite_flushes():
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(check_shared_sqlite_flushes(os.path.join(directory, "storage.db")))
+
+def test_shorten_and_resolve():
+    asyncio.run(check_shorten_and_resolve())
+
+if __name__ == "__main__":
+    test_url_index()
+    test_click_counter()
+    test_shared_sqlite_flushes()
+    test_shorten_and_resolve()
+    print("✅ Short URL tests passed!")
@@ -0,0 +1,176 @@
+"""Streaming text statistics for the text_analyzer tool"""
+import codecs
+import mmap
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable
+
+CHUNK_SIZE = 1 << 20  # Characters (or bytes, for files) per chunk
+WORD_PUNCTUATION = '.,!?";()'
+# Sentences end at runs of . ! or ?; mapping all three to "." lets a plain
+# str.split find them (a run only adds blank segments, which are not counted)
+SENTENCE_ENDS = str.maketrans("!?", "..")
+# A run of non-whitespace longer than this is counted as it streams past
+# instead of being held back whole; most_common_words sees its first
+# MAX_TOKEN_LENGTH characters
+MAX_TOKEN_LENGTH = 1 << 16
+
+_SPACE = re.compile(r"\s")
+_LAST_SPACE = re.compile(r"\s\S*\Z")
+
+class TextStats:
+    """Word, sentence and paragraph statistics accumulated chunk by chunk.
+
+    ``feed`` can be called with pieces of any size, split anywhere: a word or
+    blank line cut across two chunks is carried over, so the result equals
+    analyzing the concatenated text. Memory is bounded by the chunk size and
+    the vocabulary, not by the length of the text, even for text without
+    whitespace.
+    """
+
+    def __init__(self):
+        self.char_count = 0
+        self.space_count = 0
+        self.word_count = 0
+        self.word_chars = 0
+        self.sentence_count = 0
+        self.paragraph_count = 0
+        # Raw tokens as they appear; lowercased and stripped in result(), so
+        # that work is done once per distinct token rather than per word
+        self.tokens: Counter = Counter()
+        self._carry = ""
+        self._long_token = False  # Inside a token longer than MAX_TOKEN_LENGTH
+        self._in_sentence = False
+        self._in_paragraph = False
+
+    def feed(self, chunk: str) -> None:
+        self.char_count += len(chunk)
+        self.space_count += chunk.count(" ")
+        if self._long_token:
+            match = _SPACE.search(chunk)
+            end = len(chunk) if match is None else match.start()
+            self._scan_token(chunk[:end])
+            if match is None:
+                return
+            self._long_token = False
+            chunk = chunk[end:]
+
+        # Hold back a trailing partial word, and an odd newline so that a
+        # "\n\n" split across chunks is still seen as a paragraph break.
+        # The carry is at most a newline and a partial word, so only the new
+        # chunk needs searching for the last whitespace.
+        text = self._carry + chunk
+        space = _last_space(chunk)
+        cut = 0
+        if space >= 0:
+            cut = len(self._carry) + space + 1
+            newlines = cut - len(text[:cut].rstrip("\n"))
+            cut -= newlines % 2
+        self._carry = text[cut:]
+        self._scan(text[:cut])
+
+        if len(self._carry) > MAX_TOKEN_LENGTH:
+            carry, self._carry = self._carry, ""
+            if carry[0] == "\n":
+                self._scan("\n")
+                carry = carry[1:]
+            self.word_count += 1
+            self.tokens[carry[:MAX_TOKEN_LENGTH]] += 1
+            self._scan_token(carry)
+            self._long_token = True
+
+    def _scan_token(self, part: str) -> None:
+        """Count part of a long token whose word has already been counted"""
+        if not part:
+            return
+        self.word_chars += len(part)
+        self.sentence_count, self._in_sentence = _count_segments(
+            part.translate(SENTENCE_ENDS).split("."), self.sentence_count, self._in_sentence)
+        self._in_paragraph = True
+
+    def _scan(self, text: str) -> None:
+        if not text:
+            return
+        words = text.split()
+        self.word_count += len(words)
+        self.word_chars += sum(map(len, words))
+        self.tokens.update(words)
+        self.sentence_count, self._in_sentence = _count_segments(
+            text.translate(SENTENCE_ENDS).split("."), self.sentence_count, self._in_sentence)
+        self.paragraph_count, self._in_paragraph = _count_segments(
+            text.split("\n\n"), self.paragraph_count, self._in_paragraph)
+
+    def result(self, top_k: int = 5) -> Dict[str, Any]:
+        """Final statistics in text_analyzer's analysis format; call once, after the last chunk.
+
+        Unlike the original text_analyzer, tokens made only of punctuation
+        (e.g. "....") are left out of most_common_words rather than counted
+        as the empty word "". They still count towards word_count. Tokens
+        longer than MAX_TOKEN_LENGTH are ranked by their first
+        MAX_TOKEN_LENGTH characters.
+        """
+        carry, self._carry = self._carry, ""
+        self._scan(carry)
+        sentences = self.sentence_count + self._in_sentence
+        paragraphs = self.paragraph_count + self._in_paragraph
+        # Most common words longer than three characters (first seen wins ties)
+        words = Counter()
+        for token, count in self.tokens.items():
+            if len(token) > 3:
+                word = token[:MAX_TOKEN_LENGTH].lower().strip(WORD_PUNCTUATION)
+                if word:
+                    words[word] += count
+        return {
+            "character_count": self.char_count,
+            "character_count_no_spaces": self.char_count - self.space_count,
+            "word_count": self.word_count,
+            "sentence_count": sentences,
+            "paragraph_count": paragraphs,
+            "reading_time_minutes": round(self.word_count / 200, 1),
+            "average_word_length": round(self.word_chars / self.word_count, 1) if self.word_count else 0,
+            # Counter.most_common(k) selects with a heap rather than a full sort
+            "most_common_words": words.most_common(top_k)
+        }
+
+def _last_space(text: str) -> int:
+    """Index of the last whitespace character, or -1; linear even without whitespace"""
+    # Usually within the last word, so look at the tail first. A search
+    # ending at ``tail`` finds the last whitespace before it, as the tail has none
+    tail = max(0, len(text) - 256)
+    match = _LAST_SPACE.search(text, tail)
+    if match is None and tail:
+        match = _LAST_SPACE.search(text, 0, tail)
+    return -1 if match is None else match.start()
+
+def _count_segments(segments, count: int, open_segment: bool):
+    """Count non-blank segments; the last one may continue in the next chunk"""
+    closed, last = segments[:-1], segments[-1]
+    if closed:
+        count += sum(map(bool, map(str.strip, closed)))
+        # The first segment finishes one begun in an earlier chunk
+        if open_segment and not closed[0].strip():
+            count += 1
+        open_segment = False
+    return count, open_segment or bool(last.strip())
+
+def analyze_chunks(chunks: Iterable[str], top_k: int = 5) -> Dict[str, Any]:
+    stats = TextStats()
+    for chunk in chunks:
+        stats.feed(chunk)
+    return stats.result(top_k)
+
+def analyze_text(text: str, top_k: int = 5, chunk_size: int = CHUNK_SIZE) -> Dict[str, Any]:
+    return analyze_chunks((text[i:i + chunk_size] for i in range(0, len(text), chunk_size)), top_k)
+
+def analyze_file(path: str, top_k: int = 5, chunk_size: int = CHUNK_SIZE) -> Dict[str, Any]:
+    """Analyze a UTF-8 file through a memory map, one chunk at a time"""
+    stats = TextStats()
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    with open(path, "rb") as f:
+        if f.seek(0, 2) == 0:
+            return stats.result(top_k)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for start in range(0, len(data), chunk_size):
+                stats.feed(decoder.decode(data[start:start + chunk_size]))
+            stats.feed(decoder.decode(b"", final=True))
+    return stats.result(top_k)
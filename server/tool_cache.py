@@ -0,0 +1,85 @@
+"""Result cache for MCP tools that are pure functions of their arguments"""
+import functools
+import hashlib
+import inspect
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+class ToolResultCache:
+    """Size-bounded LRU of tool results, each entry with its tool's TTL.
+
+    Caching is opt-in: only functions wrapped with ``pure`` are cached, so a
+    tool with side effects (create_task, check_reminders, ...) is never
+    cached unless someone declares it pure. Results are keyed on the tool
+    name and a hash of its arguments with defaults applied, so ``f(x)`` and
+    ``f(x, default)`` share an entry. Results with ``"success": False`` are
+    not stored.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def pure(self, ttl: float) -> Callable:
+        """Declare an async tool pure and cache its results for ``ttl`` seconds.
+
+        Apply below ``@mcp.tool()`` so the server registers the cached
+        function; the wrapper keeps the tool's name, docstring and signature.
+        """
+        def decorator(func: Callable) -> Callable:
+            name = func.__name__
+            signature = inspect.signature(func)
+            self._stats[name] = {"hits": 0, "misses": 0, "ttl": ttl}
+
+            @functools.wraps(func)
+            async def cached(*args, **kwargs):
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                arguments = json.dumps(bound.arguments, sort_keys=True, default=str)
+                key = (name, hashlib.sha256(arguments.encode()).hexdigest())
+
+                entry = self._data.get(key)
+                if entry is not None:
+                    expires_at, result = entry
+                    if expires_at > time.monotonic():
+                        self._data.move_to_end(key)
+                        self._stats[name]["hits"] += 1
+                        return result
+                    del self._data[key]
+
+                self._stats[name]["misses"] += 1
+                result = await func(*args, **kwargs)
+                if not (isinstance(result, dict) and result.get("success") is False):
+                    self._set(key, result, ttl)
+                return result
+
+            return cached
+        return decorator
+
+    def _set(self, key: Hashable, value: Any, ttl: float) -> None:
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Entry count and per-tool hit/miss counters"""
+        hits = sum(tool["hits"] for tool in self._stats.values())
+        misses = sum(tool["misses"] for tool in self._stats.values())
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            "tools": {name: dict(tool) for name, tool in sorted(self._stats.items())}
+        }
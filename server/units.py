@@ -0,0 +1,120 @@
+"""Unit conversion tables for the unit_converter tools"""
+from typing import Dict, List, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # Optional: batches fall back to plain Python
+    np = None
+
+# Batches at least this long are converted with NumPy when it is installed
+NUMPY_MIN_BATCH = 64
+
+# Factor to the family's base unit: meter, gram, liter, second, byte, m/s
+_FACTORS: Dict[str, Dict[str, float]] = {
+    "length": {
+        "mm": 0.001, "cm": 0.01, "m": 1, "km": 1000,
+        "in": 0.0254, "ft": 0.3048, "yd": 0.9144, "mi": 1609.34, "nmi": 1852,
+    },
+    "weight": {
+        "mg": 0.001, "g": 1, "kg": 1000, "t": 1000000,
+        "oz": 28.3495, "lb": 453.592, "st": 6350.29,
+    },
+    "volume": {
+        "ml": 0.001, "cl": 0.01, "dl": 0.1, "l": 1, "m3": 1000, "cm3": 0.001,
+        "tsp": 0.00492892, "tbsp": 0.0147868, "floz": 0.0295735, "cup": 0.236588,
+        "pt": 0.473176, "qt": 0.946353, "gal": 3.78541,
+    },
+    "time": {
+        "ns": 1e-9, "us": 1e-6, "ms": 0.001, "s": 1, "min": 60, "h": 3600,
+        "day": 86400, "week": 604800, "year": 31557600,
+    },
+    "data": {
+        "bit": 0.125, "byte": 1,
+    },
+    "speed": {
+        "m/s": 1, "km/h": 1 / 3.6, "mph": 0.44704, "ft/s": 0.3048, "knot": 0.514444,
+    },
+}
+
+# Data size symbols, matched case-sensitively: "Mb" is a megabit and "MB" a megabyte
+_DATA_SYMBOLS: Dict[str, float] = {
+    "Kb": 125, "Mb": 1.25e5, "Gb": 1.25e8, "Tb": 1.25e11,
+    "B": 1, "kB": 1e3, "KB": 1e3, "MB": 1e6, "GB": 1e9, "TB": 1e12,
+    "KiB": 1024, "MiB": 1024 ** 2, "GiB": 1024 ** 3, "TiB": 1024 ** 4,
+}
+
+# Temperature is affine: celsius = (value - offset) * scale
+_TEMPERATURE: Dict[str, Tuple[float, float]] = {
+    "c": (0.0, 1.0), "f": (32.0, 5 / 9), "k": (273.15, 1.0),
+}
+
+_ALIASES: Dict[str, str] = {
+    "meter": "m", "meters": "m", "metre": "m", "kilometer": "km", "kilometers": "km",
+    "mile": "mi", "miles": "mi", "foot": "ft", "feet": "ft", "inch": "in", "inches": "in",
+    "gram": "g", "grams": "g", "kilogram": "kg", "kilograms": "kg", "pound": "lb", "pounds": "lb",
+    "lbs": "lb", "ounce": "oz", "ounces": "oz", "tonne": "t",
+    "liter": "l", "liters": "l", "litre": "l", "milliliter": "ml", "gallon": "gal", "gallons": "gal",
+    "sec": "s", "second": "s", "seconds": "s", "minute": "min", "minutes": "min",
+    "hr": "h", "hour": "h", "hours": "h", "days": "day", "weeks": "week", "years": "year",
+    "bytes": "byte", "bits": "bit", "kilobyte": "kB", "kilobytes": "kB", "megabyte": "MB",
+    "megabytes": "MB", "gigabyte": "GB", "gigabytes": "GB", "terabyte": "TB", "terabytes": "TB",
+    "megabit": "Mb", "megabits": "Mb", "gigabit": "Gb", "gigabits": "Gb",
+    "kmh": "km/h", "kph": "km/h", "mps": "m/s", "kn": "knot", "knots": "knot",
+    "celsius": "c", "fahrenheit": "f", "kelvin": "k",
+}
+
+# unit -> (family, offset, scale), so that base = (value - offset) * scale
+UNITS: Dict[str, Tuple[str, float, float]] = {
+    unit: (family, 0.0, factor)
+    for family, factors in _FACTORS.items()
+    for unit, factor in factors.items()
+}
+UNITS.update({unit: ("temperature", offset, scale) for unit, (offset, scale) in _TEMPERATURE.items()})
+UNITS.update({symbol: ("data", 0.0, factor) for symbol, factor in _DATA_SYMBOLS.items()})
+UNITS.update({alias: UNITS[unit] for alias, unit in _ALIASES.items()})
+
+# Other spellings of data symbols, which could mean either bits or bytes
+_AMBIGUOUS = {symbol.lower() for symbol in _DATA_SYMBOLS}
+
+# Digits kept in converted values, per family
+PRECISION = {"temperature": 4}
+DEFAULT_PRECISION = 6
+
+class Conversion:
+    """A from_unit -> to_unit conversion, resolved once and applied to any number of values"""
+
+    def __init__(self, from_unit: str, to_unit: str):
+        self.from_unit = _unit_name(from_unit)
+        self.to_unit = _unit_name(to_unit)
+        source, target = UNITS.get(self.from_unit), UNITS.get(self.to_unit)
+        if source is None or target is None or source[0] != target[0]:
+            raise ValueError(f"Unsupported unit conversion from '{self.from_unit}' to '{self.to_unit}'")
+        self.family = source[0]
+        self.digits = PRECISION.get(self.family, DEFAULT_PRECISION)
+        _, from_offset, from_scale = source
+        _, to_offset, to_scale = target
+        self._from_offset, self._from_scale = from_offset, from_scale
+        self._to_offset, self._to_scale = to_offset, to_scale
+
+    def convert(self, value: float) -> float:
+        base = (value - self._from_offset) * self._from_scale
+        return round(base / self._to_scale + self._to_offset, self.digits)
+
+    def convert_many(self, values: Sequence[float]) -> List[float]:
+        """Convert a whole column; vectorized with NumPy for long batches"""
+        if np is not None and len(values) >= NUMPY_MIN_BATCH:
+            base = (np.asarray(values, dtype=float) - self._from_offset) * self._from_scale
+            return np.round(base / self._to_scale + self._to_offset, self.digits).tolist()
+        from_offset, from_scale = self._from_offset, self._from_scale
+        to_offset, to_scale, digits = self._to_offset, self._to_scale, self.digits
+        return [round((value - from_offset) * from_scale / to_scale + to_offset, digits) for value in values]
+
+def _unit_name(unit: str) -> str:
+    """The UNITS key for ``unit``: data symbols as given, other units lowercased"""
+    if unit in _DATA_SYMBOLS:
+        return unit
+    name = unit.lower()
+    if name in _AMBIGUOUS:
+        raise ValueError(f"Ambiguous unit '{unit}': data sizes are case-sensitive, "
+                         f"e.g. 'MB' for megabytes and 'Mb' for megabits")
+    return name
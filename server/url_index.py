@@ -0,0 +1,93 @@
+"""Alias lookups and batched click counting for shortened URLs"""
+import asyncio
+from typing import Dict, Optional
+
+from storage import Record, StorageBackend
+
+class UrlIndex:
+    """alias -> url id and long_url -> alias hash indexes.
+
+    Register ``update`` as a storage listener on the URL collection so alias
+    checks and resolves are O(1) dict lookups instead of scans.
+    """
+
+    def __init__(self):
+        self.by_alias: Dict[str, str] = {}
+        self.by_long_url: Dict[str, str] = {}
+
+    def update(self, url_id: str, old: Optional[Record], new: Optional[Record]) -> None:
+        """Storage listener: keep both indexes in step with the URL records"""
+        if old is not None:
+            if self.by_alias.get(old["alias"]) == url_id:
+                del self.by_alias[old["alias"]]
+            if self.by_long_url.get(old["long_url"]) == old["alias"]:
+                del self.by_long_url[old["long_url"]]
+        if new is not None:
+            self.by_alias[new["alias"]] = url_id
+            # The first alias created for a URL is the one reused by dedup
+            self.by_long_url.setdefault(new["long_url"], new["alias"])
+
+class ClickCounter:
+    """Counts clicks in memory and writes them back in periodic batches.
+
+    A hot link costs one dict increment per click rather than one storage
+    write, and each flush writes every URL that was clicked once.
+    """
+
+    def __init__(self, storage: StorageBackend, collection: str, flush_interval: float = 1.0):
+        self.storage = storage
+        self.collection = collection
+        self.flush_interval = flush_interval
+        self._pending: Dict[str, int] = {}
+        self._flusher: Optional[asyncio.Task] = None
+
+    def record(self, url_id: str) -> None:
+        self._pending[url_id] = self._pending.get(url_id, 0) + 1
+
+    def pending(self, url_id: str) -> int:
+        """Clicks counted but not yet written to storage"""
+        return self._pending.get(url_id, 0)
+
+    async def flush(self) -> None:
+        """Add the pending clicks to the stored counts.
+
+        The increments go through ``update_many``, which applies them to the
+        latest committed records in one transaction, so workers sharing a
+        SQLite file do not overwrite each other's counts. If the write fails
+        the clicks are kept for the next flush.
+        """
+        batch, self._pending = self._pending, {}
+        if not batch:
+            return
+        changes = {
+            url_id: lambda record, clicks=clicks: {**record, "clicks": record["clicks"] + clicks}
+            for url_id, clicks in batch.items()
+        }
+        try:
+            await self.storage.update_many(self.collection, changes)
+        except Exception:
+            for url_id, clicks in batch.items():
+                self._pending[url_id] = self._pending.get(url_id, 0) + clicks
+            raise
+
+    def start(self) -> None:
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Click count flush failed: {e}")